@@ -0,0 +1,112 @@
+# ============================================================
+# bench_bpi.py - BPI 計算ベンチマーク
+# /result の旧実装（iterrows + スカラー calculate_bpi）と
+# ベクトル化カーネル calculate_bpi_array を同じランキングで比較する
+#
+# 実行: python -m bench.bench_bpi [--rows 10000] [--repeat 5]
+# ============================================================
+
+import argparse
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.bpi import calculate_bpi_array, extract_own_scores, BPI_FLOOR
+
+
+# ============================================================
+# 旧実装（比較用にそのまま保持）
+# ============================================================
+
+def _legacy_pgf(x, m):
+    if x == 1:
+        return m
+    return 0.5 / (1 - x)
+
+
+def _legacy_calculate_bpi(s, k, z, m, p) -> float:
+    S = _legacy_pgf(s / m, m)
+    K = _legacy_pgf(k / m, m)
+    Z = _legacy_pgf(z / m, m)
+    S_prime = S / K
+    Z_prime = Z / K
+
+    if s >= k:
+        return float(round(100 * (np.log(S_prime) ** p) / (np.log(Z_prime) ** p), 2))
+    else:
+        return float(round(
+            max(-100 * ((np.abs(np.log(S_prime)) ** p) / (np.log(Z_prime) ** p)), -15), 2
+        ))
+
+
+def _legacy_path(df: pd.DataFrame, k, z, m, p) -> list[float]:
+    out = []
+    for _, row in df.iterrows():
+        mscore = re.match(r"(\d+)/", row["スコア"])
+        s = int(mscore.group(1)) if mscore else 0
+        raw_bpi = _legacy_calculate_bpi(s, k, z, m, p)
+        out.append(round(raw_bpi, 2) if not np.isnan(raw_bpi) else -15)
+    return out
+
+
+def _vectorized_path(df: pd.DataFrame, k, z, m, p) -> np.ndarray:
+    scores = extract_own_scores(df["スコア"])
+    return calculate_bpi_array(scores, k, z, m, p, nan_value=BPI_FLOOR)
+
+
+# ============================================================
+# 合成データ
+# ============================================================
+
+def make_ranking(rows: int, m: int = 4174, seed: int = 0) -> pd.DataFrame:
+    """理論値 m の曲について rows 件のランキング（スコア文字列）を生成する。"""
+    rng = np.random.default_rng(seed)
+    own = np.clip(rng.normal(m * 0.85, m * 0.06, rows), 0, m).astype(int)
+    own[:3] = m  # 理論値ちょうどのケースも含める
+    scores = [f"{s}/{m}({s / m * 100:.2f}%)" for s in own]
+    return pd.DataFrame({"順位": np.arange(1, rows + 1), "スコア": scores})
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(rows: int = 10_000, repeat: int = 5) -> dict:
+    """ベンチマークを実行して結果の dict を返す。"""
+    m, k, z, p = 4174, 3882.07, 4145, 0.8
+    df = make_ranking(rows, m)
+
+    legacy = np.asarray(_legacy_path(df, k, z, m, p))
+    vector = _vectorized_path(df, k, z, m, p)
+    max_diff = float(np.nanmax(np.abs(legacy - vector))) if rows else 0.0
+
+    t_legacy = _best_of(lambda: _legacy_path(df, k, z, m, p), repeat)
+    t_vector = _best_of(lambda: _vectorized_path(df, k, z, m, p), repeat)
+    return {
+        "rows": rows,
+        "legacy_sec": t_legacy,
+        "vectorized_sec": t_vector,
+        "speedup": t_legacy / t_vector if t_vector else float("inf"),
+        "max_abs_diff": max_diff,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BPI 計算ベンチマーク")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    r = run(args.rows, args.repeat)
+    print(f"rows={r['rows']}")
+    print(f"  legacy (iterrows + scalar): {r['legacy_sec'] * 1000:9.2f} ms")
+    print(f"  vectorized kernel         : {r['vectorized_sec'] * 1000:9.2f} ms")
+    print(f"  speedup                   : {r['speedup']:9.1f}x")
+    print(f"  max |legacy - vectorized| : {r['max_abs_diff']:.4f}")
@@ -0,0 +1,114 @@
+# ============================================================
+# bench_generate_table.py - マイページ HTML 描画ベンチマーク
+# 旧実装（行 dict のリスト → DataFrame → to_html）と
+# ストリーミング描画 render_html_table（行タプルから直接描画）を比較する。
+# DataFrame を受け取る generate_bootstrap_html_table（/result 等の経路）も長い履歴で測る
+#
+# 実行: python -m bench.bench_generate_table [--rows 500] [--repeat 5]
+# ============================================================
+
+import argparse
+import time
+
+import pandas as pd
+
+from src.generate_table import (
+    _PAGE_HEAD_PARTS,
+    _PAGE_TAIL,
+    generate_bootstrap_html_table,
+    render_html_table,
+)
+
+_LR2IR_BASE = "http://www.dream-pro.info/~lavalse/LR2IR/search.cgi?mode=ranking&courseid="
+_COLOR_MAP = {1: "gold", 2: "silver", 3: "#cd7f32"}
+
+
+# ============================================================
+# 合成データ
+# ============================================================
+
+def make_rows(rows: int) -> list[dict]:
+    """LR2Cog.mypage の all モードが組み立てていた行 dict を模したデータを生成する。"""
+    out = []
+    for i in range(rows):
+        rank = i % 30 + 1
+        rank_str = (
+            f'<span style="color:{_COLOR_MAP[rank]}; font-weight:bold;">{rank}位</span>'
+            if rank in _COLOR_MAP else f"{rank}位"
+        )
+        out.append({
+            "回": i + 1,
+            "曲名": f'<a href="{_LR2IR_BASE}{10000 + i}" target="_blank">Song Title {i} [ANOTHER]</a>',
+            "難易度": f"★{i % 25}",
+            "順位": f"{rank_str} / 40人",
+            "スコア": 3000 + i,
+            "スコアレート": f"{80 + (i % 200) / 10:.2f}%",
+            "BPI": round((i % 100) / 3 - 10, 2),
+        })
+    return out
+
+
+# ============================================================
+# 旧実装（表部分は当時の to_html 呼び出しのまま。ページの外枠は共通）
+# ============================================================
+
+def _legacy_render(rows: list[dict], title: str) -> str:
+    df = pd.DataFrame(rows).sort_values("回")
+    table_html = df.to_html(
+        index=False,
+        escape=False,
+        table_id="results-table",
+        classes="table table-hover align-middle"
+    )
+    return title.join(_PAGE_HEAD_PARTS) + table_html + _PAGE_TAIL
+
+
+def _streaming_render(rows: list[dict], title: str) -> str:
+    columns = list(rows[0])
+    return render_html_table(columns, (tuple(r.values()) for r in rows), title, escape=False)
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(rows: int = 500, repeat: int = 5) -> dict:
+    """ベンチマークを実行して結果の dict を返す。"""
+    data = make_rows(rows)
+    title = "あなたのねぶかわウィークリー成績一覧"
+
+    legacy_html = _legacy_render(data, title)
+    streaming_html = _streaming_render(data, title)
+
+    t_legacy = _best_of(lambda: _legacy_render(data, title), repeat)
+    t_stream = _best_of(lambda: _streaming_render(data, title), repeat)
+    df = pd.DataFrame(data)
+    t_bootstrap = _best_of(lambda: generate_bootstrap_html_table(df, title), repeat)
+    return {
+        "rows": rows,
+        "legacy_bytes": len(legacy_html.encode("utf-8")),
+        "streaming_bytes": len(streaming_html.encode("utf-8")),
+        "legacy_sec": t_legacy,
+        "streaming_sec": t_stream,
+        "bootstrap_df_sec": t_bootstrap,
+        "speedup": t_legacy / t_stream if t_stream else float("inf"),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="マイページ HTML 描画ベンチマーク")
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    r = run(args.rows, args.repeat)
+    print(f"rows={r['rows']}")
+    print(f"  legacy (DataFrame + to_html): {r['legacy_sec'] * 1000:9.2f} ms  ({r['legacy_bytes'] / 1024:.0f} KiB)")
+    print(f"  streaming render_html_table : {r['streaming_sec'] * 1000:9.2f} ms  ({r['streaming_bytes'] / 1024:.0f} KiB)")
+    print(f"  generate_bootstrap (df)     : {r['bootstrap_df_sec'] * 1000:9.2f} ms")
+    print(f"  speedup                     : {r['speedup']:9.1f}x")
@@ -0,0 +1,170 @@
+# ============================================================
+# bench_lr2ir_parse.py - LR2IR ランキングページ解析ベンチマーク
+# 旧実装（BeautifulSoup html.parser + pd.read_html + リンク走査の3重パース）と
+# lxml による1パス解析 parse_ranking_page を合成ページで比較する。
+# --html を指定すると LR2IR から取得して cp932 のまま保存したランキングページ
+# （bench/fixtures/*.html 等。リポジトリには同梱しない）を解析する
+#
+# 実行: python -m bench.bench_lr2ir_parse [--rows 3000] [--repeat 3]
+#       python -m bench.bench_lr2ir_parse --html bench/fixtures/*.html
+# ============================================================
+
+import argparse
+import glob
+import os
+import time
+from io import StringIO
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from src.lr2ir import parse_ranking_page
+
+# LR2IR のランキングテーブルのヘッダー
+_HEADERS = [
+    "順位", "プレイヤー", "段位", "クリア", "ランク", "スコア", "コンボ", "B+P",
+    "PG", "GR", "GD", "BD", "PR", "オプション", "入力", "本体",
+]
+
+
+# ============================================================
+# 合成データ
+# ============================================================
+
+def make_ranking_page(rows: int, m: int = 4174, bmsid: int = 1794) -> str:
+    """
+    LR2IR のランキングページを模した HTML を生成する。
+    4番目のテーブルがランキングで、各プレイヤー行の後に空のコメント行が続く。
+    """
+    head = "<tr>" + "".join(f"<th>{h}</th>" for h in _HEADERS) + "</tr>"
+    body = []
+    for i in range(rows):
+        s = max(m - i, 0)
+        pg, gr = s // 2, s % 2
+        body.append(
+            f"<tr><td>{i + 1}</td>"
+            f"<td><a href=\"search.cgi?mode=mypage&playerid={100000 + i}\">プレイヤー{i}</a></td>"
+            f"<td>★01</td><td>HARD</td><td>AAA</td>"
+            f"<td>{s}/{m}({s / m * 100:.2f}%)</td><td>{i % 2087}/2087</td><td>{i % 50}</td>"
+            f"<td>{pg}</td><td>{gr}</td><td>0</td><td>0</td><td>0</td>"
+            f"<td>RANDOM</td><td>KB</td><td>LR2</td></tr>"
+        )
+        body.append(f"<tr><td colspan=\"{len(_HEADERS)}\"></td></tr>")
+    return (
+        "<html><head><title>LR2IR</title></head><body>"
+        "<table><tr><td><a href=\"search.cgi\">LR2IR</a></td></tr></table>"
+        f"<table><tr><td><a href=\"search.cgi?mode=ranking&bmsid={bmsid}\">song</a></td></tr></table>"
+        "<table><tr><td>course</td></tr></table>"
+        f"<table>{head}{''.join(body)}</table>"
+        "</body></html>"
+    )
+
+
+# ============================================================
+# 保存済みページ（フィクスチャ）
+# ============================================================
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def fixture_paths() -> list[str]:
+    """bench/fixtures に置いた LR2IR のランキングページのパスを返す（ディレクトリがなければ空）。"""
+    return sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html")))
+
+
+def load_fixture(path: str) -> str:
+    """保存済みのページを、bot の取得処理と同じく cp932 でデコードして返す。"""
+    with open(path, "rb") as f:
+        return f.read().decode("cp932", errors="replace")
+
+
+# ============================================================
+# 旧実装（比較用にそのまま保持）
+# ============================================================
+
+def _legacy_parse(html: str) -> pd.DataFrame:
+    soup = BeautifulSoup(html, 'html.parser')
+    tables = soup.find_all('table')
+    target_table = tables[3]
+    df = pd.read_html(StringIO(str(target_table)))[0]
+
+    player_links = []
+    for row in target_table.find_all('tr')[1:]:
+        cols = row.find_all('td')
+        if len(cols) >= 2:
+            a_tag = cols[1].find('a')
+            if a_tag and a_tag.get('href') and "playerid=" in a_tag['href']:
+                player_links.append(a_tag['href'].split("playerid=")[1])
+            else:
+                player_links.append(None)
+        else:
+            player_links.append(None)
+
+    df['LR2ID'] = player_links
+    df = df.dropna(subset=[df.columns[3]])[['順位', 'LR2ID', 'プレイヤー', 'スコア', 'PG', 'GR']]
+    return df.reset_index(drop=True)
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _compare(html: str, repeat: int) -> dict:
+    legacy = _legacy_parse(html)
+    df, bmsid = parse_ranking_page(html)
+    same = (
+        len(legacy) == len(df)
+        and legacy["LR2ID"].tolist() == df["LR2ID"].tolist()
+        and legacy["スコア"].tolist() == df["スコア"].tolist()
+        and [int(x) for x in legacy["順位"]] == df["順位"].tolist()
+    )
+
+    t_legacy = _best_of(lambda: _legacy_parse(html), repeat)
+    t_lxml = _best_of(lambda: parse_ranking_page(html), repeat)
+    return {
+        "rows": len(df),
+        "html_bytes": len(html.encode("utf-8")),
+        "legacy_sec": t_legacy,
+        "lxml_sec": t_lxml,
+        "speedup": t_legacy / t_lxml if t_lxml else float("inf"),
+        "same_result": same,
+        "bmsid": bmsid,
+    }
+
+
+def run(rows: int = 3000, repeat: int = 3) -> dict:
+    """合成ページでベンチマークを実行して結果の dict を返す。"""
+    return _compare(make_ranking_page(rows), repeat)
+
+
+def run_fixtures(paths: list[str] | None = None, repeat: int = 3) -> dict:
+    """保存済みページ（既定: bench/fixtures/*.html）ごとにベンチマークを実行し、{ファイル名: 結果} を返す。"""
+    paths = fixture_paths() if paths is None else paths
+    return {os.path.basename(p): _compare(load_fixture(p), repeat) for p in paths}
+
+
+def _print(label: str, r: dict) -> None:
+    print(f"{label}rows={r['rows']} ({r['html_bytes'] / 1024:.0f} KiB)")
+    print(f"  legacy (bs4 + read_html): {r['legacy_sec'] * 1000:9.2f} ms")
+    print(f"  lxml single pass        : {r['lxml_sec'] * 1000:9.2f} ms")
+    print(f"  speedup                 : {r['speedup']:9.1f}x")
+    print(f"  same result             : {r['same_result']} (bmsid={r['bmsid']})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LR2IR ランキング解析ベンチマーク")
+    parser.add_argument("--rows", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--html", nargs="+", metavar="PATH", help="保存済みのランキングページを解析する")
+    args = parser.parse_args()
+
+    if args.html:
+        for name, r in run_fixtures(args.html, args.repeat).items():
+            _print(f"{name}: ", r)
+    else:
+        _print("", run(args.rows, args.repeat))
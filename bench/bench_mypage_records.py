@@ -0,0 +1,171 @@
+# ============================================================
+# bench_mypage_records.py - /mypage all の全回成績組み立てベンチマーク
+# _fetch_user_records_all_rounds_sync を、values_batch_get の応答を合成する
+# 偽の Spreadsheet に対して実行し、2段階取得（targeted）とタブ全体取得を比較する
+# （ネットワーク・Google 認証は使わない。ローカル成績ストアは無効にして計測する）
+#
+# 実行: python -m bench.bench_mypage_records [--rounds 500] [--players 500] [--users 20] [--repeat 3]
+# ============================================================
+
+import argparse
+import re
+import time
+
+from src import mypage
+from src.sheet_cache import sheet_cache
+
+# /result で write_round_result_to_sheet が書き込むヘッダー（main.py と同じ列の並び）
+_HEADER = ["Rank", "LR2ID", "PlayerName", "Score", "Score Rate (%)", "BPI"]
+_RANGE_RE = re.compile(r"^'(.+)'!([A-Z]+)(\d*):([A-Z]+)(\d*)$")
+
+
+# ============================================================
+# 合成データ（偽の Spreadsheet）
+# ============================================================
+
+class _FakeWorksheet:
+    def __init__(self, title: str):
+        self.title = title
+
+
+class FakeSpreadsheet:
+    """
+    結果シート（NebukawaIR(result)）を模した Spreadsheet。
+    worksheets() と values_batch_get() だけを実装し、A1 表記の範囲を合成したタブの値から切り出す。
+    api_calls / cells で呼び出し回数と返したセル数を数える。
+    """
+
+    def __init__(self, rounds: int, players: int, seed: int = 0):
+        self.id = f"bench-result-{rounds}x{players}"
+        self.api_calls = 0
+        self.cells = 0
+        # 同じ文字列を使い回してメモリを抑える（500回 × 500人でも数十 MB に収まる）
+        ids = [str(100000 + i) for i in range(players)]
+        names = [f"プレイヤー{i}" for i in range(players)]
+        self._tabs: dict[str, list[list]] = {}
+        for rnd in range(1, rounds + 1):
+            # 回ごとに参加者と順位を変える（全員が全回に参加しているわけではない）
+            offset = (rnd * 7 + seed) % players
+            n = players - (rnd % 5) * players // 10
+            rows = [_HEADER]
+            for rank in range(1, n + 1):
+                p = (offset + rank * 13) % players
+                rows.append([str(rank), ids[p], names[p], str(4000 - rank), "95.80", "10.5"])
+            self._tabs[str(rnd)] = rows
+        # 数字以外のタブ（CourseData 等）も混ぜる
+        self._titles = ["README"] + list(self._tabs)
+
+    def worksheets(self) -> list[_FakeWorksheet]:
+        self.api_calls += 1
+        return [_FakeWorksheet(t) for t in self._titles]
+
+    def _slice(self, a1: str) -> list[list]:
+        m = _RANGE_RE.match(a1)
+        title, c0, r0, c1, r1 = m.groups()
+        rows = self._tabs.get(title, [])
+        lo = int(r0) - 1 if r0 else 0
+        hi = int(r1) if r1 else len(rows)
+        first, last = ord(c0) - ord("A"), ord(c1) - ord("A") + 1
+        out = [row[first:last] for row in rows[lo:hi]]
+        self.cells += sum(len(r) for r in out)
+        return out
+
+    def values_batch_get(self, ranges: list[str]) -> dict:
+        self.api_calls += 1
+        return {"valueRanges": [{"range": a1, "values": self._slice(a1)} for a1 in ranges]}
+
+
+# ============================================================
+# 計測
+# ============================================================
+
+def _patched(sh: FakeSpreadsheet):
+    """mypage が偽の Spreadsheet を開き、ローカル成績ストアを使わないように差し替える。"""
+    saved = (mypage._open_spreadsheet, mypage.get_synced_store)
+    mypage._open_spreadsheet = lambda sheet_id: sh
+    mypage.get_synced_store = lambda: None
+    return saved
+
+
+def _restore(saved) -> None:
+    mypage._open_spreadsheet, mypage.get_synced_store = saved
+
+
+def _fetch_users(sh: FakeSpreadsheet, lr2ids: list[str], targeted: bool) -> list[list[dict]]:
+    return [mypage._fetch_user_records_all_rounds_sync(sh.id, lr2id, targeted=targeted) for lr2id in lr2ids]
+
+
+def _measure(sh: FakeSpreadsheet, lr2ids: list[str], targeted: bool, repeat: int) -> dict:
+    """キャッシュが空の状態（1人目）と温まった状態（続く users 人）の時間・API 呼び出し数を測る。"""
+    cold = warm = float("inf")
+    for _ in range(repeat):
+        sheet_cache.clear()
+        sh.api_calls = sh.cells = 0
+        t0 = time.perf_counter()
+        _fetch_users(sh, lr2ids[:1], targeted)
+        cold = min(cold, time.perf_counter() - t0)
+        cold_calls, cold_cells = sh.api_calls, sh.cells
+
+        sh.api_calls = sh.cells = 0
+        t0 = time.perf_counter()
+        _fetch_users(sh, lr2ids, targeted)
+        warm = min(warm, time.perf_counter() - t0)
+    return {
+        "cold_sec": cold,
+        "cold_api_calls": cold_calls,
+        "cold_cells": cold_cells,
+        "warm_per_user_sec": warm / len(lr2ids),
+        "warm_api_calls_per_user": sh.api_calls / len(lr2ids),
+        "warm_cells_per_user": sh.cells / len(lr2ids),
+    }
+
+
+def run(rounds: int = 500, players: int = 500, users: int = 20, repeat: int = 3) -> dict:
+    """ベンチマークを実行して結果の dict を返す。"""
+    sh = FakeSpreadsheet(rounds, players)
+    users = max(1, min(users, players))
+    lr2ids = [str(100000 + i * players // users) for i in range(users)]
+
+    saved = _patched(sh)
+    try:
+        sheet_cache.clear()
+        expected = _fetch_users(sh, lr2ids, False)
+        sheet_cache.clear()
+        same = _fetch_users(sh, lr2ids, True) == expected
+        targeted = _measure(sh, lr2ids, True, repeat)
+        full = _measure(sh, lr2ids, False, repeat)
+        records = len(mypage._fetch_user_records_all_rounds_sync(sh.id, lr2ids[0]))
+    finally:
+        sheet_cache.clear()
+        _restore(saved)
+
+    return {
+        "rounds": rounds,
+        "players": players,
+        "users": users,
+        "records_per_user": records,
+        **{f"targeted_{k}": v for k, v in targeted.items()},
+        **{f"full_{k}": v for k, v in full.items()},
+        "warm_speedup": full["warm_per_user_sec"] / targeted["warm_per_user_sec"]
+        if targeted["warm_per_user_sec"] else float("inf"),
+        "same_result": same,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/mypage all 全回成績組み立てベンチマーク")
+    parser.add_argument("--rounds", type=int, default=500)
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    r = run(args.rounds, args.players, args.users, args.repeat)
+    print(f"rounds={r['rounds']} players={r['players']} users={r['users']} (records/user={r['records_per_user']})")
+    for mode, label in (("targeted", "targeted (B列 → 該当行)"), ("full", "full tabs (A:Z)        ")):
+        print(f"  {label} cold: {r[f'{mode}_cold_sec'] * 1000:9.2f} ms"
+              f"  ({r[f'{mode}_cold_api_calls']} calls, {r[f'{mode}_cold_cells']} cells)")
+        print(f"  {label} warm: {r[f'{mode}_warm_per_user_sec'] * 1000:9.2f} ms/user"
+              f"  ({r[f'{mode}_warm_api_calls_per_user']:.1f} calls, {r[f'{mode}_warm_cells_per_user']:.0f} cells)")
+    print(f"  warm speedup              : {r['warm_speedup']:9.1f}x")
+    print(f"  same result               : {r['same_result']}")
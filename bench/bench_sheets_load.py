@@ -0,0 +1,275 @@
+# ============================================================
+# bench_sheets_load.py - Sheets を使うコマンドの負荷試験（ローカルスタブ使用）
+# bench/sheets_stub.py のスタブを起動して bot の Sheets クライアントの接続先にし、
+# /mypage all・/register・/announce・/result と同じ Sheets 処理を並行に実行して、
+# コマンドごとのレイテンシ（p50 / p95 / 最大）と Sheets API の呼び出し回数、
+# 429・再試行の件数を測る。遅延・クォータ・エラー率はスタブ側で設定する
+#
+# 実行: python -m bench.bench_sheets_load [--ops 200] [--concurrency 8] [--latency 0.05]
+#                                         [--stub-per-min 300] [--bot-per-min 300] [--error-rate 0]
+# ============================================================
+
+import argparse
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.sheets_stub import MAIN_ID, SCORE_ID, SheetsStub, StubConfig, StubServer
+from src import common, mypage
+from src import user_directory as user_directory_module
+from src.sheet_cache import sheet_cache
+from src.sheet_writer import upsert_keyed_row_sync, write_tab_values_sync
+from src.sheets_scheduler import Priority, QuotaScheduler, sheets_priority
+from src.user_directory import UserDirectory, lr2id_for_discord_sync
+
+# コマンドの比率（/mypage all が大半で、管理コマンドはまれ）
+DEFAULT_MIX = {"mypage": 0.7, "register": 0.2, "announce": 0.05, "result": 0.05}
+
+
+# ============================================================
+# コマンド（main.py の各コマンドと同じ Sheets 処理）
+# ============================================================
+
+def _mypage(user: int) -> None:
+    lr2id = lr2id_for_discord_sync(MAIN_ID, "UserData", str(900000000000 + user))
+    if lr2id is not None:
+        mypage._fetch_user_records_all_rounds_sync(SCORE_ID, lr2id)
+        mypage.load_course_meta_map_sync(MAIN_ID)
+
+
+def _register(user: int) -> None:
+    discord_id, lr2id = str(900000000000 + user), str(100000 + user)
+    upsert_keyed_row_sync(MAIN_ID, "UserData", ["DiscordID", "LR2ID"], [discord_id, lr2id])
+    user_directory_module.user_directory.set(discord_id, lr2id)
+
+
+def _announce(round_no: int) -> None:
+    upsert_keyed_row_sync(
+        MAIN_ID, "CourseData", ["回", "diff", "title", "CourseID"],
+        [round_no, f"★{round_no % 25}", f"Song {round_no} [ANOTHER]", 10000 + round_no],
+    )
+
+
+def _result(round_no: int, players: int) -> None:
+    header = ["Rank", "LR2ID", "PlayerName", "Score", "Score Rate (%)", "BPI"]
+    rows = [[rank, str(100000 + rank), f"player{rank}", 4000 - rank, 90.0, 10.0] for rank in range(1, players + 1)]
+    write_tab_values_sync(SCORE_ID, str(round_no), [header] + rows)
+
+
+_PRIORITY = {
+    "mypage": Priority.INTERACTIVE,
+    "register": Priority.INTERACTIVE,
+    "announce": Priority.ADMIN,
+    "result": Priority.ADMIN,
+}
+
+
+# ============================================================
+# 計測
+# ============================================================
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class _Counting:
+    """ScheduledHTTPClient.request を包んで、スレッドごとの API 呼び出し回数（再試行を除く）を数える。"""
+
+    def __init__(self, client_cls):
+        self._cls = client_cls
+        self._orig = client_cls.request
+        self._local = threading.local()
+
+    def __enter__(self) -> "_Counting":
+        orig, local = self._orig, self._local
+
+        def request(client, *args, **kwargs):
+            local.n = getattr(local, "n", 0) + 1
+            return orig(client, *args, **kwargs)
+
+        self._cls.request = request
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._cls.request = self._orig
+
+    def take(self) -> int:
+        n = getattr(self._local, "n", 0)
+        self._local.n = 0
+        return n
+
+
+class _BotAgainstStub:
+    """
+    bot の Sheets クライアントをスタブに向け、スケジューラ・キャッシュ・対応表を計測用に作り直す。
+    終了時に元に戻す（ローカル成績ストアは使わない）。
+    """
+
+    def __init__(self, url: str, scheduler: QuotaScheduler):
+        self.url = url
+        self.scheduler = scheduler
+
+    def __enter__(self) -> "_BotAgainstStub":
+        from src import sheets_http
+
+        self._saved_env = os.environ.get("SHEETS_API_BASE")
+        os.environ["SHEETS_API_BASE"] = self.url
+        self._saved = (
+            sheets_http.API_BASE, sheets_http.ScheduledHTTPClient.scheduler,
+            common._gc, mypage.get_synced_store, user_directory_module.user_directory,
+        )
+        sheets_http.API_BASE = self.url
+        sheets_http.ScheduledHTTPClient.scheduler = self.scheduler
+        mypage.get_synced_store = lambda: None
+        user_directory_module.user_directory = UserDirectory()
+        self._reset_pools()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        from src import sheets_http
+
+        (sheets_http.API_BASE, sheets_http.ScheduledHTTPClient.scheduler,
+         common._gc, mypage.get_synced_store, user_directory_module.user_directory) = self._saved
+        if self._saved_env is None:
+            os.environ.pop("SHEETS_API_BASE", None)
+        else:
+            os.environ["SHEETS_API_BASE"] = self._saved_env
+        self._reset_pools(keep_gc=True)
+
+    @staticmethod
+    def _reset_pools(keep_gc: bool = False) -> None:
+        if not keep_gc:
+            common._gc = None
+        common._spreadsheets.clear()
+        common._worksheets.clear()
+        sheet_cache.clear()
+
+
+def run(
+    ops: int = 200,
+    concurrency: int = 8,
+    rounds: int = 50,
+    players: int = 200,
+    latency: float = 0.05,
+    jitter: float = 0.02,
+    stub_per_min: int = 300,
+    bot_per_min: int = 300,
+    error_rate: float = 0.0,
+    mix: dict[str, float] | None = None,
+    seed: int = 0,
+) -> dict:
+    """スタブを起動して負荷試験を実行し、結果の dict を返す。"""
+    from src.sheets_http import ScheduledHTTPClient
+
+    mix = mix or DEFAULT_MIX
+    rng = random.Random(seed)
+    # (コマンド, 引数) を先に決めておく（管理コマンドは新しい回、それ以外はランダムなユーザー）
+    new_rounds = iter(range(rounds + 1, rounds + ops + 1))
+    plan = [
+        (kind, next(new_rounds) if kind in ("announce", "result") else rng.randrange(players))
+        for kind in rng.choices(list(mix), weights=list(mix.values()), k=ops)
+    ]
+
+    stub = SheetsStub(StubConfig(
+        latency=latency, jitter=jitter, read_per_min=stub_per_min, write_per_min=stub_per_min,
+        error_rate=error_rate,
+    ))
+    stub.seed(rounds, players)
+    scheduler = QuotaScheduler(bot_per_min, bot_per_min)
+    samples: dict[str, list[tuple[float, int, bool]]] = {k: [] for k in mix}
+
+    def one(step: tuple[str, int]) -> None:
+        kind, arg = step
+        counter.take()
+        ok = True
+        t0 = time.perf_counter()
+        try:
+            with sheets_priority(_PRIORITY[kind]):
+                if kind == "mypage":
+                    _mypage(arg)
+                elif kind == "register":
+                    _register(arg)
+                elif kind == "announce":
+                    _announce(arg)
+                else:
+                    _result(arg, players)
+        except Exception:
+            ok = False
+        samples[kind].append((time.perf_counter() - t0, counter.take(), ok))
+
+    with StubServer(stub) as server, _BotAgainstStub(server.url, scheduler), \
+            _Counting(ScheduledHTTPClient) as counter:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(one, plan))
+        wall = time.perf_counter() - t0
+        stub_stats = server.call(stub.stats)
+
+    result = {
+        "ops": ops,
+        "concurrency": concurrency,
+        "rounds": rounds,
+        "players": players,
+        "latency": latency,
+        "wall_sec": wall,
+        "ops_per_sec": ops / wall if wall else float("inf"),
+    }
+    for kind, rows in samples.items():
+        lat = sorted(s[0] for s in rows)
+        result[f"{kind}_count"] = len(rows)
+        result[f"{kind}_errors"] = sum(1 for s in rows if not s[2])
+        result[f"{kind}_p50_sec"] = _percentile(lat, 0.5)
+        result[f"{kind}_p95_sec"] = _percentile(lat, 0.95)
+        result[f"{kind}_max_sec"] = lat[-1] if lat else 0.0
+        result[f"{kind}_calls_avg"] = sum(s[1] for s in rows) / len(rows) if rows else 0.0
+
+    sched = scheduler.stats()
+    result.update({
+        "http_requests": sum(stub_stats["calls"].values()),
+        "http_reads": stub_stats["kinds"].get("read", 0),
+        "http_writes": stub_stats["kinds"].get("write", 0),
+        "http_429": stub_stats["errors"].get("429", 0),
+        "injected_errors": stub_stats["injected"],
+        "cells_read": stub_stats["cells_read"],
+        "retries": sched["retries"],
+        "throttled": sched["throttled"],
+        "interactive_wait_max": sched["wait_max_sec"]["interactive"],
+        "admin_wait_max": sched["wait_max_sec"]["admin"],
+        "calls": stub_stats["calls"],
+    })
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sheets を使うコマンドの負荷試験（ローカルスタブ）")
+    parser.add_argument("--ops", type=int, default=200, help="実行するコマンドの総数")
+    parser.add_argument("--concurrency", type=int, default=8, help="同時に実行するコマンド数")
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="スタブの応答遅延（秒）")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--stub-per-min", type=int, default=300, help="スタブのクォータ（件/分、0 で無制限）")
+    parser.add_argument("--bot-per-min", type=int, default=300, help="bot 側スケジューラのクォータ（件/分）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="スタブがランダムに 429 を返す割合")
+    args = parser.parse_args()
+
+    r = run(args.ops, args.concurrency, args.rounds, args.players, args.latency, args.jitter,
+            args.stub_per_min, args.bot_per_min, args.error_rate)
+    print(f"ops={r['ops']} concurrency={r['concurrency']} rounds={r['rounds']} players={r['players']}"
+          f" latency={r['latency'] * 1000:.0f} ms")
+    print(f"  wall: {r['wall_sec']:.2f} s ({r['ops_per_sec']:.1f} ops/s)")
+    for kind in DEFAULT_MIX:
+        if r[f"{kind}_count"]:
+            print(f"  {kind:9s} n={r[f'{kind}_count']:4d}"
+                  f"  p50 {r[f'{kind}_p50_sec'] * 1000:8.1f} ms  p95 {r[f'{kind}_p95_sec'] * 1000:8.1f} ms"
+                  f"  max {r[f'{kind}_max_sec'] * 1000:8.1f} ms  calls/op {r[f'{kind}_calls_avg']:.2f}"
+                  f"  errors {r[f'{kind}_errors']}")
+    print(f"  HTTP: {r['http_requests']} requests (read {r['http_reads']}, write {r['http_writes']}),"
+          f" 429 {r['http_429']}, injected {r['injected_errors']}, cells read {r['cells_read']}")
+    print(f"  scheduler: retries {r['retries']}, throttled {r['throttled']},"
+          f" max wait interactive {r['interactive_wait_max']:.2f} s / admin {r['admin_wait_max']:.2f} s")
+    print(f"  calls: {r['calls']}")
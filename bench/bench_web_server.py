@@ -0,0 +1,177 @@
+# ============================================================
+# bench_web_server.py - マイページ保存・配信スループットのベンチマーク
+# store_page / store_page_data（エンコード・圧縮・重複排除）と、
+# /mypage/{token} 系のハンドラー（_handle_page ほか）の1秒あたりの処理件数を測る。
+# ハンドラーは aiohttp のテストサーバー（127.0.0.1 の空きポート）上で動かす
+#
+# 実行: python -m bench.bench_web_server [--pages 200] [--rows 500] [--requests 2000] [--concurrency 16]
+# ============================================================
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from src import web_server
+from src.generate_table import build_mypage_data, dump_table_data, iter_mypage_table
+from src.web_server import PageStore, create_app
+
+_TITLE = "あなたのねぶかわウィークリー成績一覧"
+
+
+# ============================================================
+# 合成データ
+# ============================================================
+
+def make_history(rows: int, user: int = 0) -> list[dict]:
+    """1人分の /mypage all の成績（build_mypage_data の入力）を生成する。"""
+    return [
+        {
+            "round": i + 1,
+            "title": f"Song Title {i} [ANOTHER]",
+            "course_id": str(10000 + i),
+            "diff": f"★{i % 25}",
+            "rank": (i + user) % 30 + 1,
+            "total": 40,
+            "score": 3000 + (i * 7 + user) % 1000,
+            "rate": round(80 + ((i + user) % 200) / 10, 2),
+            "bpi": round(((i + user) % 100) / 3 - 10, 2),
+        }
+        for i in range(rows)
+    ]
+
+
+def _html_of(data: dict) -> str:
+    """JSON 形式のデータを、従来の HTML 保存と同じ表示の HTML ページにする。"""
+    return "".join(iter_mypage_table(data))
+
+
+# ============================================================
+# 保存
+# ============================================================
+
+def _bench_store(datas: list[dict], db_path: str | None) -> dict:
+    """ユーザーごとのキーで JSON / HTML を保存する速度と、同じ内容の再保存（重複排除）の速度を測る。"""
+    store = PageStore(db_path=db_path)
+    dumps = [dump_table_data(d) for d in datas]
+    htmls = [_html_of(d) for d in datas]
+    n = len(datas)
+
+    t0 = time.perf_counter()
+    for i, body in enumerate(dumps):
+        store.put(body, f"user-{i}", str(i), web_server.JSON_TYPE)
+    t_json = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for i, body in enumerate(dumps):
+        store.put(body, f"user-{i}", str(i), web_server.JSON_TYPE)
+    t_dedup = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for i, body in enumerate(htmls):
+        store.put(body, f"html-{i}")
+    t_html = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for i in range(n):
+        store.lookup(f"user-{i}", str(i))
+    t_lookup = time.perf_counter() - t0
+
+    stats = store.stats()
+    store.close()
+    return {
+        "store_json_per_sec": n / t_json,
+        "store_dedup_per_sec": n / t_dedup,
+        "store_html_per_sec": n / t_html,
+        "lookup_per_sec": n / t_lookup,
+        "json_bytes_avg": sum(len(b.encode("utf-8")) for b in dumps) // n,
+        "html_bytes_avg": sum(len(b.encode("utf-8")) for b in htmls) // n,
+        "store_bytes": stats["bytes"],
+    }
+
+
+# ============================================================
+# 配信
+# ============================================================
+
+async def _drive(client: TestClient, paths: list[str], headers: dict, total: int, concurrency: int) -> float:
+    """paths を順に total 件 GET し（同時に concurrency 件）、1秒あたりの件数を返す。"""
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            async with client.get(paths[i % len(paths)], headers=headers) as resp:
+                await resp.read()
+                assert resp.status in (200, 304), resp.status
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total / (time.perf_counter() - t0)
+
+
+async def _bench_handlers(datas: list[dict], total: int, concurrency: int) -> dict:
+    json_tokens = [web_server.store_page_data(d, f"user-{i}", str(i)) for i, d in enumerate(datas)]
+    html_tokens = [web_server.store_page(_html_of(d), f"html-{i}") for i, d in enumerate(datas)]
+    etag = web_server.page_store.get(json_tokens[0])[0].etag
+
+    br = {"Accept-Encoding": "gzip, deflate, br"}
+    async with TestClient(TestServer(create_app())) as client:
+        return {
+            "shell_rps": await _drive(client, [f"/mypage/{t}" for t in json_tokens], br, total, concurrency),
+            "data_json_rps": await _drive(
+                client, [f"/mypage/{t}/data.json" for t in json_tokens], br, total, concurrency),
+            "html_page_rps": await _drive(client, [f"/mypage/{t}" for t in html_tokens], br, total, concurrency),
+            "not_modified_rps": await _drive(
+                client, [f"/mypage/{json_tokens[0]}/data.json"],
+                {**br, "If-None-Match": f'"{etag}-br"', "Accept-Encoding": "br"}, total, concurrency),
+            # 行ごとに HTML を描画するため件数を減らして測る
+            "table_view_rps": await _drive(
+                client, [f"/mypage/{t}?view=table" for t in json_tokens], br,
+                max(total // 10, concurrency), concurrency),
+        }
+
+
+def run(pages: int = 200, rows: int = 500, requests: int = 2000, concurrency: int = 16, db: bool = False) -> dict:
+    """ベンチマークを実行して結果の dict を返す。db=True では SQLite 併用のストアで測る。"""
+    datas = [build_mypage_data(make_history(rows, u), _TITLE) for u in range(pages)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = f"{tmp}/pages.sqlite3" if db else None
+        result = {"pages": pages, "rows": rows, "db": db, **_bench_store(datas, db_path)}
+
+        # ハンドラーはプロセス共通の page_store を参照するため、計測中だけ差し替える
+        saved = web_server.page_store
+        web_server.page_store = PageStore(db_path=f"{tmp}/serve.sqlite3" if db else None)
+        try:
+            result.update(asyncio.run(_bench_handlers(datas, requests, concurrency)))
+        finally:
+            web_server.page_store.close()
+            web_server.page_store = saved
+    result.update({"requests": requests, "concurrency": concurrency})
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="マイページ保存・配信スループットベンチマーク")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--db", action="store_true", help="SQLite 併用のページストアで測る")
+    args = parser.parse_args()
+
+    r = run(args.pages, args.rows, args.requests, args.concurrency, args.db)
+    print(f"pages={r['pages']} rows={r['rows']} db={r['db']}"
+          f" (json {r['json_bytes_avg'] / 1024:.0f} KiB, html {r['html_bytes_avg'] / 1024:.0f} KiB /page)")
+    print(f"  store_page_data (new)  : {r['store_json_per_sec']:9.1f} pages/s")
+    print(f"  store_page_data (dedup): {r['store_dedup_per_sec']:9.1f} pages/s")
+    print(f"  store_page (html)      : {r['store_html_per_sec']:9.1f} pages/s")
+    print(f"  find_page              : {r['lookup_per_sec']:9.0f} lookups/s")
+    print(f"requests={r['requests']} concurrency={r['concurrency']}")
+    print(f"  GET /mypage/{{token}} (shell)    : {r['shell_rps']:9.1f} req/s")
+    print(f"  GET /mypage/{{token}}/data.json  : {r['data_json_rps']:9.1f} req/s")
+    print(f"  GET /mypage/{{token}} (html)     : {r['html_page_rps']:9.1f} req/s")
+    print(f"  GET data.json (304)            : {r['not_modified_rps']:9.1f} req/s")
+    print(f"  GET /mypage/{{token}}?view=table : {r['table_view_rps']:9.1f} req/s")
@@ -0,0 +1,162 @@
+# ============================================================
+# run_all.py - ベンチマークの一括実行
+# bench/ の各ベンチマークを同じ規模係数で実行し、結果を JSON で出力する。
+# --baseline に以前の JSON を渡すと、時間（*_sec）・Sheets API 呼び出し回数（*_calls_avg, http_requests）が
+# tolerance を超えて増えた指標・スループット（*_per_sec, *_rps）が下がった指標・結果の不一致を
+# 回帰として報告し、終了コード 1 で終わる
+# （旧実装 legacy_* の計測値と、件数の少ないコマンド別レイテンシ *_p50/_p95/_max_sec は比較しない）
+#
+# 実行: python -m bench.run_all [--scale 1.0] [--repeat N] [--only bpi web_server ...]
+#                               [--json results.json] [--baseline base.json] [--tolerance 0.25]
+# ============================================================
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+from bench import (
+    bench_bpi,
+    bench_generate_table,
+    bench_lr2ir_parse,
+    bench_mypage_records,
+    bench_sheets_load,
+    bench_web_server,
+)
+
+
+def _n(base: int, scale: float) -> int:
+    return max(1, int(base * scale))
+
+
+def _benchmarks(scale: float, repeat: int | None) -> dict:
+    """{名前: 引数なしで実行できる関数} を返す。既定の規模に scale を掛ける。"""
+    def rep(default: int) -> int:
+        return default if repeat is None else repeat
+
+    benches = {
+        "bpi": lambda: bench_bpi.run(_n(10_000, scale), rep(5)),
+        "lr2ir_parse": lambda: bench_lr2ir_parse.run(_n(3000, scale), rep(3)),
+        "generate_table": lambda: bench_generate_table.run(_n(500, scale), rep(5)),
+        "mypage_records": lambda: bench_mypage_records.run(_n(500, scale), _n(500, scale), 20, rep(3)),
+        "web_server": lambda: bench_web_server.run(_n(200, scale), 500, _n(2000, scale)),
+        # クォータ待ちではなく bot 側の処理と呼び出し回数を見るため、クォータは十分大きくする
+        "sheets_load": lambda: bench_sheets_load.run(
+            _n(200, scale), 8, 50, 200, latency=0.01, jitter=0.0, stub_per_min=0, bot_per_min=100_000),
+    }
+    # bench/fixtures に置いた LR2IR のランキングページ（同梱なし）はファイルごとに1件のベンチマークとして扱う
+    for path in bench_lr2ir_parse.fixture_paths():
+        name = path.rsplit("/", 1)[-1]
+        benches[f"lr2ir_fixture:{name}"] = (
+            lambda path=path: bench_lr2ir_parse.run_fixtures([path], rep(3))[name]
+        )
+    return benches
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+# ============================================================
+# ベースラインとの比較
+# ============================================================
+
+def _direction(metric: str) -> int:
+    """大きいほど良い指標は 1、小さいほど良い指標は -1、比較しない指標は 0 を返す。"""
+    if metric.startswith("legacy_") or metric.endswith(("_p50_sec", "_p95_sec", "_max_sec")):
+        return 0
+    if metric.endswith(("_per_sec", "_rps")):
+        return 1
+    if metric.endswith(("_sec", "_calls_avg")) or metric == "http_requests":
+        return -1
+    return 0
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """results と baseline の共通の指標を比べ、回帰した指標の説明のリストを返す。"""
+    problems = []
+    for name, metrics in results.items():
+        if metrics.get("same_result") is False:
+            problems.append(f"{name}: 旧実装と結果が一致しません")
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, value in metrics.items():
+            sign = _direction(metric)
+            old = base.get(metric)
+            if not sign or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / old
+            if -sign * change > tolerance:
+                problems.append(f"{name}.{metric}: {old:.6g} → {value:.6g} ({change:+.0%})")
+    return problems
+
+
+# ============================================================
+# エントリポイント
+# ============================================================
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="ベンチマークの一括実行")
+    parser.add_argument("--scale", type=float, default=1.0, help="各ベンチマークの既定の規模に掛ける係数")
+    parser.add_argument("--repeat", type=int, default=None, help="各ベンチマークの繰り返し回数（既定は各ベンチマークの既定値）")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="指定した名前（前方一致）のベンチマークだけ実行する")
+    parser.add_argument("--json", metavar="PATH", help="結果を JSON で書き出す（- で標準出力）")
+    parser.add_argument("--baseline", metavar="PATH", help="比較に使う以前の --json の出力")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="回帰とみなす変化率（既定 0.25 = 25%%）")
+    args = parser.parse_args(argv)
+
+    benches = _benchmarks(args.scale, args.repeat)
+    if args.only:
+        benches = {k: v for k, v in benches.items() if k.startswith(tuple(args.only))}
+
+    log = sys.stderr if args.json == "-" else sys.stdout
+    results = {}
+    for name, fn in benches.items():
+        t0 = time.perf_counter()
+        results[name] = fn()
+        print(f"{name}: {time.perf_counter() - t0:.1f} s", file=log)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scale": args.scale,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.json == "-":
+        print(text)
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        for name, metrics in results.items():
+            print(f"[{name}]")
+            for metric, value in metrics.items():
+                print(f"  {metric}: {value:.6g}" if isinstance(value, float) else f"  {metric}: {value}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        problems = compare(results, baseline, args.tolerance)
+        for p in problems:
+            print(f"回帰: {p}", file=log)
+        if problems:
+            return 1
+        print(f"ベースラインからの回帰なし（許容 {args.tolerance:.0%}）", file=log)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
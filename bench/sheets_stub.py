@@ -0,0 +1,641 @@
+# ============================================================
+# sheets_stub.py - Google Sheets API のローカルスタブ
+# gspread（bot が使う範囲）が呼ぶ Sheets v4 / Drive v3 のエンドポイントをメモリ上のシートで実装し、
+# 応答の遅延・1分あたりのクォータ（超過時 429）・エラーの注入を設定できる。
+# bot は SHEETS_API_BASE にこのサーバーの URL を設定すると、認証なしでこちらに接続する。
+#
+# 実装しているエンドポイント:
+#   GET  /v4/spreadsheets/{id}                       メタデータ（タブ一覧）
+#   POST /v4/spreadsheets/{id}:batchUpdate           addSheet / updateCells
+#   GET  /v4/spreadsheets/{id}/values/{range}        values.get
+#   PUT  /v4/spreadsheets/{id}/values/{range}        values.update
+#   POST /v4/spreadsheets/{id}/values/{range}:append values.append
+#   GET  /v4/spreadsheets/{id}/values:batchGet       values.batchGet
+#   POST /v4/spreadsheets/{id}/values:batchUpdate    values.batchUpdate
+#   GET  /drive/v3/files/{id}                        Drive のファイル情報（modifiedTime は書き込みのたびに進む）
+# 管理用:
+#   GET  /_stub/stats   呼び出し件数・429 件数など     POST /_stub/reset   統計のリセット
+#   POST /_stub/config  遅延・クォータ等の変更（JSON）  POST /_stub/fail    次の N 件を指定ステータスで失敗させる
+#
+# 実行: python -m bench.sheets_stub [--port 8765] [--latency 0.1] [--read-per-min 60] [--rounds 50] [--players 200]
+# ============================================================
+
+import argparse
+import asyncio
+import collections
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass
+from urllib.parse import unquote
+
+from aiohttp import web
+
+# 既定のスプレッドシート ID（--rounds / --players で合成データを入れる）
+MAIN_ID = "stub-main"
+SCORE_ID = "stub-result"
+
+
+@dataclass
+class StubConfig:
+    """スタブの挙動。/_stub/config で実行中に変更できる。"""
+    latency: float = 0.0          # 1リクエストごとの基本の遅延（秒）
+    jitter: float = 0.0           # 遅延に加える一様乱数の幅（秒）
+    read_per_min: int = 0         # 読み込みの1分あたりの上限（0 で無制限）
+    write_per_min: int = 0        # 書き込みの1分あたりの上限（0 で無制限）
+    error_rate: float = 0.0       # ランダムに失敗させる割合
+    error_status: int = 429       # ランダムに失敗させるときのステータス
+    retry_after: float | None = None  # 429 に付ける Retry-After（秒）
+
+
+# ============================================================
+# A1 表記
+# ============================================================
+
+_RANGE_RE = re.compile(r"^(?:'((?:[^']|'')+)'|([^!]+))(?:!(.*))?$")
+_CELL_RE = re.compile(r"^([A-Za-z]*)(\d*)$")
+
+
+def col_index(letters: str) -> int:
+    """列名（A, Z, AA ...）を 0 始まりの列番号にする。"""
+    n = 0
+    for ch in letters.upper():
+        n = n * 26 + ord(ch) - ord("A") + 1
+    return n - 1
+
+
+def col_letters(index: int) -> str:
+    """0 始まりの列番号を列名にする。"""
+    s = ""
+    index += 1
+    while index:
+        index, r = divmod(index - 1, 26)
+        s = chr(ord("A") + r) + s
+    return s
+
+
+def _parse_cell(ref: str) -> tuple[int | None, int | None]:
+    """"B5" → (行 4, 列 1)。"B" や "5" のように省略された部分は None。"""
+    m = _CELL_RE.match(ref.strip())
+    if m is None or not ref.strip():
+        raise ValueError(ref)
+    letters, digits = m.groups()
+    return (int(digits) - 1 if digits else None, col_index(letters) if letters else None)
+
+
+class _Grid:
+    """A1 範囲を 0 始まりの (行, 列) の矩形にしたもの。None は端まで。"""
+
+    def __init__(self, title: str, r0, c0, r1, c1):
+        self.title, self.r0, self.c0, self.r1, self.c1 = title, r0, c0, r1, c1
+
+
+# ============================================================
+# シート
+# ============================================================
+
+class _Sheet:
+    def __init__(self, sheet_id: int, title: str, index: int, rows: int = 1000, cols: int = 26):
+        self.sheet_id = sheet_id
+        self.title = title
+        self.index = index
+        self.row_count = rows
+        self.col_count = cols
+        self.values: list[list] = []
+
+    def properties(self) -> dict:
+        return {
+            "sheetId": self.sheet_id,
+            "title": self.title,
+            "index": self.index,
+            "sheetType": "GRID",
+            "gridProperties": {"rowCount": self.row_count, "columnCount": self.col_count},
+        }
+
+    def write(self, r0: int, c0: int, values: list[list]) -> None:
+        """(r0, c0) を左上として値を書き込む（グリッドは必要に応じて広げる）。"""
+        for i, row in enumerate(values):
+            r = r0 + i
+            while len(self.values) <= r:
+                self.values.append([])
+            line = self.values[r]
+            if len(line) < c0 + len(row):
+                line.extend([None] * (c0 + len(row) - len(line)))
+            line[c0:c0 + len(row)] = row
+        self.row_count = max(self.row_count, r0 + len(values))
+        self.col_count = max(self.col_count, c0 + max((len(r) for r in values), default=0))
+
+    def last_row(self, c0: int, c1: int | None) -> int:
+        """列 c0..c1 に値がある最後の行の次の行番号（0 始まり）を返す。"""
+        for r in range(len(self.values) - 1, -1, -1):
+            cells = self.values[r][c0:None if c1 is None else c1 + 1]
+            if any(v not in (None, "") for v in cells):
+                return r + 1
+        return 0
+
+
+def _rfc3339(t: float) -> str:
+    """UNIX 時刻を Drive API と同じ形式（例: 2024-01-01T00:00:00.000Z）にする。"""
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(t)) + f".{int(t * 1000) % 1000:03d}Z"
+
+
+class _Spreadsheet:
+    def __init__(self, spreadsheet_id: str, title: str):
+        self.id = spreadsheet_id
+        self.title = title
+        self.sheets: dict[str, _Sheet] = {}
+        self._next_id = 0
+        self.created = self.modified = time.time()
+
+    def touch(self) -> None:
+        """書き込みのたびに更新日時（Drive の modifiedTime）を進める（同じミリ秒でも必ず変える）。"""
+        self.modified = max(time.time(), self.modified + 0.001)
+
+    def add_sheet(self, title: str, sheet_id: int | None = None, rows: int = 1000, cols: int = 26) -> _Sheet:
+        if sheet_id is None:
+            sheet_id = self._next_id
+        self._next_id = max(self._next_id, sheet_id) + 1
+        sheet = self.sheets[title] = _Sheet(sheet_id, title, len(self.sheets), rows, cols)
+        return sheet
+
+    def by_id(self, sheet_id: int) -> _Sheet | None:
+        return next((s for s in self.sheets.values() if s.sheet_id == sheet_id), None)
+
+    def grid(self, a1: str) -> _Grid:
+        """A1 表記の範囲を _Grid にする。タブが存在しない・解析できない場合は ValueError。"""
+        m = _RANGE_RE.match(a1)
+        if m is None:
+            raise ValueError(a1)
+        quoted, bare, cells = m.groups()
+        title = quoted.replace("''", "'") if quoted is not None else bare
+        if cells is None and quoted is None and title not in self.sheets:
+            # シート名なしのセル範囲（例: "A1:B2"）は先頭のタブ
+            title, cells = next(iter(self.sheets), ""), title
+        if title not in self.sheets:
+            raise ValueError(a1)
+        if not cells:
+            return _Grid(title, 0, 0, None, None)
+        start, _, end = cells.partition(":")
+        r0, c0 = _parse_cell(start)
+        r1, c1 = _parse_cell(end) if end else (r0, c0)
+        return _Grid(title, r0 or 0, c0 or 0, r1, c1)
+
+    def metadata(self) -> dict:
+        return {
+            "spreadsheetId": self.id,
+            "properties": {"title": self.title, "locale": "ja_JP", "timeZone": "Asia/Tokyo"},
+            "sheets": [{"properties": s.properties()} for s in self.sheets.values()],
+        }
+
+
+# ============================================================
+# 値の変換
+# ============================================================
+
+def _formatted(v):
+    """FORMATTED_VALUE での表示（Sheets と同じく文字列で返す）。"""
+    if isinstance(v, bool):
+        return "TRUE" if v else "FALSE"
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+def _user_entered(v):
+    """valueInputOption=USER_ENTERED と同様に、数値に見える文字列を数値として保存する。"""
+    if isinstance(v, str):
+        s = v.strip()
+        try:
+            return int(s) if re.fullmatch(r"-?\d+", s) else float(s)
+        except ValueError:
+            return v
+    return v
+
+
+def _cell_value(cell: dict):
+    """updateCells の CellData から値を取り出す。"""
+    uev = cell.get("userEnteredValue") or {}
+    for k in ("stringValue", "numberValue", "boolValue", "formulaValue"):
+        if k in uev:
+            return uev[k]
+    return None
+
+
+def _render(sheet: _Sheet, g: _Grid, render: str, major: str) -> list[list]:
+    """範囲の値を API と同じ形（末尾の空セル・空行を詰める）で返す。"""
+    rows = sheet.values[g.r0:None if g.r1 is None else g.r1 + 1]
+    out = []
+    for row in rows:
+        cells = row[g.c0:None if g.c1 is None else g.c1 + 1]
+        cells = ["" if v is None else (v if render == "UNFORMATTED_VALUE" else _formatted(v)) for v in cells]
+        while cells and cells[-1] == "":
+            cells.pop()
+        out.append(cells)
+    while out and not out[-1]:
+        out.pop()
+    if major == "COLUMNS":
+        width = max((len(r) for r in out), default=0)
+        out = [[r[c] if c < len(r) else "" for r in out] for c in range(width)]
+    return out
+
+
+def _a1(g: _Grid, rows: int, cols: int) -> str:
+    """書き込んだ・返した矩形の A1 表記。"""
+    title = "'" + g.title.replace("'", "''") + "'"
+    if rows == 0 or cols == 0:
+        return f"{title}!{col_letters(g.c0)}{g.r0 + 1}"
+    return f"{title}!{col_letters(g.c0)}{g.r0 + 1}:{col_letters(g.c0 + cols - 1)}{g.r0 + rows}"
+
+
+# ============================================================
+# スタブ本体
+# ============================================================
+
+class _ApiError(Exception):
+    def __init__(self, status: int, message: str, reason: str, headers: dict | None = None):
+        self.status, self.message, self.reason, self.headers = status, message, reason, headers or {}
+
+
+class SheetsStub:
+    """
+    メモリ上のスプレッドシートと、遅延・クォータ・エラー注入の設定を持つ Sheets API スタブ。
+    aiohttp のイベントループ上でのみ状態を変更する（ロックなし）。
+    """
+
+    def __init__(self, config: StubConfig | None = None):
+        self.config = config or StubConfig()
+        self.spreadsheets: dict[str, _Spreadsheet] = {}
+        self._windows = {"read": collections.deque(), "write": collections.deque()}
+        self._forced: list[tuple[str | None, int]] = []   # /_stub/fail で積んだ (kind, status)
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.calls: collections.Counter = collections.Counter()
+        self.kinds: collections.Counter = collections.Counter()
+        self.errors: collections.Counter = collections.Counter()
+        self.throttled = 0
+        self.injected = 0
+        self.cells_read = 0
+        self.cells_written = 0
+
+    def stats(self) -> dict:
+        return {
+            "calls": dict(self.calls),
+            "kinds": dict(self.kinds),
+            "errors": {str(k): v for k, v in self.errors.items()},
+            "throttled": self.throttled,
+            "injected": self.injected,
+            "cells_read": self.cells_read,
+            "cells_written": self.cells_written,
+            "config": asdict(self.config),
+        }
+
+    # ---- データ ----
+
+    def add_spreadsheet(self, spreadsheet_id: str, title: str, tabs: dict[str, list[list]]) -> _Spreadsheet:
+        """タブ名 → 値（先頭行はヘッダー）でスプレッドシートを登録する。"""
+        sh = self.spreadsheets[spreadsheet_id] = _Spreadsheet(spreadsheet_id, title)
+        for name, values in tabs.items():
+            sheet = sh.add_sheet(name, rows=max(len(values), 100))
+            sheet.write(0, 0, values)
+        return sh
+
+    def seed(self, rounds: int, players: int, main_id: str = MAIN_ID, score_id: str = SCORE_ID) -> None:
+        """CourseData・UserData（main_id）と回ごとの結果タブ（score_id）の合成データを入れる。"""
+        course = [["回", "diff", "title", "CourseID"]]
+        course += [[r, f"★{r % 25}", f"Song {r} [ANOTHER]", 10000 + r] for r in range(1, rounds + 1)]
+        users = [["DiscordID", "LR2ID"]] + [[str(900000000000 + p), str(100000 + p)] for p in range(players)]
+        self.add_spreadsheet(main_id, "NebukawaIR", {"CourseData": course, "UserData": users})
+
+        header = ["Rank", "LR2ID", "PlayerName", "Score", "Score Rate (%)", "BPI"]
+        tabs = {}
+        for r in range(1, rounds + 1):
+            n = players - (r % 5) * players // 10
+            offset = r * 7 % players
+            tabs[str(r)] = [header] + [
+                [rank, str(100000 + (offset + rank * 13) % players), f"player{(offset + rank * 13) % players}",
+                 4000 - rank, round(95 - rank / n * 10, 2), round(50 - rank / n * 60, 2)]
+                for rank in range(1, n + 1)
+            ]
+        self.add_spreadsheet(score_id, "NebukawaIR(result)", tabs)
+
+    def _spreadsheet(self, spreadsheet_id: str) -> _Spreadsheet:
+        sh = self.spreadsheets.get(spreadsheet_id)
+        if sh is None:
+            raise _ApiError(404, "Requested entity was not found.", "NOT_FOUND")
+        return sh
+
+    def _grid(self, sh: _Spreadsheet, a1: str) -> _Grid:
+        try:
+            return sh.grid(a1)
+        except ValueError:
+            raise _ApiError(400, f"Unable to parse range: {a1}", "INVALID_ARGUMENT")
+
+    # ---- クォータ・エラー注入 ----
+
+    def _admit(self, kind: str) -> None:
+        """クォータ・注入エラーを判定し、失敗させる場合は _ApiError を送出する。"""
+        now = time.monotonic()
+        for i, (k, status) in enumerate(self._forced):
+            if k in (None, kind):
+                del self._forced[i]
+                self.injected += 1
+                raise self._error_for(status, kind)
+        cfg = self.config
+        if cfg.error_rate and random.random() < cfg.error_rate:
+            self.injected += 1
+            raise self._error_for(cfg.error_status, kind)
+
+        limit = cfg.read_per_min if kind == "read" else cfg.write_per_min
+        if limit:
+            window = self._windows[kind]
+            while window and window[0] <= now - 60:
+                window.popleft()
+            if len(window) >= limit:
+                self.throttled += 1
+                raise self._error_for(429, kind)
+            window.append(now)
+
+    def _error_for(self, status: int, kind: str) -> _ApiError:
+        if status == 429:
+            metric = "Read requests" if kind == "read" else "Write requests"
+            headers = {"Retry-After": str(self.config.retry_after)} if self.config.retry_after else None
+            return _ApiError(
+                429,
+                f"Quota exceeded for quota metric '{metric}' and limit '{metric} per minute per user' "
+                "of service 'sheets.googleapis.com'.",
+                "RESOURCE_EXHAUSTED",
+                headers,
+            )
+        if status >= 500:
+            return _ApiError(status, "The service is currently unavailable.", "UNAVAILABLE")
+        return _ApiError(status, "Injected error.", "FAILED_PRECONDITION")
+
+    # ---- エンドポイント ----
+
+    def values_get(self, sh: _Spreadsheet, a1: str, query) -> dict:
+        g = self._grid(sh, a1)
+        values = _render(sh.sheets[g.title], g, query.get("valueRenderOption", "FORMATTED_VALUE"),
+                         query.get("majorDimension", "ROWS"))
+        self.cells_read += sum(len(r) for r in values)
+        body = {"range": _a1(g, len(values), max((len(r) for r in values), default=0)),
+                "majorDimension": query.get("majorDimension", "ROWS")}
+        if values:
+            body["values"] = values
+        return body
+
+    def values_update(self, sh: _Spreadsheet, a1: str, values: list[list], input_option: str) -> dict:
+        g = self._grid(sh, a1)
+        if input_option == "USER_ENTERED":
+            values = [[_user_entered(v) for v in row] for row in values]
+        sh.sheets[g.title].write(g.r0, g.c0, values)
+        sh.touch()
+        cols = max((len(r) for r in values), default=0)
+        self.cells_written += sum(len(r) for r in values)
+        return {
+            "spreadsheetId": sh.id,
+            "updatedRange": _a1(g, len(values), cols),
+            "updatedRows": len(values),
+            "updatedColumns": cols,
+            "updatedCells": sum(len(r) for r in values),
+        }
+
+    def values_append(self, sh: _Spreadsheet, a1: str, values: list[list], input_option: str) -> dict:
+        g = self._grid(sh, a1)
+        sheet = sh.sheets[g.title]
+        start = sheet.last_row(g.c0, g.c1)
+        table = _a1(_Grid(g.title, 0, g.c0, None, None), start, max(1, (g.c1 or g.c0) - g.c0 + 1))
+        updates = self.values_update(sh, _a1(_Grid(g.title, start, g.c0, None, None), 0, 0), values, input_option)
+        return {"spreadsheetId": sh.id, "tableRange": table, "updates": updates}
+
+    def batch_update(self, sh: _Spreadsheet, requests: list[dict]) -> dict:
+        """addSheet と updateCells を処理する（その他のリクエストは空の応答を返す）。"""
+        replies = []
+        for i, req in enumerate(requests):
+            if "addSheet" in req:
+                props = req["addSheet"].get("properties", {})
+                title = props.get("title") or f"Sheet{len(sh.sheets) + 1}"
+                if title in sh.sheets:
+                    raise _ApiError(
+                        400,
+                        f'Invalid requests[{i}].addSheet: A sheet with the name "{title}" already exists. '
+                        "Please enter another name.",
+                        "INVALID_ARGUMENT",
+                    )
+                grid = props.get("gridProperties", {})
+                sheet = sh.add_sheet(title, props.get("sheetId"), grid.get("rowCount", 1000),
+                                     grid.get("columnCount", 26))
+                replies.append({"addSheet": {"properties": sheet.properties()}})
+            elif "updateCells" in req:
+                uc = req["updateCells"]
+                start = uc.get("start", {})
+                sheet = sh.by_id(start.get("sheetId", 0))
+                if sheet is None:
+                    raise _ApiError(400, f"Invalid requests[{i}].updateCells: No grid with id", "INVALID_ARGUMENT")
+                values = [[_cell_value(c) for c in row.get("values", [])] for row in uc.get("rows", [])]
+                sheet.write(start.get("rowIndex", 0), start.get("columnIndex", 0), values)
+                self.cells_written += sum(len(r) for r in values)
+                replies.append({})
+            else:
+                replies.append({})
+        sh.touch()
+        return {"spreadsheetId": sh.id, "replies": replies}
+
+    # ---- HTTP ----
+
+    def _route(self, request: web.Request, body: dict | None):
+        """(呼び出し名, 種別, 処理) を返す。処理は応答の dict を返す関数。"""
+        path = unquote(request.rel_url.raw_path)
+        method = request.method
+        q = request.query
+
+        m = re.match(r"^/drive/v3/files/([^/]+)$", path)
+        if m and method == "GET":
+            sh = self._spreadsheet(m.group(1))
+            return "drive.files.get", "read", lambda: {
+                "id": sh.id, "name": sh.title,
+                "createdTime": _rfc3339(sh.created), "modifiedTime": _rfc3339(sh.modified),
+            }
+
+        m = re.match(r"^/v4/spreadsheets/([^/:]+)(.*)$", path)
+        if m is None:
+            raise _ApiError(404, f"Unknown endpoint: {method} {path}", "NOT_FOUND")
+        sh = self._spreadsheet(m.group(1))
+        rest = m.group(2)
+
+        if rest == "" and method == "GET":
+            return "spreadsheets.get", "read", sh.metadata
+        if rest == ":batchUpdate" and method == "POST":
+            return "spreadsheets.batchUpdate", "write", lambda: self.batch_update(sh, body.get("requests", []))
+        if rest == "/values:batchGet" and method == "GET":
+            def batch_get():
+                ranges = [self.values_get(sh, a1, q) for a1 in q.getall("ranges", [])]
+                return {"spreadsheetId": sh.id, "valueRanges": ranges}
+            return "values.batchGet", "read", batch_get
+        if rest == "/values:batchUpdate" and method == "POST":
+            def batch_update_values():
+                opt = body.get("valueInputOption", "RAW")
+                responses = [self.values_update(sh, d["range"], d.get("values", []), opt) for d in body.get("data", [])]
+                return {
+                    "spreadsheetId": sh.id,
+                    "totalUpdatedRows": sum(r["updatedRows"] for r in responses),
+                    "totalUpdatedColumns": max((r["updatedColumns"] for r in responses), default=0),
+                    "totalUpdatedCells": sum(r["updatedCells"] for r in responses),
+                    "totalUpdatedSheets": len({r["updatedRange"].rsplit("!", 1)[0] for r in responses}),
+                    "responses": responses,
+                }
+            return "values.batchUpdate", "write", batch_update_values
+        if rest.startswith("/values/"):
+            a1 = rest[len("/values/"):]
+            opt = q.get("valueInputOption", "RAW")
+            if a1.endswith(":append") and method == "POST":
+                return "values.append", "write", lambda: self.values_append(
+                    sh, a1[:-len(":append")], body.get("values", []), opt)
+            if method == "GET":
+                return "values.get", "read", lambda: self.values_get(sh, a1, q)
+            if method == "PUT":
+                return "values.update", "write", lambda: self.values_update(sh, a1, body.get("values", []), opt)
+        raise _ApiError(404, f"Unknown endpoint: {method} {path}", "NOT_FOUND")
+
+    async def handle(self, request: web.Request) -> web.Response:
+        cfg = self.config
+        if cfg.latency or cfg.jitter:
+            await asyncio.sleep(cfg.latency + random.uniform(0, cfg.jitter))
+        try:
+            body = await request.json() if request.can_read_body else None
+            name, kind, fn = self._route(request, body or {})
+            self.calls[name] += 1
+            self.kinds[kind] += 1
+            self._admit(kind)
+            return web.json_response(fn())
+        except _ApiError as e:
+            self.errors[e.status] += 1
+            return web.json_response(
+                {"error": {"code": e.status, "message": e.message, "status": e.reason}},
+                status=e.status,
+                headers=e.headers,
+            )
+
+    # ---- 管理用 ----
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    async def handle_reset(self, request: web.Request) -> web.Response:
+        self.reset_stats()
+        return web.json_response(self.stats())
+
+    async def handle_config(self, request: web.Request) -> web.Response:
+        for k, v in (await request.json()).items():
+            if not hasattr(self.config, k):
+                raise web.HTTPBadRequest(text=f"unknown config: {k}")
+            setattr(self.config, k, v)
+        return web.json_response(asdict(self.config))
+
+    async def handle_fail(self, request: web.Request) -> web.Response:
+        """{"status": 429, "count": 5, "kind": "read"} で次の count 件を status で失敗させる。"""
+        spec = await request.json()
+        self._forced += [(spec.get("kind"), int(spec.get("status", 429)))] * int(spec.get("count", 1))
+        return web.json_response({"pending": len(self._forced)})
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_get("/_stub/stats", self.handle_stats)
+        app.router.add_post("/_stub/reset", self.handle_reset)
+        app.router.add_post("/_stub/config", self.handle_config)
+        app.router.add_post("/_stub/fail", self.handle_fail)
+        app.router.add_route("*", "/{tail:.*}", self.handle)
+        return app
+
+
+# ============================================================
+# 起動
+# ============================================================
+
+class StubServer:
+    """スタブを別スレッドのイベントループで動かす（ベンチマーク・負荷試験からの利用向け）。"""
+
+    def __init__(self, stub: SheetsStub, host: str = "127.0.0.1", port: int = 0):
+        self.stub = stub
+        self.host = host
+        self.port = port
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="sheets-stub", daemon=True)
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def _start(self) -> None:
+        self._runner = web.AppRunner(self.stub.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def call(self, fn, *args):
+        """スタブの状態をイベントループのスレッドで操作して結果を返す（例: server.call(stub.stats)）。"""
+        async def run():
+            return fn(*args)
+        return asyncio.run_coroutine_threadsafe(run(), self._loop).result()
+
+    def stop(self) -> None:
+        if self._runner is not None:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def _load_data(stub: SheetsStub, path: str) -> None:
+    """{スプレッドシート ID: {タブ名: [[...], ...]}} の JSON を読み込む。"""
+    with open(path, encoding="utf-8") as f:
+        for spreadsheet_id, tabs in json.load(f).items():
+            stub.add_spreadsheet(spreadsheet_id, spreadsheet_id, tabs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Google Sheets API のローカルスタブ")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="1リクエストごとの遅延（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="遅延に加える乱数の幅（秒）")
+    parser.add_argument("--read-per-min", type=int, default=0, help="読み込みの上限（件/分、0 で無制限）")
+    parser.add_argument("--write-per-min", type=int, default=0, help="書き込みの上限（件/分、0 で無制限）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="ランダムに失敗させる割合")
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--retry-after", type=float, default=None, help="429 に付ける Retry-After（秒）")
+    parser.add_argument("--rounds", type=int, default=50, help="合成データの回数（0 で入れない）")
+    parser.add_argument("--players", type=int, default=200, help="合成データの参加者数")
+    parser.add_argument("--data", metavar="PATH", help="{ID: {タブ名: 値}} の JSON を読み込む")
+    args = parser.parse_args()
+
+    stub = SheetsStub(StubConfig(
+        latency=args.latency, jitter=args.jitter,
+        read_per_min=args.read_per_min, write_per_min=args.write_per_min,
+        error_rate=args.error_rate, error_status=args.error_status, retry_after=args.retry_after,
+    ))
+    if args.rounds:
+        stub.seed(args.rounds, args.players)
+    if args.data:
+        _load_data(stub, args.data)
+
+    print(f"SHEETS_API_BASE=http://{args.host}:{args.port}")
+    if args.rounds:
+        print(f"MAIN_ID={MAIN_ID}")
+        print(f"SCORE_ID={SCORE_ID}")
+    web.run_app(stub.app(), host=args.host, port=args.port, print=None, access_log=None)
@@ -3,39 +3,54 @@
 # LR2IR を利用したランキング管理・BPI計算 Discord Bot
 # ============================================================
 
+import time
+_STARTUP_T0 = time.perf_counter()  # 起動時間の計測開始（import より先に取る）
+
 import os
 import re
 import json
 import asyncio
+import importlib
 from datetime import datetime, timedelta
 import logging
 
 import discord
-import gspread
-import gspread_asyncio
-import numpy as np
-import pandas as pd
-import requests
 from discord import app_commands, ui, Interaction, Embed
 from discord.ext import commands
 from dotenv import load_dotenv
-from pandas import DataFrame
-from google.oauth2.service_account import Credentials
+
+# .env ファイルから環境変数を読み込む
+# （src 配下のモジュールが環境変数を参照するため、自作モジュールの import より先に行う）
+load_dotenv()
 
 from src.mypage import (
     load_course_meta_map_sync,
     _fetch_user_record_one_round_sync,
     _fetch_user_records_all_rounds_sync,
     _get_lr2id_by_discord_sync,
+    mypage_fingerprint,
 )
 from src.result import build_id_to_name_from_sheet
-from src.generate_table import generate_bootstrap_html_table
-from src.common import safe_defer, _authorize_gc
-from src.web_server import store_page, start_web_server
-from src import lr2ir  # fetch_lr2_ranking を含む自作モジュール
-
-# .env ファイルから環境変数を読み込む
-load_dotenv()
+from src.generate_table import build_mypage_data
+from src.common import safe_defer
+from src.bpi import calculate_bpi, calculate_bpi_array, extract_own_scores, BPI_FLOOR
+from src.catalog import SongCatalog
+from src.song_search import SongSearchIndex
+from src.sheet_cache import cached_records, COURSE_DATA_TTL
+from src.web_server import find_page, store_page_data, start_web_server
+from src import lr2ir  # fetch_lr2_ranking_async を含む自作モジュール
+from src.score_store import get_score_store, get_synced_store
+from src.score_sync import full_sync_sync, incremental_sync_sync, record_result_write_sync
+from src.sheet_writer import upsert_keyed_row_sync, write_tab_values_sync
+from src.sheets_scheduler import Priority, run_sheets_io, sheets_scheduler_stats
+from src.user_directory import refresh_user_directory_sync, user_directory
+
+# 起動の各段階の経過時間（段階名, 起動からの秒数）。on_ready で一覧を出力する
+_startup_marks: list[tuple[str, float]] = [("imports", time.perf_counter() - _STARTUP_T0)]
+
+
+def _mark_startup(name: str) -> None:
+    _startup_marks.append((name, time.perf_counter() - _STARTUP_T0))
 
 # ============================================================
 # ログ設定
@@ -66,53 +81,35 @@ COURSE_WS = "CourseData"            # コースデータタブ
 COURSE_JSON_PATH = 'course_id.json'
 SCORETA_CATEGORY_NAME = "開催中のスコアタ"  # 告知チャンネルを作成するカテゴリー名
 ANNOUNCE_CHANNEL_NAME = os.environ.get("ANNOUNCE_CHANNEL", "一般")  # @everyone告知を投稿するチャンネル名
-
-# insane_scores.csv を読み込み、表示用ラベル列を追加
-insane_scores = pd.read_csv('insane_scores.csv')
-insane_scores["label"] = insane_scores.apply(
-    lambda row: f"★{row['level']} {row['title']}", axis=1
-)
+SCORE_SYNC_INTERVAL = float(os.environ.get("SCORE_SYNC_INTERVAL", "300"))  # 成績ストアの差分同期の間隔（秒）
+SCORE_FULL_SYNC_INTERVAL = float(os.environ.get("SCORE_FULL_SYNC_INTERVAL", "86400"))  # 全体同期の間隔（秒）
+USER_DIRECTORY_REFRESH = float(os.environ.get("USER_DIRECTORY_REFRESH", "300"))  # UserData 対応表の読み直し間隔（秒）
+
+# insane_scores.csv を読み込み、BMSID / md5 / ラベルで引ける楽曲カタログを構築
+# （CSV が変わっていなければバイナリのスナップショットから読み込む。空文字でスナップショットを使わない）
+song_catalog = SongCatalog.load('insane_scores.csv', os.environ.get("CATALOG_SNAPSHOT", "insane_scores.catalog.npz"))
+_mark_startup(f"catalog ({song_catalog.source})")
+# /bpi オートコンプリート用の曲名検索インデックス
+song_index = SongSearchIndex.from_catalog(song_catalog)
+_mark_startup("song index")
+
+# 起動時には読み込まず、ゲートウェイ接続と並行してバックグラウンドで import するモジュール
+# （初回の /result・Sheets アクセスで待たないよう先読みする）
+_PREWARM_MODULES = ("pandas", "gspread", "google.oauth2.service_account", "src.sheets_http")
 
 # Bot の初期化
-intents = discord.Intents.default()
-bot = commands.Bot(command_prefix='!', intents=intents)
-
-# ============================================================
-# 認証・Google Sheets ユーティリティ
-# ============================================================
+class IRBot(commands.Bot):
+    """終了時に LR2IR 取得用の共有 HTTP セッションも閉じる Bot。"""
 
-def _create_async_creds() -> Credentials:
-    """gspread_asyncio 用の非同期認証情報を生成して返す。"""
-    sa_info = json.loads(os.environ["GCP_SA_JSON"])
-    scopes = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive",
-    ]
-    return Credentials.from_service_account_info(sa_info, scopes=scopes)
-
-
-def _get_or_create_ws(sh, title: str, rows: int, cols: int):
-    """指定タイトルのワークシートを取得し、存在しなければ新規作成して返す。"""
-    try:
-        return sh.worksheet(title)
-    except gspread.WorksheetNotFound:
-        return sh.add_worksheet(title=title, rows=rows, cols=max(6, cols))
+    async def close(self) -> None:
+        try:
+            await super().close()
+        finally:
+            await lr2ir.close_session()
 
 
-def _open_or_create_ws_by_name(spreadsheet_id: str, ws_title: str):
-    """
-    スプレッドシートIDとタブ名を指定してワークシートを開く。
-    存在しない場合は CourseData 用ヘッダーで新規作成する。
-    """
-    HEADERS = ["回", "diff", "title", "CourseID"]
-    gc = _authorize_gc()
-    sh = gc.open_by_key(spreadsheet_id)
-    try:
-        ws = sh.worksheet(ws_title)
-    except gspread.WorksheetNotFound:
-        ws = sh.add_worksheet(title=ws_title, rows=100, cols=len(HEADERS))
-        ws.update("A1", [HEADERS])
-    return ws
+intents = discord.Intents.default()
+bot = IRBot(command_prefix='!', intents=intents)
 
 # ============================================================
 # データ操作ユーティリティ
@@ -164,37 +161,22 @@ def _parse_score(score_text: str):
     return own, rate
 
 # ============================================================
-# BPI 計算
+# スプレッドシート書き込み
 # ============================================================
 
-def pgf(x, m):
-    """BPI 計算用のスコア変換関数。"""
-    if x == 1:
-        return m
-    return 0.5 / (1 - x)
-
-
-def calculate_bpi(s, k, z, m, p) -> float:
+def _store_write(fn) -> None:
     """
-    単曲 BPI を計算して返す。
-    s: 自スコア, k: 平均スコア, z: トップスコア, m: 理論値, p: 補正係数
+    Sheets への書き込み成功後、ローカル成績ストアにも同じ内容を反映する。
+    ストアが無効なら何もしない。失敗しても Sheets 側は正本なのでログだけ残す。
     """
-    S = pgf(s / m, m)
-    K = pgf(k / m, m)
-    Z = pgf(z / m, m)
-    S_prime = S / K
-    Z_prime = Z / K
-
-    if s >= k:
-        return float(round(100 * (np.log(S_prime) ** p) / (np.log(Z_prime) ** p), 2))
-    else:
-        return float(round(
-            max(-100 * ((np.abs(np.log(S_prime)) ** p) / (np.log(Z_prime) ** p)), -15), 2
-        ))
+    store = get_score_store()
+    if store is None:
+        return
+    try:
+        fn(store)
+    except Exception:
+        logging.getLogger(__name__).exception("成績ストアへの反映に失敗しました")
 
-# ============================================================
-# スプレッドシート書き込み
-# ============================================================
 
 def upsert_course_row(
     spreadsheet_id: str,
@@ -209,27 +191,35 @@ def upsert_course_row(
     戻り値: "updated" or "inserted"
     """
     HEADERS = ["回", "diff", "title", "CourseID"]
-    ws = _open_or_create_ws_by_name(spreadsheet_id, worksheet_title)
+    # A列（回）で行を探して上書き、なければ末尾に追加（タブがなければヘッダーごと作成）
+    result = upsert_keyed_row_sync(
+        spreadsheet_id, worksheet_title, HEADERS, [round_no, diff, title, course_id]
+    )
 
-    # A列（回）を取得し、ヘッダー行を除外して検索
-    col = ws.col_values(1)
-    header = col[0] if col else ""
-    rows = col[1:] if header == HEADERS[0] else col
-    base_row = 2 if header == HEADERS[0] else 1
+    _store_write(lambda store: store.upsert_course(round_no, diff, title, course_id))
+    return result
 
-    try:
-        idx = [int(x) for x in rows].index(int(round_no))
-        row_num = base_row + idx
-        # 既存行を上書き（A:回, B:diff, C:title, D:CourseID）
-        ws.update(
-            values=[[round_no, diff, title, course_id]],
-            range_name=f"A{row_num}:D{row_num}"
-        )
-        return "updated"
-    except ValueError:
-        # 対象行が存在しないので末尾に追加
-        ws.append_row([round_no, diff, title, course_id], value_input_option="RAW")
-        return "inserted"
+
+def upsert_user_row(
+    spreadsheet_id: str,
+    worksheet_title: str,
+    discord_id: str,
+    lr2id: str,
+) -> str:
+    """
+    UserData タブの DiscordID の行の LR2ID を上書き、存在しなければ末尾に追加する。
+    期待ヘッダー: A列=DiscordID, B列=LR2ID
+    戻り値: "updated" or "inserted"
+    """
+    # A列（DiscordID）で行を探して上書き、なければ末尾に追加（タブがなければヘッダーごと作成）
+    result = upsert_keyed_row_sync(
+        spreadsheet_id, worksheet_title, ["DiscordID", "LR2ID"], [discord_id, lr2id]
+    )
+
+    # /mypage が参照する対応表にも即時反映する
+    user_directory.set(discord_id, lr2id)
+    _store_write(lambda store: store.upsert_user(discord_id, lr2id))
+    return result
 
 
 def write_round_result_to_sheet(
@@ -243,8 +233,6 @@ def write_round_result_to_sheet(
     カラム: Rank, LR2ID, PlayerName, Score, Score Rate (%), BPI
     """
     HEADERS = ["Rank", "LR2ID", "PlayerName", "Score", "Score Rate (%)", "BPI"]
-    gc = _authorize_gc()
-    sh = gc.open_by_key(spreadsheet_id)
 
     rows = []
     for e in result_list:
@@ -258,9 +246,15 @@ def write_round_result_to_sheet(
             e.get("BPI"),
         ])
 
-    values = [HEADERS] + rows
-    ws = _get_or_create_ws(sh, round_title, rows=len(values), cols=len(HEADERS))
-    ws.update("A1", values, value_input_option="RAW")
+    # タブの作成・ヘッダー・値の書き込みを1回の API 呼び出しにまとめる
+    write_tab_values_sync(spreadsheet_id, round_title, [HEADERS] + rows, min_cols=len(HEADERS))
+    if str(round_title).strip().isdigit():
+        def apply(store):
+            store.replace_round(int(round_title), [dict(zip(HEADERS, row)) for row in rows])
+            # 自分の書き込みで次回の差分同期がタブを読み直さないよう記録しておく
+            record_result_write_sync(store, spreadsheet_id, str(round_title), [HEADERS] + rows)
+
+        _store_write(apply)
 
 
 def fetch_course_id_by_round_sync(
@@ -273,13 +267,17 @@ def fetch_course_id_by_round_sync(
     ヘッダーは 'Round' または '回' を許容する。
     見つからない場合は ValueError を送出する。
     """
-    gc = _authorize_gc()
-    sh = gc.open_by_key(spreadsheet_id)
-    ws = sh.worksheet(worksheet_title)
-
-    rows = ws.get_all_records()
     target = str(round_value).strip()
 
+    # ローカル成績ストアが同期済みならそちらを参照
+    store = get_synced_store()
+    if store is not None and target.isdigit():
+        cid = store.course_id(int(target))
+        if cid is not None:
+            return int(cid)
+
+    rows = cached_records(spreadsheet_id, worksheet_title, COURSE_DATA_TTL)
+
     for r in rows:
         # 'Round' または '回' キーで値を取得
         key_round = r.get("Round", r.get("回"))
@@ -342,6 +340,11 @@ async def _safe_send(interaction: discord.Interaction, content: str, ephemeral:
 async def on_ready():
     """Bot 起動時にスラッシュコマンドをグローバルに同期する。"""
     print(f"ログインしました: {bot.user}")
+    if not any(name == "ready" for name, _ in _startup_marks):
+        _mark_startup("ready")
+        report = " / ".join(f"{name} {sec:.2f}s" for name, sec in _startup_marks)
+        print(f"起動時間: {report}")
+        logging.getLogger(__name__).info("起動時間: %s", report)
     try:
         await bot.tree.sync()
     except Exception as e:
@@ -438,10 +441,9 @@ class AnnounceModal(ui.Modal, title="イベントアナウンス"):
                 return
 
         # スプレッドシートへのアップサート（同期I/Oはスレッドプールで実行）
-        loop = interaction.client.loop
         try:
-            await loop.run_in_executor(
-                None,
+            await run_sheets_io(
+                Priority.ADMIN,
                 upsert_course_row,
                 sheet_id,
                 course_ws,
@@ -524,9 +526,8 @@ async def result(interaction: discord.Interaction, event: str):
 
     # 4) CourseData タブから対象回の CourseID を取得
     try:
-        loop = asyncio.get_running_loop()
-        course_id = await loop.run_in_executor(
-            None,
+        course_id = await run_sheets_io(
+            Priority.ADMIN,
             fetch_course_id_by_round_sync,
             sheet_id,
             course_ws,
@@ -536,8 +537,12 @@ async def result(interaction: discord.Interaction, event: str):
         await _safe_send(interaction, f"CourseData から回 {event} の CourseID を取得できませんでした。\n```\n{e}\n```", ephemeral=True)
         return
 
-    # 5) LR2IR からランキングデータを取得
-    df = lr2ir.fetch_lr2_ranking(course_id)
+    # 5) LR2IR からランキングと BMSID を1回のページ取得でまとめて取得（非同期）
+    try:
+        df, bmsid = await lr2ir.fetch_lr2_ranking_async(course_id)
+    except Exception as e:
+        await _safe_send(interaction, f"LR2IR からのランキング取得に失敗しました。\n```\n{e}\n```", ephemeral=True)
+        return
     df = df.dropna()
 
     required_cols = ["順位", "スコア", "LR2ID"]
@@ -550,60 +555,48 @@ async def result(interaction: discord.Interaction, event: str):
         await _safe_send(interaction, "プレイヤー名の列が見つかりませんでした。", ephemeral=True)
         return
 
-    # 6) LR2IR のランキングページから BMSID を取得して BPI パラメータを引く
-    try:
-        course_url = (
-            f"http://www.dream-pro.info/~lavalse/LR2IR/search.cgi"
-            f"?mode=ranking&courseid={course_id}"
-        )
-        html = requests.get(course_url, timeout=10).text
-        m = re.search(r'search\.cgi\?mode=ranking&bmsid=(\d+)', html)
-        if not m:
-            await _safe_send(interaction, "BMSIDの取得に失敗しました。", ephemeral=True)
-            return
-        bmsid = int(m.group(1))
-    except Exception as e:
-        await _safe_send(interaction, f"BMSID取得中にエラー: {e}", ephemeral=True)
+    # 6) ランキングページ内の楽曲リンクから取得した BMSID を確認
+    if bmsid is None:
+        await _safe_send(interaction, "BMSIDの取得に失敗しました。", ephemeral=True)
         return
 
-    # 7) insane_scores から BPI 計算用パラメータを取得
-    score_row = insane_scores[insane_scores['lr2_bmsid'] == bmsid]
-    if score_row.empty:
+    # 7) 楽曲カタログから BPI 計算用パラメータを取得
+    song_idx = song_catalog.index_of_bmsid(bmsid)
+    if song_idx is None:
         await _safe_send(interaction, "insane_scoresに該当するBMSIDが見つかりませんでした。", ephemeral=True)
         return
 
-    s_row = score_row.iloc[0]
-    m = s_row["theoretical_score"]
-    k = s_row["average_score"]
-    z = s_row["top_score"]
-    p = max(s_row["optimized_p"], 0.8)  # p の下限を 0.8 に設定
+    m, k, z, p = song_catalog.params(song_idx)
+    p = max(p, 0.8)  # p の下限を 0.8 に設定
 
-    # 8) 各プレイヤーの BPI を算出してリスト化
-    result_list = []
+    # 8) 全プレイヤーの BPI をまとめて算出してリスト化
     df = df.sort_values("順位").reset_index(drop=True)
-    for _, row in df.iterrows():
-        lr2id = str(row["LR2ID"])
-        score_str = row["スコア"]
-        mscore = re.match(r"(\d+)/", score_str)
-        s = int(mscore.group(1)) if mscore else 0
-        raw_bpi = calculate_bpi(s, k, z, m, p)
-        bpi = round(raw_bpi, 2) if not np.isnan(raw_bpi) else -15
-
-        result_list.append({
-            "順位": int(row["順位"]),
-            "LR2ID": lr2id,
-            "プレイヤー": row[player_col],
+    scores = extract_own_scores(df["スコア"])
+    bpis = calculate_bpi_array(scores, k, z, m, p, nan_value=BPI_FLOOR)
+
+    result_list = [
+        {
+            "順位": int(rank),
+            "LR2ID": str(lr2id),
+            "プレイヤー": player,
             "スコア": score_str,
-            "PG": int(row.get("PG", 0)),
-            "GR": int(row.get("GR", 0)),
-            "BPI": bpi,
-        })
+            "PG": int(pg),
+            "GR": int(gr),
+            "BPI": float(bpi),
+        }
+        for rank, lr2id, player, score_str, pg, gr, bpi in zip(
+            df["順位"], df["LR2ID"], df[player_col], df["スコア"],
+            df["PG"] if "PG" in df.columns else [0] * len(df),
+            df["GR"] if "GR" in df.columns else [0] * len(df),
+            bpis,
+        )
+    ]
 
     # 9) 結果をスプレッドシートへ書き込み（同期I/Oはスレッドプールで実行）
     try:
         await _safe_send(interaction, "スプレッドシートへ書き込み中…", ephemeral=True)
-        await loop.run_in_executor(
-            None,
+        await run_sheets_io(
+            Priority.ADMIN,
             write_round_result_to_sheet,
             output_id,
             str(event),
@@ -614,7 +607,8 @@ async def result(interaction: discord.Interaction, event: str):
         return
 
     # 10) Discord への表示メッセージを生成（メダル表示あり）
-    id_to_name = await build_id_to_name_from_sheet(interaction.guild)
+    # ランキングに載っている LR2ID だけを、表示名キャッシュと一括取得で解決する
+    id_to_name = await build_id_to_name_from_sheet(interaction.guild, [row["LR2ID"] for row in result_list])
 
     medals = ["🥇", "🥈", "🥉"]
     msg = f"**第{event}回 ランキング結果**\n"
@@ -653,23 +647,22 @@ async def bpi(interaction: discord.Interaction, song: str, score: int):
     """指定した曲名とスコアから BPI を計算して表示する。"""
     await interaction.response.defer(thinking=True, ephemeral=True)
 
-    try:
-        level_title = song.strip()
-        row = insane_scores[insane_scores["label"] == level_title].iloc[0]
-    except IndexError:
+    song_idx = song_catalog.index_of_label(song.strip())
+    if song_idx is None:
         await interaction.followup.send("該当する楽曲が見つかりませんでした。", ephemeral=True)
         return
 
+    params = song_catalog.params(song_idx)
     bpi_value = calculate_bpi(
         s=score,
-        k=row["average_score"],
-        z=row["top_score"],
-        m=row["theoretical_score"],
-        p=row["optimized_p"]
+        k=params.k,
+        z=params.z,
+        m=params.m,
+        p=params.p
     )
 
     await interaction.followup.send(
-        f"**{row['title']} (★{row['level']}) の BPI**\n"
+        f"**{song_catalog.title(song_idx)} (★{song_catalog.level(song_idx)}) の BPI**\n"
         f"あなたのスコア: {score}\n"
         f"→ **BPI: {bpi_value}**",
         ephemeral=True
@@ -678,12 +671,9 @@ async def bpi(interaction: discord.Interaction, song: str, score: int):
 
 @bpi.autocomplete("song")
 async def song_autocomplete(interaction: discord.Interaction, current: str):
-    """曲名の入力に対して insane_scores からオートコンプリート候補を返す（最大25件）。"""
-    filtered = [
-        label for label in insane_scores["label"]
-        if current.lower() in label.lower()
-    ][:25]
-    return [app_commands.Choice(name=label, value=label) for label in filtered]
+    """曲名の入力に対して検索インデックスから関連度順にオートコンプリート候補を返す（最大25件）。"""
+    labels = [song_catalog.label(i) for i in song_index.search(current, limit=25)]
+    return [app_commands.Choice(name=label, value=label) for label in labels]
 
 # ============================================================
 # LR2Cog（/register・/mypage コマンド）
@@ -694,55 +684,22 @@ class LR2Cog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        # gspread_asyncio のクライアントマネージャーを初期化
-        self.agcm = gspread_asyncio.AsyncioGspreadClientManager(_create_async_creds)
-        self._agc = None  # 認証済みクライアントのキャッシュ
-
-    async def _get_ws(self):
-        """UserData ワークシートを取得する（クライアントをキャッシュして再利用）。"""
-        if self._agc is None:
-            self._agc = await self.agcm.authorize()
-        sh = await self._agc.open(SHEET_NAME)
-        ws = await sh.worksheet(WS_USERDATA)
-        return ws
-
-    async def _upsert_user(self, discord_id: str, lr2id: str) -> str:
-        """
-        UserData シートの DiscordID を検索し、存在すれば LR2ID を更新、
-        なければ末尾に新規追加する。
-        期待ヘッダー: A列=DiscordID, B列=LR2ID
-        戻り値: "updated" or "inserted"
-        """
-        ws = await self._get_ws()
-
-        # A列の DiscordID を一括取得し、ヘッダー行を除外
-        col = await ws.col_values(1)
-        if col and col[0] == "DiscordID":
-            discord_ids = col[1:]
-            base_row = 2
-        else:
-            discord_ids = col
-            base_row = 1
-
-        try:
-            # 既存DiscordIDが見つかれば B列（LR2ID）を更新
-            idx = discord_ids.index(discord_id)
-            row_num = base_row + idx
-            await ws.update_cell(row_num, 2, lr2id)
-            return "updated"
-        except ValueError:
-            # 存在しない場合は末尾に追記
-            await ws.append_row([discord_id, lr2id], value_input_option="RAW")
-            return "inserted"
 
     @app_commands.command(name="register", description="自分のLR2IDを登録")
     @app_commands.describe(lr2id="LR2IRのplayerid")
     async def register(self, interaction: Interaction, lr2id: str):
         """Discord ID と LR2ID を紐づけて UserData シートに保存する。"""
         discord_id = str(interaction.user.id)
+        userdata_sheet_id = os.getenv("USERDATA_ID") or os.getenv("MAIN_ID")
+        userdata_ws = os.getenv("USERDATA_WS", "UserData")
+        if not userdata_sheet_id:
+            await interaction.response.send_message("USERDATA_ID（または MAIN_ID）が未設定です。.env を確認してください。", ephemeral=True)
+            return
         try:
             await interaction.response.defer(ephemeral=True, thinking=True)
-            result = await self._upsert_user(discord_id, lr2id)
+            result = await run_sheets_io(
+                Priority.INTERACTIVE, upsert_user_row, userdata_sheet_id, userdata_ws, discord_id, lr2id
+            )
             if result == "updated":
                 msg = f"更新しました。(LR2ID を `{lr2id}` に変更)"
             else:
@@ -769,10 +726,9 @@ class LR2Cog(commands.Cog):
         await interaction.response.defer(thinking=True, ephemeral=True)
 
         # UserData から自分の LR2ID を取得（同期I/Oはスレッドプールで実行）
-        loop = asyncio.get_running_loop()
         try:
-            lr2id = await loop.run_in_executor(
-                None,
+            lr2id = await run_sheets_io(
+                Priority.INTERACTIVE,
                 _get_lr2id_by_discord_sync,
                 userdata_sheet_id,
                 userdata_ws,
@@ -802,12 +758,11 @@ class LR2Cog(commands.Cog):
             return
 
         await safe_defer(interaction, ephemeral=True)
-        loop = asyncio.get_running_loop()
 
         # CourseData をロードしてメタ情報マップ（回 → {title, diff}）を構築
         try:
-            meta_map = await loop.run_in_executor(
-                None, load_course_meta_map_sync, main_sheet_id, course_ws
+            meta_map = await run_sheets_io(
+                Priority.INTERACTIVE, load_course_meta_map_sync, main_sheet_id, course_ws
             )
         except Exception as e:
             await interaction.followup.send(f"CourseData 取得に失敗しました。\n```\n{e}\n```", ephemeral=True)
@@ -816,8 +771,8 @@ class LR2Cog(commands.Cog):
         # ---- all モード: 全回の成績を HTML テーブルで送信 ----
         if event.lower() == "all":
             try:
-                all_records = await loop.run_in_executor(
-                    None, _fetch_user_records_all_rounds_sync, result_sheet_id, lr2id
+                all_records = await run_sheets_io(
+                    Priority.INTERACTIVE, _fetch_user_records_all_rounds_sync, result_sheet_id, lr2id
                 )
             except Exception as e:
                 await interaction.followup.send(f"結果シート参照中にエラー: {e}", ephemeral=True)
@@ -827,46 +782,38 @@ class LR2Cog(commands.Cog):
                 await interaction.followup.send("記録が見つかりませんでした。", ephemeral=True)
                 return
 
-            combined = []
+            base_url = os.getenv("WEB_BASE_URL", f"http://localhost:{os.getenv('WEB_PORT', '8080')}")
+            # 元データが前回と同じなら保存済みページをそのまま返す（ユーザーごとに URL は固定）
+            page_key = f"mypage-all:{lr2id}"
+            fingerprint = mypage_fingerprint(all_records, meta_map)
+            token = find_page(page_key, fingerprint)
+            if token is not None:
+                await interaction.followup.send(
+                    content=f"マイページを生成しました（有効期限: 24時間）\n{base_url}/mypage/{token}",
+                    ephemeral=True
+                )
+                return
+
+            rows = []
             for rec in all_records:
-                rno = rec["round"]
                 row = rec["row"]
-                total = rec["total"]
-
-                meta = meta_map.get(str(rno), {"title": "", "diff": "", "course_id": ""})
-                title = meta.get("title", "")
+                meta = meta_map.get(str(rec["round"]), {"title": "", "diff": "", "course_id": ""})
                 diff = meta.get("diff", "")
-                course_id = meta.get("course_id", "")
-
-                # 曲名はIRランキングページへのリンクにする
-                lr2ir_base = "http://www.dream-pro.info/~lavalse/LR2IR/search.cgi?mode=ranking&courseid="
-                title_cell = (
-                    f'<a href="{lr2ir_base}{course_id}" target="_blank">{title}</a>'
-                    if course_id else title
-                )
-
-                # 上位3位はカラーハイライト付きで表示
-                rank = int(row.get("Rank"))
-                color_map = {1: "gold", 2: "silver", 3: "#cd7f32"}
-                rank_str = (
-                    f'<span style="color:{color_map[rank]}; font-weight:bold;">{rank}位</span>'
-                    if rank in color_map else f"{rank}位"
-                )
-
-                combined.append({
-                    "回": int(rno),
-                    "曲名": title_cell,
-                    "難易度": format_difficulty(diff) if diff else "",
-                    "順位": f"{rank_str} / {total}人",
-                    "スコア": row.get("Score"),
-                    "スコアレート": f"{row.get('Score Rate (%)')}%",
-                    "BPI": row.get("BPI"),
+                # 曲名のリンク・順位の色付けは静的シェル側で行う
+                rows.append({
+                    "round": rec["round"],
+                    "title": meta.get("title", ""),
+                    "course_id": meta.get("course_id", ""),
+                    "diff": format_difficulty(diff) if diff else "",
+                    "rank": row.get("Rank"),
+                    "total": rec["total"],
+                    "score": row.get("Score"),
+                    "rate": row.get("Score Rate (%)"),
+                    "bpi": row.get("BPI"),
                 })
 
-            result_df = DataFrame(combined).sort_values("回")
-            html = generate_bootstrap_html_table(result_df, "あなたのねぶかわウィークリー成績一覧")
-            token = store_page(html)
-            base_url = os.getenv("WEB_BASE_URL", f"http://localhost:{os.getenv('WEB_PORT', '8080')}")
+            data = build_mypage_data(rows, "あなたのねぶかわウィークリー成績一覧")
+            token = store_page_data(data, key=page_key, fingerprint=fingerprint)
             url = f"{base_url}/mypage/{token}"
             await interaction.followup.send(
                 content=f"マイページを生成しました（有効期限: 24時間）\n{url}",
@@ -876,8 +823,8 @@ class LR2Cog(commands.Cog):
 
         # ---- 単一回モード: 指定回の成績を Embed で表示 ----
         try:
-            rec, total = await loop.run_in_executor(
-                None, _fetch_user_record_one_round_sync, result_sheet_id, event, lr2id
+            rec, total = await run_sheets_io(
+                Priority.INTERACTIVE, _fetch_user_record_one_round_sync, result_sheet_id, event, lr2id
             )
         except Exception as e:
             await interaction.followup.send(f"結果シート参照中にエラー: {e}", ephemeral=True)
@@ -998,9 +945,86 @@ class Help(commands.Cog):
 # Cog のセットアップ・Bot 起動
 # ============================================================
 
+# バックグラウンドタスクへの参照（GC で止まらないよう保持する）
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _prewarm_imports_sync() -> None:
+    """遅延 import にしている重いモジュールを先読みする（executor で実行）。"""
+    for name in _PREWARM_MODULES:
+        importlib.import_module(name)
+    _mark_startup("prewarm")
+
+
+async def _prewarm_imports() -> None:
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, _prewarm_imports_sync)
+    except Exception:
+        logging.getLogger(__name__).exception("モジュールの先読みに失敗しました")
+
+
+async def _score_store_sync_loop() -> None:
+    """
+    成績ストアを起動直後と以降 SCORE_SYNC_INTERVAL 秒ごとに Sheets と差分同期する。
+    差分同期で拾えない変更への保険として、SCORE_FULL_SYNC_INTERVAL 秒ごとに全体同期する。
+    """
+    store = get_score_store()
+    result_sheet_id = os.getenv("SCORE_ID")
+    main_sheet_id = os.getenv("MAIN_ID")
+    if store is None or not result_sheet_id or not main_sheet_id:
+        return
+
+    logger = logging.getLogger(__name__)
+    args = (
+        store,
+        result_sheet_id,
+        main_sheet_id,
+        os.getenv("COURSE_WS", "CourseData"),
+        os.getenv("USERDATA_ID") or main_sheet_id,
+        os.getenv("USERDATA_WS", "UserData"),
+    )
+    while True:
+        try:
+            last_full = float(store.get_state("last_full_sync") or 0)
+            if datetime.now().timestamp() - last_full >= SCORE_FULL_SYNC_INTERVAL:
+                n = await run_sheets_io(Priority.BACKGROUND, full_sync_sync, *args)
+                logger.info("成績ストアを全体同期しました（%d 回分）", n)
+                logger.info("Sheets API の呼び出し状況: %s", sheets_scheduler_stats())
+            else:
+                changed = await run_sheets_io(Priority.BACKGROUND, incremental_sync_sync, *args)
+                if changed:
+                    logger.info("成績ストアを差分同期しました（第%s回）", ", ".join(map(str, changed)))
+        except Exception:
+            logger.exception("成績ストアの同期に失敗しました")
+        await asyncio.sleep(SCORE_SYNC_INTERVAL)
+
+
+async def _user_directory_refresh_loop() -> None:
+    """
+    UserData の対応表を起動直後と以降 USER_DIRECTORY_REFRESH 秒ごとに読み直し、手動編集を拾う。
+    成績ストアの同期が UserData を読み直した直後（対応表が新しい）なら何もしない。
+    """
+    sheet_id = os.getenv("USERDATA_ID") or os.getenv("MAIN_ID")
+    ws_title = os.getenv("USERDATA_WS", "UserData")
+    if not sheet_id:
+        return
+
+    logger = logging.getLogger(__name__)
+    while True:
+        try:
+            if await run_sheets_io(
+                Priority.BACKGROUND, refresh_user_directory_sync, sheet_id, ws_title, USER_DIRECTORY_REFRESH
+            ):
+                logger.info("UserData の対応表を読み直しました %s", user_directory.stats())
+        except Exception:
+            logger.exception("UserData の対応表の読み直しに失敗しました")
+        await asyncio.sleep(USER_DIRECTORY_REFRESH)
+
+
 @bot.event
 async def setup_hook():
     """Bot 起動前に Cog を登録し、マイページ配信用 Web サーバーを起動する。"""
+    _mark_startup("setup_hook")
     await bot.add_cog(LR2Cog(bot))
     await bot.add_cog(Help(bot))
 
@@ -1010,6 +1034,12 @@ async def setup_hook():
     await start_web_server(web_host, web_port)
     logging.getLogger(__name__).info("Web server started on %s:%s", web_host, web_port)
 
+    # ローカル成績ストアの定期同期を開始（タスクへの参照を保持して GC を防ぐ）
+    _background_tasks.add(asyncio.create_task(_score_store_sync_loop()))
+    _background_tasks.add(asyncio.create_task(_user_directory_refresh_loop()))
+    # ゲートウェイ接続と並行して重いモジュールを先読み
+    _background_tasks.add(asyncio.create_task(_prewarm_imports()))
+
 
 # Bot を起動
 bot.run(os.getenv("DISCORD_TOKEN"))
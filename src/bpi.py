@@ -0,0 +1,69 @@
+# ============================================================
+# bpi.py - BPI 計算モジュール
+# 1曲分のパラメータ（m, k, z, p）に対してスコア配列の BPI を
+# NumPy でまとめて計算するカーネルを提供する
+# ============================================================
+
+import numpy as np
+
+# BPI の下限値（平均未満のスコアはここで打ち止め）
+BPI_FLOOR: float = -15.0
+
+
+def _pgf(x: np.ndarray, m: float) -> np.ndarray:
+    """BPI 計算用のスコア変換関数（配列版）。x == 1（理論値）のときは m を返す。"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(x == 1, m, 0.5 / (1 - x))
+
+
+def calculate_bpi_array(
+    scores,
+    k: float,
+    z: float,
+    m: float,
+    p: float,
+    *,
+    nan_value: float = np.nan,
+) -> np.ndarray:
+    """
+    スコア配列から BPI 配列を計算して返す（小数第2位で丸め）。
+    scores: 自スコアの配列, k: 平均スコア, z: トップスコア, m: 理論値, p: 補正係数
+    平均未満のスコアは BPI_FLOOR で下限をかける。
+    計算不能（NaN）な要素は nan_value で置き換える。
+    """
+    s = np.asarray(scores, dtype=np.float64)
+    m = float(m)
+
+    S = _pgf(s / m, m)
+    K = _pgf(np.float64(k) / m, m)
+    Z = _pgf(np.float64(z) / m, m)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_s = np.log(S / K)
+        denom = np.log(Z / K) ** p
+        upper = 100 * (log_s ** p) / denom
+        lower = np.maximum(-100 * (np.abs(log_s) ** p) / denom, BPI_FLOOR)
+
+    bpi = np.round(np.where(s >= k, upper, lower), 2)
+    if not np.isnan(nan_value):
+        bpi = np.where(np.isnan(bpi), nan_value, bpi)
+    return bpi
+
+
+def calculate_bpi(s, k, z, m, p) -> float:
+    """
+    単曲 BPI を計算して返す（calculate_bpi_array の1要素版）。
+    s: 自スコア, k: 平均スコア, z: トップスコア, m: 理論値, p: 補正係数
+    """
+    return float(calculate_bpi_array([s], k, z, m, p)[0])
+
+
+def extract_own_scores(score_texts) -> np.ndarray:
+    """
+    "aaaa/bbbb(cc.cc%)" 形式のスコア文字列の配列から自スコア（aaaa）を取り出す。
+    先頭が数字で始まらない・パースできない要素は 0 とする。
+    """
+    import pandas as pd  # /result でしか使わないため遅延 import（起動を速くする）
+
+    own = pd.Series(score_texts, dtype="string").str.extract(r"^(\d+)/", expand=False)
+    return own.fillna("0").astype(np.int64).to_numpy()
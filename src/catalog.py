@@ -0,0 +1,220 @@
+# ============================================================
+# catalog.py - 楽曲カタログ
+# insane_scores.csv を列指向の配列に展開し、
+# lr2_bmsid / md5 / label のハッシュインデックスで O(1) 参照できるようにする
+#
+# 起動を速くするため、必要な列だけを NumPy のバイナリ（.npz）に保存したスナップショットを持つ。
+# CSV の SHA-256 が変わっていなければスナップショットから読み込み、pandas は import しない。
+# ============================================================
+
+import hashlib
+import logging
+import os
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# スナップショットの形式のバージョン（列の構成を変えたら上げる）
+SNAPSHOT_VERSION: int = 1
+
+
+class BpiParams(NamedTuple):
+    """BPI 計算用パラメータ（m: 理論値, k: 平均スコア, z: トップスコア, p: 補正係数）。"""
+    m: float
+    k: float
+    z: float
+    p: float
+
+
+class SongCatalog:
+    """
+    BPI 計算対象曲のカタログ。
+    BPI パラメータは連続した float64 配列に保持し、
+    各キー（lr2_bmsid / md5 / label）は dict で行番号に引く。
+    """
+
+    # 読み込み元（"csv" / "snapshot"）。load() で設定する
+    source: str = "csv"
+
+    # カタログの構築に必要な CSV 列
+    COLUMNS = [
+        "lr2_bmsid", "md5", "level", "title",
+        "theoretical_score", "average_score", "top_score", "optimized_p",
+    ]
+
+    def __init__(
+        self,
+        titles: list[str],
+        levels: list[str],
+        bmsids: np.ndarray,
+        md5s: list[str],
+        theoretical: np.ndarray,
+        average: np.ndarray,
+        top: np.ndarray,
+        optimized_p: np.ndarray,
+    ):
+        """
+        列ごとの値からカタログを構築する。
+        bmsids は int64 配列（欠損は -1）、md5s の欠損は空文字とする。
+        """
+        self.titles: list[str] = titles
+        self.levels: list[str] = levels
+        self.labels: list[str] = [f"★{lv} {t}" for lv, t in zip(levels, titles)]
+
+        self.bmsids = np.ascontiguousarray(bmsids, dtype=np.int64)
+        self.md5s: list[str] = md5s
+        self.theoretical = np.ascontiguousarray(theoretical, dtype=np.float64)
+        self.average = np.ascontiguousarray(average, dtype=np.float64)
+        self.top = np.ascontiguousarray(top, dtype=np.float64)
+        self.optimized_p = np.ascontiguousarray(optimized_p, dtype=np.float64)
+
+        # 重複キーは CSV で先に出現した行を優先する（従来の .iloc[0] と同じ挙動）
+        self._by_bmsid: dict[int, int] = {}
+        self._by_md5: dict[str, int] = {}
+        self._by_label: dict[str, int] = {}
+        for i, (bmsid, md5) in enumerate(zip(self.bmsids.tolist(), md5s)):
+            if bmsid >= 0:
+                self._by_bmsid.setdefault(bmsid, i)
+            if md5:
+                self._by_md5.setdefault(md5.lower(), i)
+        for i, label in enumerate(self.labels):
+            self._by_label.setdefault(label, i)
+        self._size = len(titles)
+
+    @classmethod
+    def from_frame(cls, df: "pd.DataFrame") -> "SongCatalog":
+        """COLUMNS を含む DataFrame からカタログを構築する。"""
+        bmsid = df["lr2_bmsid"]
+        md5 = df["md5"]
+        return cls(
+            df["title"].astype(str).tolist(),
+            df["level"].astype(str).tolist(),
+            bmsid.where(bmsid.notna(), -1).astype(np.int64).to_numpy(),
+            [str(v) if isinstance(v, str) or v == v else "" for v in md5.tolist()],
+            df["theoretical_score"].to_numpy(),
+            df["average_score"].to_numpy(),
+            df["top_score"].to_numpy(),
+            df["optimized_p"].to_numpy(),
+        )
+
+    @classmethod
+    def from_csv(cls, path: str) -> "SongCatalog":
+        """CSV から必要な列だけを読み込んでカタログを構築する。"""
+        import pandas as pd  # スナップショットから読み込む場合は不要なので遅延 import
+        return cls.from_frame(pd.read_csv(path, usecols=cls.COLUMNS))
+
+    # ------------------------------------------------------------
+    # バイナリスナップショット
+    # ------------------------------------------------------------
+
+    def save_snapshot(self, path: str, source_sha256: str) -> None:
+        """カタログを .npz に保存する（一時ファイルに書いてから置き換える）。"""
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                version=np.int64(SNAPSHOT_VERSION),
+                source_sha256=np.str_(source_sha256),
+                titles=np.array(self.titles, dtype=str),
+                levels=np.array(self.levels, dtype=str),
+                md5s=np.array(self.md5s, dtype=str),
+                bmsids=self.bmsids,
+                theoretical=self.theoretical,
+                average=self.average,
+                top=self.top,
+                optimized_p=self.optimized_p,
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def from_snapshot(cls, path: str, source_sha256: str | None = None) -> "SongCatalog | None":
+        """
+        スナップショットから読み込む。ファイルがない・形式が古い・
+        source_sha256 を指定して CSV のハッシュが一致しない場合は None を返す。
+        """
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                if int(z["version"]) != SNAPSHOT_VERSION:
+                    return None
+                if source_sha256 is not None and str(z["source_sha256"]) != source_sha256:
+                    return None
+                return cls(
+                    z["titles"].tolist(),
+                    z["levels"].tolist(),
+                    z["bmsids"],
+                    z["md5s"].tolist(),
+                    z["theoretical"],
+                    z["average"],
+                    z["top"],
+                    z["optimized_p"],
+                )
+        except (OSError, KeyError, ValueError):
+            return None
+
+    @classmethod
+    def load(cls, csv_path: str, snapshot_path: str | None = None) -> "SongCatalog":
+        """
+        カタログを読み込む。snapshot_path があり CSV の SHA-256 が一致すればスナップショットから、
+        なければ CSV から構築してスナップショットを作り直す（保存に失敗しても CSV の結果を返す）。
+        """
+        if not snapshot_path:
+            return cls.from_csv(csv_path)
+
+        with open(csv_path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        catalog = cls.from_snapshot(snapshot_path, digest)
+        if catalog is not None:
+            catalog.source = "snapshot"
+            return catalog
+
+        catalog = cls.from_csv(csv_path)
+        catalog.source = "csv"
+        try:
+            catalog.save_snapshot(snapshot_path, digest)
+        except OSError:
+            logging.getLogger(__name__).warning("楽曲カタログのスナップショットを保存できませんでした: %s", snapshot_path)
+        return catalog
+
+    def __len__(self) -> int:
+        return self._size
+
+    # ------------------------------------------------------------
+    # インデックス参照（見つからない場合は None）
+    # ------------------------------------------------------------
+
+    def index_of_bmsid(self, bmsid: int) -> int | None:
+        """lr2_bmsid に対応する行番号を返す。"""
+        return self._by_bmsid.get(int(bmsid))
+
+    def index_of_md5(self, md5: str) -> int | None:
+        """md5 に対応する行番号を返す（大文字小文字は区別しない）。"""
+        return self._by_md5.get(str(md5).lower())
+
+    def index_of_label(self, label: str) -> int | None:
+        """表示用ラベル（"★{level} {title}"）に対応する行番号を返す。"""
+        return self._by_label.get(label)
+
+    # ------------------------------------------------------------
+    # 行データ参照
+    # ------------------------------------------------------------
+
+    def params(self, idx: int) -> BpiParams:
+        """行番号 idx の BPI パラメータを返す。"""
+        return BpiParams(
+            float(self.theoretical[idx]),
+            float(self.average[idx]),
+            float(self.top[idx]),
+            float(self.optimized_p[idx]),
+        )
+
+    def title(self, idx: int) -> str:
+        return self.titles[idx]
+
+    def level(self, idx: int) -> str:
+        return self.levels[idx]
+
+    def label(self, idx: int) -> str:
+        return self.labels[idx]
@@ -1,30 +1,124 @@
 # ============================================================
 # common.py - プロジェクト共通ユーティリティ
-# Google Sheets 認証・Discord Interaction ヘルパーを提供する
+# Google Sheets 認証・ハンドルのプール・Discord Interaction ヘルパーを提供する
 # ============================================================
 
 import os
 import json
+import threading
+from typing import TYPE_CHECKING
 
 import discord
-import gspread
-from google.oauth2.service_account import Credentials
 
+# gspread・google-auth は import に時間がかかるため、初回の認証時に読み込む（起動を速くする）
+if TYPE_CHECKING:
+    import gspread
 
-def _authorize_gc() -> gspread.Client:
+
+# ============================================================
+# gspread クライアント・ハンドルのプール
+# ============================================================
+
+# 認証済みクライアント・Spreadsheet・Worksheet をプロセス全体で使い回す。
+# executor の複数スレッドから呼ばれるため、生成と登録はロックで保護する。
+_gc_lock = threading.Lock()
+_gc: "gspread.Client | None" = None
+_spreadsheets: "dict[str, gspread.Spreadsheet]" = {}
+_worksheets: "dict[tuple[str, str], gspread.Worksheet]" = {}
+
+
+def _authorize_gc() -> "gspread.Client":
     """
-    環境変数 GCP_SA_JSON のサービスアカウント情報で gspread クライアントを生成して返す。
+    環境変数 GCP_SA_JSON のサービスアカウント情報で認証した gspread クライアントを返す。
     Sheets / Drive スコープを付与する。
+    クライアントは初回のみ生成してプロセス全体で共有する。
+    アクセストークンの更新は google-auth の AuthorizedSession が自動で行う。
+    すべての API 呼び出しは ScheduledHTTPClient 経由でクォータのスケジューラに並ぶ。
+    SHEETS_API_BASE（ローカルのスタブ）を使う場合は認証なしで接続する。
+    """
+    global _gc
+    if _gc is not None:
+        return _gc
+    with _gc_lock:
+        if _gc is None:
+            import gspread
+
+            from src.sheets_http import API_BASE, ScheduledHTTPClient
+
+            if API_BASE:
+                from google.auth.credentials import AnonymousCredentials
+
+                creds = AnonymousCredentials()
+            else:
+                from google.oauth2.service_account import Credentials
+
+                sa_info = json.loads(os.environ["GCP_SA_JSON"])
+                scopes = [
+                    "https://www.googleapis.com/auth/spreadsheets",
+                    "https://www.googleapis.com/auth/drive",
+                ]
+                creds = Credentials.from_service_account_info(sa_info, scopes=scopes)
+            _gc = gspread.authorize(creds, http_client=ScheduledHTTPClient)
+        return _gc
+
+
+def _open_spreadsheet(sheet_id: str) -> "gspread.Spreadsheet":
+    """
+    スプレッドシートを開いて返す。2回目以降はキャッシュ済みのハンドルを返す。
+    open_by_key は API 呼び出し（とスケジューラの待ち）を伴うため、ロックの外で実行する。
+    同時に開いた場合は先に登録されたハンドルを使う。
     """
-    sa_info = json.loads(os.environ["GCP_SA_JSON"])
-    scopes = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive",
-    ]
-    creds = Credentials.from_service_account_info(sa_info, scopes=scopes)
-    return gspread.authorize(creds)
+    sh = _spreadsheets.get(sheet_id)
+    if sh is not None:
+        return sh
+    sh = _authorize_gc().open_by_key(sheet_id)
+    with _gc_lock:
+        return _spreadsheets.setdefault(sheet_id, sh)
 
 
+def _open_worksheet(sheet_id: str, ws_title: str) -> "gspread.Worksheet":
+    """
+    ワークシートを開いて返す。2回目以降はキャッシュ済みのハンドルを返す。
+    タブが存在しない場合は gspread.WorksheetNotFound を送出する（キャッシュしない）。
+    """
+    key = (sheet_id, ws_title)
+    ws = _worksheets.get(key)
+    if ws is not None:
+        return ws
+    ws = _open_spreadsheet(sheet_id).worksheet(ws_title)
+    with _gc_lock:
+        return _worksheets.setdefault(key, ws)
+
+
+def _cached_worksheet(sheet_id: str, ws_title: str) -> "gspread.Worksheet | None":
+    """キャッシュ済みのハンドルを返す（API は呼ばない）。未取得なら None。"""
+    return _worksheets.get((sheet_id, ws_title))
+
+
+def _remember_worksheet(sheet_id: str, ws: "gspread.Worksheet") -> "gspread.Worksheet":
+    """新規作成したワークシートをキャッシュに登録して返す。"""
+    with _gc_lock:
+        _worksheets[(sheet_id, ws.title)] = ws
+    return ws
+
+
+def _forget_worksheet(sheet_id: str, ws_title: str | None = None) -> None:
+    """
+    キャッシュ済みのハンドルを破棄する。
+    ws_title を省略するとスプレッドシートごと破棄する（タブの削除・改名後などに使う）。
+    """
+    with _gc_lock:
+        if ws_title is None:
+            _spreadsheets.pop(sheet_id, None)
+            for key in [k for k in _worksheets if k[0] == sheet_id]:
+                del _worksheets[key]
+        else:
+            _worksheets.pop((sheet_id, ws_title), None)
+
+# ============================================================
+# Discord ヘルパー
+# ============================================================
+
 async def safe_defer(interaction: discord.Interaction, *, ephemeral: bool = True) -> None:
     """
     Interaction の defer を安全に呼び出す。
@@ -1,24 +1,124 @@
 # ============================================================
 # generate_table.py - HTML テーブル生成モジュール
-# pandas DataFrame を Bootstrap + DataTables の HTML ページに変換する
+# 表データを Bootstrap + DataTables の HTML ページに変換する
+# マイページは「全ページ共通の静的シェル + ページごとの JSON データ」の形式でも出力できる
 # ============================================================
 
-import pandas as pd
+import html
+import json
+import re
+from typing import TYPE_CHECKING
 
+if TYPE_CHECKING:
+    import pandas as pd
 
-def generate_bootstrap_html_table(df: pd.DataFrame, title: str = "ねぶかわウィークリー 成績一覧") -> str:
-    """
-    DataFrame を Bootstrap 5 + DataTables を使った HTML ページに変換して返す。
-    数値列（回・順位・BPI・スコア等）は右寄せ、文字列列は左寄せで表示する。
-    """
-    table_html = df.to_html(
-        index=False,
-        escape=False,
-        table_id="results-table",
-        classes="table table-hover align-middle"
-    )
+# マイページの曲名リンク先（LR2IR のコースランキング。末尾に CourseID を付ける）
+LR2IR_COURSE_URL = "http://www.dream-pro.info/~lavalse/LR2IR/search.cgi?mode=ranking&courseid="
 
-    return f"""<!DOCTYPE html>
+# ページ共通のスタイル
+PAGE_CSS = """body {
+  background-color: #f7fbff; /* 薄い水色背景 */
+  color: #333;
+  line-height: 1.6;
+}
+.page-wrap {
+  max-width: 1100px;
+  margin: 40px auto;
+  padding: 0 16px;
+}
+h1 {
+  margin-bottom: 20px;
+  font-weight: 600;
+  color: #0277bd; /* 深めの水色 */
+}
+.card-like {
+  background: #ffffff;
+  border: 1px solid #cce7f6;
+  border-radius: 12px;
+  box-shadow: 0 4px 10px rgba(0,0,0,.05);
+  padding: 20px;
+}
+
+/* テーブル見た目 */
+table.dataTable.table {
+  background: #ffffff;
+  border-collapse: separate;
+  border-spacing: 0;
+}
+thead th {
+  text-align: center !important;
+  background: #e1f5fe; /* 淡い水色 */
+  color: #01579b;
+}
+tbody td {
+  vertical-align: middle;
+}
+td.num, th.num {
+  text-align: right !important;
+  font-variant-numeric: tabular-nums;
+}
+td.txt { text-align: left !important; }
+
+/* ゼブラストライプ */
+table.dataTable tbody tr:nth-child(odd) td {
+  background: #f9fcff;
+}
+table.dataTable tbody tr:hover td {
+  background: #e1f5fe;
+}
+
+/* DataTables コンポーネント */
+.dataTables_wrapper .dataTables_filter input,
+.dataTables_wrapper .dataTables_length select {
+  border: 1px solid #90caf9;
+  border-radius: 6px;
+  padding: 4px 8px;
+}
+.dataTables_wrapper .dataTables_info {
+  color: #0277bd;
+}
+.dataTables_wrapper .dataTables_paginate .paginate_button {
+  border-radius: 6px !important;
+  border: 1px solid #90caf9 !important;
+  background: #e1f5fe !important;
+  color: #0277bd !important;
+  margin: 0 2px;
+  padding: 2px 8px !important;
+}
+.dataTables_wrapper .dataTables_paginate .paginate_button.current {
+  background: #29b6f6 !important;
+  border-color: #29b6f6 !important;
+  color: #fff !important;
+}
+"""
+
+
+def _indent(text: str, n: int) -> str:
+    pad = " " * n
+    return "\n".join(pad + line if line else line for line in text.splitlines())
+
+
+# ============================================================
+# HTML テーブル（ストリーミング描画）
+# ============================================================
+
+# 数値列（右寄せ・数値ソート）のヘッダー名
+NUMERIC_COLUMNS = frozenset({'回', 'Round', '順位', 'Rank', 'BPI', 'Score', 'Score Rate (%)', 'スコア', 'スコアレート'})
+# 書式つき数値（"95.5%" 等）の列
+FORMATTED_NUMBER_COLUMNS = frozenset({'スコアレート', 'Score Rate (%)'})
+# 表示文字列の先頭の数値を data-order に設定する列（"1位 / 20人" や "★12" の文字列ソート対策）
+LEADING_NUMBER_COLUMNS = frozenset({'順位', 'Rank', '難易度'})
+# デフォルトのソート列
+DEFAULT_ORDER_COLUMNS = ('回', 'Round')
+
+# 何行ずつまとめて1つのチャンクにするか
+ROW_CHUNK: int = 256
+
+_TAG_RE = re.compile(r"<[^>]*>")
+_INT_RE = re.compile(r"\d+")
+
+# ページの前半（{title} は描画時に差し込む）
+_PAGE_HEAD_TEMPLATE = """<!DOCTYPE html>
 <html lang="ja">
 <head>
   <meta charset="UTF-8" />
@@ -29,160 +129,329 @@ def generate_bootstrap_html_table(df: pd.DataFrame, title: str = "ねぶかわ
   <link href="https://cdn.datatables.net/v/bs5/dt-2.0.7/datatables.min.css" rel="stylesheet"/>
 
   <style>
-    body {{
-      background-color: #f7fbff; /* 薄い水色背景 */
-      color: #333;
-      line-height: 1.6;
-    }}
-    .page-wrap {{
-      max-width: 1100px;
-      margin: 40px auto;
-      padding: 0 16px;
-    }}
-    h1 {{
-      margin-bottom: 20px;
-      font-weight: 600;
-      color: #0277bd; /* 深めの水色 */
-    }}
-    .card-like {{
-      background: #ffffff;
-      border: 1px solid #cce7f6;
-      border-radius: 12px;
-      box-shadow: 0 4px 10px rgba(0,0,0,.05);
-      padding: 20px;
-    }}
-
-    /* テーブル見た目 */
-    table.dataTable.table {{
-      background: #ffffff;
-      border-collapse: separate;
-      border-spacing: 0;
-    }}
-    thead th {{
-      text-align: center !important;
-      background: #e1f5fe; /* 淡い水色 */
-      color: #01579b;
-    }}
-    tbody td {{
-      vertical-align: middle;
-    }}
-    td.num, th.num {{
-      text-align: right !important;
-      font-variant-numeric: tabular-nums;
-    }}
-    td.txt {{ text-align: left !important; }}
-
-    /* ゼブラストライプ */
-    table.dataTable tbody tr:nth-child(odd) td {{
-      background: #f9fcff;
-    }}
-    table.dataTable tbody tr:hover td {{
-      background: #e1f5fe;
-    }}
-
-    /* DataTables コンポーネント */
-    .dataTables_wrapper .dataTables_filter input,
-    .dataTables_wrapper .dataTables_length select {{
-      border: 1px solid #90caf9;
-      border-radius: 6px;
-      padding: 4px 8px;
-    }}
-    .dataTables_wrapper .dataTables_info {{
-      color: #0277bd;
-    }}
-    .dataTables_wrapper .dataTables_paginate .paginate_button {{
-      border-radius: 6px !important;
-      border: 1px solid #90caf9 !important;
-      background: #e1f5fe !important;
-      color: #0277bd !important;
-      margin: 0 2px;
-      padding: 2px 8px !important;
-    }}
-    .dataTables_wrapper .dataTables_paginate .paginate_button.current {{
-      background: #29b6f6 !important;
-      border-color: #29b6f6 !important;
-      color: #fff !important;
-    }}
+{css}
   </style>
 </head>
 <body>
   <div class="page-wrap">
     <h1>{title}</h1>
     <div class="card-like">
-      {table_html}
-    </div>
+"""
+
+# ページの後半。列の種類・デフォルトのソート列は table / th の属性から読む
+_PAGE_TAIL = r"""    </div>
   </div>
 
   <script src="https://cdn.jsdelivr.net/npm/jquery@3.7.1/dist/jquery.min.js"></script>
   <script src="https://cdn.datatables.net/v/bs5/dt-2.0.7/datatables.min.js"></script>
 
   <script>
-    (function() {{
+    (function() {
       const table = document.getElementById('results-table');
       if (!table) return;
 
-      // 数値列のヘッダー名（右寄せ対象）
-      const numericHeaderNames = new Set(['回','Round','順位','Rank','BPI','Score','Score Rate (%)','スコア','スコアレート']);
-      const headers = Array.from(table.querySelectorAll('thead th'));
-      const numericIdx = [];
-      headers.forEach((th, i) => {{
-        const name = th.textContent.trim();
-        if (numericHeaderNames.has(name)) {{
-          th.classList.add('num');
-          numericIdx.push(i);
-        }}
-      }});
-
-      // 各セルに num / txt クラスを付与
-      const rows = table.tBodies[0] ? Array.from(table.tBodies[0].rows) : [];
-
-      // 先頭の数値を data-order に設定してソートできるようにする列（★10 等の文字列ソート対策）
-      ['順位', 'Rank', '難易度'].forEach(colName => {{
-        const idx = headers.findIndex(th => th.textContent.trim() === colName);
-        if (idx < 0) return;
-        rows.forEach(tr => {{
-          const td = tr.cells[idx];
-          const m = td.textContent.trim().match(/(\d+)/);
-          if (m) td.setAttribute('data-order', m[1]);
-        }});
-      }});
-      rows.forEach(tr => {{
-        Array.from(tr.cells).forEach((td, i) => {{
-          if (numericIdx.includes(i)) td.classList.add('num');
-          else td.classList.add('txt');
-        }});
-      }});
-
-      // デフォルトソート列を「回」または「Round」に設定
-      let defaultOrder = [[0, 'asc']];
-      const roundIdx = headers.findIndex(th => {{
-        const t = th.textContent.trim();
-        return t === '回' || t === 'Round';
-      }});
-      if (roundIdx >= 0) defaultOrder = [[roundIdx, 'asc']];
-
-      new DataTable('#results-table', {{
+      // num / txt クラスと data-order はサーバー側で付与済み。ここでは列の型だけを設定する
+      const columnDefs = Array.from(table.querySelectorAll('thead th'))
+        .map((th, i) => ({ targets: i, type: th.dataset.type }))
+        .filter(def => def.type);
+
+      new DataTable('#results-table', {
         responsive: true,
-        order: defaultOrder,
+        order: [[Number(table.dataset.orderColumn || 0), 'asc']],
         pageLength: 25,
-        language: {{
+        language: {
           search: "検索:",
           lengthMenu: "表示件数: _MENU_",
           info: "_TOTAL_ 件中 _START_ 〜 _END_ を表示",
           infoEmpty: "0 件中 0 〜 0 を表示",
-          paginate: {{ first: "最初", last: "最後", next: "次へ", previous: "前へ" }},
+          paginate: { first: "最初", last: "最後", next: "次へ", previous: "前へ" },
           zeroRecords: "一致する記録が見つかりません"
-        }},
-        columnDefs: numericIdx.map(i => {{
-          const name = headers[i] ? headers[i].textContent.trim() : '';
-          const isRatePct = name === 'スコアレート' || name === 'Score Rate (%)';
-          return {{
-            targets: i,
-            type: isRatePct ? 'num-fmt' : 'num',
-          }};
-        }})
-      }});
-    }})();
+        },
+        columnDefs: columnDefs
+      });
+    })();
   </script>
 </body>
 </html>"""
+
+# 起動時にテンプレートを {title} の位置で分割しておき、描画時は結合するだけにする
+_PAGE_HEAD_PARTS = _PAGE_HEAD_TEMPLATE.replace("{css}", _indent(PAGE_CSS, 4)).split("{title}")
+
+
+def _cell_text(v) -> str:
+    """セル値を文字列にする（None / NaN は空文字）。"""
+    if v is None or (isinstance(v, float) and v != v):
+        return ""
+    return str(v)
+
+
+def iter_html_table(
+    columns: list[str],
+    rows,
+    title: str = "ねぶかわウィークリー 成績一覧",
+    escape: bool = True,
+):
+    """
+    列名のリストと行のイテラブル（各行はセル値のシーケンス）から
+    Bootstrap 5 + DataTables の HTML ページを ROW_CHUNK 行ずつのチャンクで順に返す。
+    num / txt クラスと data-order（LEADING_NUMBER_COLUMNS の列）はここで付与する。
+    escape=False の場合、セル値は HTML としてそのまま出力する（信頼できる値にのみ使う）。
+    """
+    columns = [str(c) for c in columns]
+    yield html.escape(title).join(_PAGE_HEAD_PARTS)
+
+    order_idx = next((i for i, c in enumerate(columns) if c in DEFAULT_ORDER_COLUMNS), 0)
+    head = [f'      <table id="results-table" class="table table-hover align-middle" data-order-column="{order_idx}">\n'
+            '        <thead>\n          <tr>']
+    td_open = []
+    leading = []
+    for c in columns:
+        numeric = c in NUMERIC_COLUMNS
+        cls = "num" if numeric else "txt"
+        dtype = ("num-fmt" if c in FORMATTED_NUMBER_COLUMNS else "num") if numeric else ""
+        type_attr = f' data-type="{dtype}"' if dtype else ""
+        head.append(f'<th class="{cls}"{type_attr}>{html.escape(c)}</th>')
+        td_open.append(f'<td class="{cls}"')
+        leading.append(c in LEADING_NUMBER_COLUMNS)
+    head.append("</tr>\n        </thead>\n        <tbody>\n")
+    yield "".join(head)
+
+    cells = list(zip(td_open, leading))
+    buf: list[str] = []
+    for n, row in enumerate(rows, 1):
+        buf.append("          <tr>")
+        for (open_tag, lead), v in zip(cells, row):
+            text = _cell_text(v)
+            buf.append(open_tag)
+            if lead:
+                m = _INT_RE.search(_TAG_RE.sub("", text))
+                if m:
+                    buf.append(f' data-order="{m.group()}"')
+            buf.append(">")
+            buf.append(html.escape(text) if escape else text)
+            buf.append("</td>")
+        buf.append("</tr>\n")
+        if n % ROW_CHUNK == 0:
+            yield "".join(buf)
+            buf.clear()
+    buf.append("        </tbody>\n      </table>\n")
+    yield "".join(buf)
+    yield _PAGE_TAIL
+
+
+def render_html_table(
+    columns: list[str],
+    rows,
+    title: str = "ねぶかわウィークリー 成績一覧",
+    escape: bool = True,
+) -> str:
+    """iter_html_table の出力を1つの文字列にして返す。"""
+    return "".join(iter_html_table(columns, rows, title, escape))
+
+
+def generate_bootstrap_html_table(df: "pd.DataFrame", title: str = "ねぶかわウィークリー 成績一覧") -> str:
+    """
+    DataFrame を Bootstrap 5 + DataTables を使った HTML ページに変換して返す。
+    数値列（回・順位・BPI・スコア等）は右寄せ、文字列列は左寄せで表示する。
+    セル値は HTML としてそのまま出力する（リンク等を含められる）。
+    """
+    return render_html_table(list(df.columns), df.itertuples(index=False, name=None), title, escape=False)
+
+
+# ============================================================
+# 静的シェル + JSON データ形式
+# ============================================================
+
+# マイページの列定義。render は静的シェル側の表示方法
+#   link: [曲名, CourseID] → LR2IR へのリンク / keyed: [表示値, ソート値]
+#   rank: [順位, 総人数] → "N位 / M人"（上位3位は色付き） / pct: 数値 → "N%"
+MYPAGE_COLUMNS = [
+    {"title": "回", "className": "num", "type": "num"},
+    {"title": "曲名", "className": "txt", "type": "string", "render": "link"},
+    {"title": "難易度", "className": "txt", "type": "num", "render": "keyed"},
+    {"title": "順位", "className": "num", "type": "num", "render": "rank"},
+    {"title": "スコア", "className": "num", "type": "num"},
+    {"title": "スコアレート", "className": "num", "type": "num", "render": "pct"},
+    {"title": "BPI", "className": "num", "type": "num"},
+]
+
+
+def _to_number(v):
+    """シート由来の値（"1234" / 95.5 / "" 等）を数値に変換する。変換できなければ空文字。"""
+    if isinstance(v, bool):
+        return ""
+    if isinstance(v, (int, float)):
+        return "" if v != v else v
+    try:
+        n = float(str(v).replace(",", "").rstrip("%"))
+    except ValueError:
+        return ""
+    return int(n) if n.is_integer() else n
+
+
+def _level_key(diff: str):
+    """"★12" 等の難易度表記からソート用の数値を取り出す。取り出せなければ空文字。"""
+    digits = "".join(c for c in str(diff) if c.isdigit())
+    return int(digits) if digits else ""
+
+
+def build_mypage_data(rows: list[dict], title: str = "ねぶかわウィークリー 成績一覧") -> dict:
+    """
+    /mypage all の全回の成績を、静的シェル（MYPAGE_JS）が読む JSON 用の dict に変換する。
+    表示用の HTML はブラウザ側で組み立てるため、データには値とソート用の数値だけを載せる。
+    rows: [{"round", "title", "course_id", "diff", "rank", "total", "score", "rate", "bpi"}, ...]
+    戻り値: {"title", "linkBase", "columns", "order", "data": [[セル, ...], ...]}
+    """
+    data = [
+        [
+            int(r["round"]),
+            [str(r.get("title") or ""), str(r.get("course_id") or "")],
+            [str(r.get("diff") or ""), _level_key(r.get("diff") or "")],
+            [_to_number(r.get("rank")), _to_number(r.get("total"))],
+            _to_number(r.get("score")),
+            _to_number(r.get("rate")),
+            _to_number(r.get("bpi")),
+        ]
+        for r in sorted(rows, key=lambda r: int(r["round"]))
+    ]
+    return {
+        "title": title,
+        "linkBase": LR2IR_COURSE_URL,
+        "columns": MYPAGE_COLUMNS,
+        "order": [[0, "asc"]],
+        "data": data,
+    }
+
+
+_RANK_COLORS = {1: "gold", 2: "silver", 3: "#cd7f32"}
+
+
+def _mypage_row_html(row: list) -> tuple:
+    """build_mypage_data の1行を、静的シェルと同じ表示の HTML セルに変換する。"""
+    rnd, (title, course_id), (diff, _), (rank, total), score, rate, bpi = row
+    title_cell = html.escape(title)
+    if course_id:
+        title_cell = f'<a href="{html.escape(LR2IR_COURSE_URL + course_id)}" target="_blank">{title_cell}</a>'
+    rank_cell = f"{rank}位"
+    if rank in _RANK_COLORS:
+        rank_cell = f'<span style="color:{_RANK_COLORS[rank]}; font-weight:bold;">{rank_cell}</span>'
+    return (
+        rnd,
+        title_cell,
+        html.escape(diff),
+        f"{rank_cell} / {total}人",
+        score,
+        f"{rate}%" if rate != "" else "",
+        bpi,
+    )
+
+
+def iter_mypage_table(data: dict):
+    """
+    build_mypage_data の結果を JavaScript なしで読める HTML ページとしてチャンクで順に返す
+    （静的シェルの <noscript> から辿る表示）。
+    """
+    columns = [c["title"] for c in data["columns"]]
+    rows = (_mypage_row_html(row) for row in data["data"])
+    return iter_html_table(columns, rows, data["title"], escape=False)
+
+
+def dump_table_data(data: dict) -> str:
+    """build_mypage_data の結果を空白なしの JSON 文字列にする。"""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+# 静的シェルのスクリプト。ページの URL + "/data.json" を読み込んで DataTables に渡す
+MYPAGE_JS = r"""(function () {
+  const heading = document.getElementById('page-title');
+  const status = document.getElementById('status');
+  const url = location.pathname.replace(/\/+$/, '') + '/data.json';
+
+  const esc = s => String(s).replace(/[&<>"']/g, c => ({
+    '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+  })[c]);
+  const rankColors = { 1: 'gold', 2: 'silver', 3: '#cd7f32' };
+  const isKey = type => type === 'sort' || type === 'type';
+
+  // 列の render 指定ごとの表示方法（type: display / filter / sort / type）
+  const renderers = {
+    link: (v, type, base) => type !== 'display' ? v[0]
+      : v[1] ? '<a href="' + esc(base + v[1]) + '" target="_blank">' + esc(v[0]) + '</a>' : esc(v[0]),
+    keyed: (v, type) => isKey(type) ? v[1] : esc(v[0]),
+    rank: (v, type) => {
+      if (isKey(type)) return v[0];
+      const color = type === 'display' && rankColors[v[0]];
+      const rank = color
+        ? '<span style="color:' + color + '; font-weight:bold;">' + v[0] + '位</span>'
+        : v[0] + '位';
+      return rank + ' / ' + v[1] + '人';
+    },
+    pct: (v, type) => isKey(type) || v === '' ? v : v + '%',
+  };
+
+  fetch(url, { credentials: 'same-origin' })
+    .then(res => {
+      if (!res.ok) throw new Error(res.status === 404
+        ? 'このページは存在しないか、有効期限切れです。再度コマンドを実行してください。'
+        : 'データの取得に失敗しました（' + res.status + '）');
+      return res.json();
+    })
+    .then(d => {
+      document.title = d.title;
+      heading.textContent = d.title;
+      status.remove();
+      new DataTable('#results-table', {
+        data: d.data,
+        deferRender: true,
+        responsive: true,
+        order: d.order,
+        pageLength: 25,
+        columns: d.columns.map((c, i) => ({
+          title: c.title, className: c.className, type: c.type, data: i,
+          render: c.render ? (v, type) => renderers[c.render](v, type, d.linkBase) : null,
+        })),
+        language: {
+          search: "検索:",
+          lengthMenu: "表示件数: _MENU_",
+          info: "_TOTAL_ 件中 _START_ 〜 _END_ を表示",
+          infoEmpty: "0 件中 0 〜 0 を表示",
+          paginate: { first: "最初", last: "最後", next: "次へ", previous: "前へ" },
+          zeroRecords: "一致する記録が見つかりません"
+        },
+      });
+    })
+    .catch(err => { status.textContent = err.message; });
+})();
+"""
+
+
+def render_page_shell(css_href: str, js_href: str) -> str:
+    """
+    全マイページ共通の静的シェル HTML を返す。
+    データはページの URL + "/data.json" から読み込むため、シェル自体はトークンによらず同じ内容。
+    """
+    return f"""<!DOCTYPE html>
+<html lang="ja">
+<head>
+  <meta charset="UTF-8" />
+  <meta name="viewport" content="width=device-width, initial-scale=1" />
+  <title>ねぶかわウィークリー 成績一覧</title>
+  <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css" rel="stylesheet">
+  <link href="https://cdn.datatables.net/v/bs5/dt-2.0.7/datatables.min.css" rel="stylesheet"/>
+  <link href="{css_href}" rel="stylesheet">
+</head>
+<body>
+  <div class="page-wrap">
+    <h1 id="page-title">ねぶかわウィークリー 成績一覧</h1>
+    <div class="card-like">
+      <p id="status">読み込み中...</p>
+      <noscript><a href="?view=table">JavaScript なしで表示する</a></noscript>
+      <table id="results-table" class="table table-hover align-middle"></table>
+    </div>
+  </div>
+
+  <script src="https://cdn.jsdelivr.net/npm/jquery@3.7.1/dist/jquery.min.js"></script>
+  <script src="https://cdn.datatables.net/v/bs5/dt-2.0.7/datatables.min.js"></script>
+  <script src="{js_href}"></script>
+</body>
+</html>"""
@@ -3,58 +3,211 @@
 # LR2IR のランキングページをスクレイピングして DataFrame で返す
 # ============================================================
 
-from io import StringIO
+import asyncio
+import re
+from itertools import islice
+from typing import TYPE_CHECKING
 
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+import aiohttp
+import lxml.html
+
+# pandas・requests は解析・同期取得の初回呼び出し時に読み込む（起動を速くする）
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 # LR2IR ランキングページのベース URL
 BASE_URL = 'http://www.dream-pro.info/~lavalse/LR2IR/search.cgi?mode=ranking&courseid='
 
+# HTTP 取得の設定
+REQUEST_TIMEOUT: float = 20.0   # 1リクエストの総タイムアウト（秒）
+CONNECT_TIMEOUT: float = 5.0    # 接続確立のタイムアウト（秒）
+MAX_RETRIES: int = 3            # 失敗時の再試行回数
+RETRY_BACKOFF: float = 1.0      # 再試行の待ち時間の基準（秒）。1, 2, 4... と倍々に伸ばす
+MAX_CONCURRENCY: int = 4        # LR2IR への同時リクエスト数の上限
+
+# ランキングページ内の楽曲リンクから BMSID を取り出す
+_BMSID_RE = re.compile(r'search\.cgi\?mode=ranking&bmsid=(\d+)')
+
+# 共有セッション（コネクションプール）と同時実行数の制限。イベントループ上で遅延生成する
+_session: aiohttp.ClientSession | None = None
+_semaphore: asyncio.Semaphore | None = None
+
+
+# ============================================================
+# HTML 解析
+# ============================================================
+
+# 取り出す列（ランキングテーブルのヘッダー名）
+_RANKING_COLUMNS = ('順位', 'プレイヤー', 'スコア', 'PG', 'GR')
+
+
+def _to_int(text: str) -> int | None:
+    """数字以外を含む文字列（"1,234" 等）から整数を取り出す。取り出せなければ None。"""
+    digits = ''.join(c for c in text if c.isdigit())
+    return int(digits) if digits else None
+
+
+def parse_ranking_page(html: str) -> "tuple[pd.DataFrame, int | None]":
+    """
+    LR2IR ランキングページの HTML を lxml で1回だけ解析し、
+    ランキングの各列と BMSID を同時に取り出す。
+    戻り値: (DataFrame[順位, LR2ID, プレイヤー, スコア, PG, GR], BMSID または None)
+    テーブル構造が想定と異なる場合は ValueError を送出する。
+    """
+    import pandas as pd
+
+    doc = lxml.html.document_fromstring(html)
+
+    # ランキングテーブルは4番目のテーブル（0-indexed で index=3）
+    target_table = next(islice(doc.iter('table'), 3, None), None)
+    if target_table is None:
+        raise ValueError("テーブルの数が予期より少ないためデータ取得に失敗しました。")
+
+    rows = target_table.iter('tr')
+    header_row = next(rows, None)
+    headers = [] if header_row is None else [c.text_content().strip() for c in header_row.xpath('./th|./td')]
+    try:
+        i_rank, i_player, i_score, i_pg, i_gr = (headers.index(c) for c in _RANKING_COLUMNS)
+    except ValueError:
+        raise ValueError(f"ランキングテーブルの列が想定と異なります: {headers}")
+    n_cols = max(i_rank, i_player, i_score, i_pg, i_gr, 3) + 1
+
+    ranks, lr2ids, players, scores, pgs, grs = [], [], [], [], [], []
+    for tr in rows:
+        cells = tr.findall('td')
+        # コメント行など列数の足りない行・4列目（クリア）が空の行は除外
+        if len(cells) < n_cols or not cells[3].text_content().strip():
+            continue
+
+        lr2id = None
+        for a in cells[i_player].iter('a'):
+            href = a.get('href') or ''
+            if 'playerid=' in href:
+                lr2id = href.split('playerid=')[1]
+                break
+
+        ranks.append(_to_int(cells[i_rank].text_content()))
+        lr2ids.append(lr2id)
+        players.append(cells[i_player].text_content().strip())
+        scores.append(cells[i_score].text_content().strip())
+        pgs.append(_to_int(cells[i_pg].text_content()))
+        grs.append(_to_int(cells[i_gr].text_content()))
+
+    df = pd.DataFrame({
+        '順位': ranks,
+        'LR2ID': lr2ids,
+        'プレイヤー': players,
+        'スコア': scores,
+        'PG': pgs,
+        'GR': grs,
+    })
+
+    bmsid = None
+    for href in doc.xpath('//a[contains(@href, "bmsid=")]/@href'):
+        m = _BMSID_RE.search(href)
+        if m:
+            bmsid = int(m.group(1))
+            break
+    return df, bmsid
+
+
+def parse_ranking_html(html: str) -> "pd.DataFrame":
+    """
+    LR2IR ランキングページの HTML を解析して DataFrame で返す。
+    カラム: 順位, LR2ID, プレイヤー, スコア, PG, GR
+    """
+    return parse_ranking_page(html)[0]
+
 
-def fetch_lr2_ranking(course_id: int) -> pd.DataFrame:
+def extract_bmsid(html: str) -> int | None:
+    """ランキングページの楽曲リンクから BMSID を取り出す。見つからない場合は None を返す。"""
+    m = _BMSID_RE.search(html)
+    return int(m.group(1)) if m else None
+
+
+# ============================================================
+# 同期 API（従来互換）
+# ============================================================
+
+def fetch_lr2_ranking(course_id: int) -> "pd.DataFrame":
     """
     指定した CourseID の LR2IR ランキングを取得して DataFrame で返す。
     取得に失敗した場合は空の DataFrame を返す。
     カラム: 順位, LR2ID, プレイヤー, スコア, PG, GR
     """
+    import pandas as pd
+    import requests
+
     url = f'{BASE_URL}{course_id}'
 
     try:
-        res = requests.get(url)
+        res = requests.get(url, timeout=REQUEST_TIMEOUT)
         res.encoding = 'cp932'  # LR2IR は Shift-JIS 系エンコーディング
-        soup = BeautifulSoup(res.text, 'html.parser')
-        tables = soup.find_all('table')
-
-        if len(tables) < 4:
-            raise ValueError("テーブルの数が予期より少ないためデータ取得に失敗しました。")
-
-        # ランキングテーブルは4番目のテーブル（0-indexed で index=3）
-        target_table = tables[3]
-        df = pd.read_html(StringIO(str(target_table)))[0]
-
-        # プレイヤーのリンクタグから LR2ID（playerid）を抽出
-        player_links = []
-        for row in target_table.find_all('tr')[1:]:  # ヘッダー行を除外
-            cols = row.find_all('td')
-            if len(cols) >= 2:
-                a_tag = cols[1].find('a')
-                if a_tag and a_tag.get('href') and "playerid=" in a_tag['href']:
-                    player_links.append(a_tag['href'].split("playerid=")[1])
-                else:
-                    player_links.append(None)
-            else:
-                player_links.append(None)
-
-        df['LR2ID'] = player_links
-
-        # スコアが空の不正行を除外し、必要なカラムのみに絞る
-        df = df.dropna(subset=[df.columns[3]])[['順位', 'LR2ID', 'プレイヤー', 'スコア', 'PG', 'GR']]
-        df = df.reset_index(drop=True)
-        return df
+        return parse_ranking_html(res.text)
 
     except Exception as e:
         print(f"ランキング取得中にエラーが発生しました: {e}")
         return pd.DataFrame()
+
+
+# ============================================================
+# 非同期 API
+# ============================================================
+
+def _get_session() -> aiohttp.ClientSession:
+    """共有の aiohttp セッションを返す（未生成・クローズ済みなら生成する）。"""
+    global _session, _semaphore
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=MAX_CONCURRENCY, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+        )
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    return _session
+
+
+async def _fetch_html(url: str) -> str:
+    """
+    URL の HTML を cp932 でデコードして返す。
+    接続エラー・タイムアウト・5xx は指数バックオフで MAX_RETRIES 回まで再試行する。
+    """
+    session = _get_session()
+    last_error: Exception | None = None
+    for attempt in range(MAX_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+        try:
+            async with _semaphore:
+                async with session.get(url) as res:
+                    res.raise_for_status()
+                    body = await res.read()
+            return body.decode('cp932', errors='replace')  # LR2IR は Shift-JIS 系エンコーディング
+        except aiohttp.ClientResponseError as e:
+            if e.status < 500:
+                raise
+            last_error = e
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            last_error = e
+    raise last_error
+
+
+async def fetch_lr2_ranking_async(course_id: int) -> "tuple[pd.DataFrame, int | None]":
+    """
+    指定した CourseID の LR2IR ランキングを非同期で取得する。
+    1回のページ取得でランキングと BMSID をまとめて返す。
+    戻り値: (DataFrame[順位, LR2ID, プレイヤー, スコア, PG, GR], BMSID または None)
+    取得・解析に失敗した場合は例外を送出する。
+    """
+    html = await _fetch_html(f'{BASE_URL}{course_id}')
+    # HTML の解析は CPU を使うのでイベントループを塞がないようスレッドプールで実行
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, parse_ranking_page, html)
+
+
+async def close_session() -> None:
+    """共有セッションを閉じる。Bot 終了時に呼び出す。"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
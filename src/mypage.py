@@ -4,10 +4,24 @@
 # ============================================================
 
 import asyncio
+import hashlib
+import json
+from typing import TYPE_CHECKING
 
-import gspread
+from src.common import _open_spreadsheet, _open_worksheet
+from src.score_store import get_synced_store
+from src.user_directory import lr2id_for_discord_sync
+from src.sheet_cache import (
+    sheet_cache,
+    cached_records,
+    COURSE_DATA_TTL,
+    RESULT_TAB_TTL,
+    TAB_LIST_TTL,
+)
 
-from src.common import _authorize_gc
+# gspread は初回の Sheets アクセス時に読み込まれる（起動時には import しない）
+if TYPE_CHECKING:
+    import gspread
 
 
 # ============================================================
@@ -51,10 +65,7 @@ def _get_course_meta_sync(
     CourseData タブから指定の回（Round または 回）の {title, diff} を返す。
     見つからない場合は None を返す。
     """
-    gc = _authorize_gc()
-    sh = gc.open_by_key(main_sheet_id)
-    ws = sh.worksheet(ws_title)
-    rows = ws.get_all_records()
+    rows = cached_records(main_sheet_id, ws_title, COURSE_DATA_TTL)
     target = str(round_value).strip()
     for r in rows:
         rv = r.get("Round", r.get("回"))
@@ -71,14 +82,37 @@ def load_course_meta_map_sync(
     ws_title: str = "CourseData",
 ) -> dict[str, dict]:
     """
-    CourseData タブを読み込み、{ '1': {'title': '...', 'diff': '...'}, ... } を返す。
+    CourseData を読み込み、{ '1': {'title': '...', 'diff': '...'}, ... } を返す。
+    ローカル成績ストアが同期済みならそちらから返す。
+    """
+    store = get_synced_store()
+    if store is not None:
+        return store.course_meta_map()
+    return _load_course_meta_map_from_sheet_sync(main_sheet_id, ws_title)
+
+
+def _load_course_meta_map_from_sheet_sync(
+    main_sheet_id: str,
+    ws_title: str = "CourseData",
+    use_cache: bool = True,
+) -> dict[str, dict]:
+    """
+    CourseData タブを Sheets から読み込み、{ '1': {'title': '...', 'diff': '...'}, ... } を返す。
     許容ヘッダー: Round/回, title/曲名, diff/難易度
+    use_cache=True では解析後の dict をキャッシュし、同時に呼ばれた場合も読み込み・解析は1回で済ませる。
+    呼び出し側は戻り値を変更しないこと（キャッシュと共有される）。
     """
-    gc = _authorize_gc()
-    sh = gc.open_by_key(main_sheet_id)
-    ws = sh.worksheet(ws_title)
-    rows = ws.get_all_records()
+    if use_cache:
+        return sheet_cache.get_or_load(
+            (main_sheet_id, ws_title, "meta_map"),
+            lambda: _parse_course_meta(cached_records(main_sheet_id, ws_title, COURSE_DATA_TTL)),
+            COURSE_DATA_TTL,
+        )
+    return _parse_course_meta(_open_worksheet(main_sheet_id, ws_title).get_all_records())
+
 
+def _parse_course_meta(rows: list[dict]) -> dict[str, dict]:
+    """CourseData の get_all_records() の結果を回ごとのメタ情報 dict に変換する。"""
     meta = {}
     for r in rows:
         rnd = _get_value_fuzzy(r, "Round", "回")
@@ -98,16 +132,16 @@ def load_course_meta_map_sync(
 def _fetch_round_worksheet_sync(
     result_sheet_id: str,
     round_value: str | int,
-) -> gspread.Worksheet | None:
+) -> "gspread.Worksheet | None":
     """
     NebukawaIR(result) から指定の回のワークシートを返す。
     タブが存在しない場合は None を返す。
     """
-    gc = _authorize_gc()
-    sh = gc.open_by_key(result_sheet_id)
+    import gspread
+
     title = str(round_value).strip()
     try:
-        return sh.worksheet(title)
+        return _open_worksheet(result_sheet_id, title)
     except gspread.WorksheetNotFound:
         return None
 
@@ -121,11 +155,18 @@ def _fetch_user_record_one_round_sync(
     指定の回のタブから LR2ID が一致する1行を返す。
     戻り値: (行データ dict または None, 総参加人数)
     期待カラム: Rank, LR2ID, PlayerName, Score, Score Rate (%), BPI
+    ローカル成績ストアが同期済みならそちらから返す。
     """
-    ws = _fetch_round_worksheet_sync(result_sheet_id, round_value)
-    if ws is None:
+    store = get_synced_store()
+    if store is not None:
+        key = _norm_round(round_value)
+        return store.user_record(int(key), lr2id) if key.isdigit() else (None, 0)
+    import gspread
+
+    try:
+        rows = cached_records(result_sheet_id, str(round_value).strip(), RESULT_TAB_TTL)
+    except gspread.WorksheetNotFound:
         return None, 0
-    rows = ws.get_all_records()
     total = len(rows)
     for r in rows:
         if str(r.get("LR2ID")).strip() == str(lr2id).strip():
@@ -133,50 +174,144 @@ def _fetch_user_record_one_round_sync(
     return None, total
 
 
+def _numeric_tabs_sync(sh: "gspread.Spreadsheet") -> list[tuple[str, int]]:
+    """
+    結果シートのタブのうち、タブ名が数字のもの（回ごとのシート）を [(タブ名, 回), ...] で返す。
+    worksheets() は1回の API 呼び出しで、結果はキャッシュする。
+    """
+    return sheet_cache.get_or_load(
+        (sh.id, None, "tabs"),
+        lambda: [
+            (ws.title, int(ws.title.strip()))
+            for ws in sh.worksheets()
+            if ws.title.strip().isdigit()
+        ],
+        TAB_LIST_TTL,
+    )
+
+
+def _batch_get_tabs_cached(
+    sh: "gspread.Spreadsheet",
+    titles: list[str],
+    kind: str,
+    a1: str,
+) -> dict[str, list[list]]:
+    """
+    各タブの範囲 a1（例: "A:Z", "B:B"）の値を {タブ名: values} で返す。
+    キャッシュ（キー: (sheet_id, タブ名, kind)）にないタブだけを
+    values_batch_get の1回の API 呼び出しでまとめて取得する。
+    別スレッドが同じタブを取得中なら、そのタブは取得せずに結果を待つ。
+    """
+    def load(keys: list) -> dict:
+        response = sh.values_batch_get([f"'{key[1]}'!{a1}" for key in keys])
+        value_ranges = response.get("valueRanges", [])
+        return {key: (value_ranges[i].get("values", []) if i < len(value_ranges) else [])
+                for i, key in enumerate(keys)}
+
+    values = sheet_cache.get_or_load_many([(sh.id, title, kind) for title in titles], load, RESULT_TAB_TTL)
+    return {key[1]: v for key, v in values.items()}
+
+
+def _row_dict(headers: list, row: list) -> dict:
+    """ヘッダーと1行分の値から dict を作る（列数が足りない行は空文字で補完）。"""
+    return dict(zip(headers, row + [""] * (len(headers) - len(row))))
+
+
 def _fetch_user_records_all_rounds_sync(
     result_sheet_id: str,
     lr2id: str,
+    targeted: bool = True,
 ) -> list[dict]:
     """
     NebukawaIR(result) の全タブを走査し、ユーザーの全記録を返す。
     タブ名が数字のもの（回ごとのシート）のみ対象とする。
-    values_batch_get で全タブを1回の API 呼び出しで取得してレート制限を回避する。
+    targeted=True（既定）では2段階で取得する:
+      1. 全タブの LR2ID 列（B列）だけを values_batch_get で取得（タブ単位でキャッシュし全ユーザーで共有）
+      2. LR2ID が一致したタブのヘッダー行と該当行だけを values_batch_get で取得
+    通信量・解析コストは参加者数の総計ではなく、本人の参加回数に比例する。
+    B1 が "LR2ID" でない（レイアウトの異なる）タブと targeted=False では、タブ全体（A:Z）を取得する。
+    2段目で取得した行の LR2ID が一致しない（キャッシュした行番号が古い）タブも、キャッシュを破棄してタブ全体を取得し直す。
+    ローカル成績ストアが同期済みならそちらから返す。
     戻り値: [{'round': int, 'row': dict, 'total': int}, ...]
     """
-    gc = _authorize_gc()
-    sh = gc.open_by_key(result_sheet_id)
+    store = get_synced_store()
+    if store is not None:
+        return store.user_records(lr2id)
 
-    # 数字タブのみ対象（worksheets() は1回の API 呼び出し）
-    numeric_ws = [
-        (ws, int(ws.title.strip()))
-        for ws in sh.worksheets()
-        if ws.title.strip().isdigit()
-    ]
-    if not numeric_ws:
+    sh = _open_spreadsheet(result_sheet_id)
+    numeric_tabs = _numeric_tabs_sync(sh)
+    if not numeric_tabs:
         return []
 
-    # 全タブを1回の API 呼び出しで取得
-    ranges = [f"'{ws.title}'!A:Z" for ws, _ in numeric_ws]
-    response = sh.values_batch_get(ranges)
-
+    target = str(lr2id).strip()
+    round_of = dict(numeric_tabs)
     results = []
-    for (_, round_no), value_range in zip(numeric_ws, response.get("valueRanges", [])):
-        all_values = value_range.get("values", [])
-        if len(all_values) < 2:
-            continue
-        headers = all_values[0]
-        # 列数が足りない行は空文字で補完
-        rows = [
-            dict(zip(headers, row + [""] * (len(headers) - len(row))))
-            for row in all_values[1:]
-        ]
-        total = len(rows)
-        for r in rows:
-            if str(r.get("LR2ID", "")).strip() == str(lr2id).strip():
-                results.append({"round": round_no, "row": r, "total": total})
-                break
+
+    # ---- 1段目: LR2ID 列だけを取得して、一致する行番号と総人数を求める ----
+    full_titles = [title for title, _ in numeric_tabs]
+    matched: list[tuple[str, int, int]] = []   # (タブ名, シート上の行番号, 総人数)
+    if targeted:
+        id_cols = _batch_get_tabs_cached(sh, full_titles, "lr2ids", "B:B")
+        full_titles = []
+        for title, _ in numeric_tabs:
+            col = id_cols[title]
+            if not col or not col[0] or col[0][0] != "LR2ID":
+                full_titles.append(title)
+                continue
+            for i, cell in enumerate(col[1:], start=2):
+                if cell and str(cell[0]).strip() == target:
+                    matched.append((title, i, len(col) - 1))
+                    break
+
+    # ---- 2段目: 一致したタブのヘッダー行と該当行だけを取得 ----
+    if matched:
+        ranges = []
+        for title, row_no, _ in matched:
+            ranges += [f"'{title}'!A1:Z1", f"'{title}'!A{row_no}:Z{row_no}"]
+        value_ranges = sh.values_batch_get(ranges).get("valueRanges", [])
+        for k, (title, _, total) in enumerate(matched):
+            header = (value_ranges[2 * k].get("values") or [[]])[0]
+            row = (value_ranges[2 * k + 1].get("values") or [[]])[0]
+            r = _row_dict(header, row) if header and row else {}
+            if str(r.get("LR2ID", "")).strip() != target:
+                # キャッシュした B 列より後にタブが書き換えられ、行番号がずれている。
+                # そのタブのキャッシュを捨てて、タブ全体を取得する経路で読み直す
+                sheet_cache.invalidate(sh.id, title)
+                full_titles.append(title)
+                continue
+            results.append({"round": round_of[title], "row": r, "total": total})
+
+    # ---- タブ全体を取得する経路（非ターゲットモード・レイアウトの異なるタブ・行番号が古かったタブ） ----
+    if full_titles:
+        tab_values = _batch_get_tabs_cached(sh, full_titles, "values", "A:Z")
+        for title in full_titles:
+            all_values = tab_values[title]
+            if len(all_values) < 2:
+                continue
+            headers = all_values[0]
+            rows = all_values[1:]
+            for row in rows:
+                r = _row_dict(headers, row)
+                if str(r.get("LR2ID", "")).strip() == target:
+                    results.append({"round": round_of[title], "row": r, "total": len(rows)})
+                    break
+
+    results.sort(key=lambda rec: rec["round"])
     return results
 
+
+def mypage_fingerprint(records: list[dict], meta_map: dict[str, dict]) -> str:
+    """
+    /mypage all のページの元データ（全回の成績と、その回の CourseData）のハッシュを返す。
+    同じ値なら描画結果も同じなので、保存済みページを再利用できる。
+    """
+    payload = [
+        (rec["round"], rec["row"], rec["total"], meta_map.get(str(rec["round"])))
+        for rec in records
+    ]
+    data = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
 # ============================================================
 # UserData 読み込み
 # ============================================================
@@ -190,17 +325,6 @@ def _get_lr2id_by_discord_sync(
     UserData タブから DiscordID に対応する LR2ID を返す。
     見つからない場合は None を返す。
     許容列名: DiscordID / discord_id / ディスコードID, LR2ID / lr2_id / lr2id
+    メモリ上の対応表（user_directory）から引くため、読み込み済みなら API を呼ばない。
     """
-    gc = _authorize_gc()
-    sh = gc.open_by_key(sheet_id)
-    ws = sh.worksheet(ws_title)
-    rows = ws.get_all_records()
-    target = str(discord_id).strip()
-    for r in rows:
-        did = _get_value_fuzzy(r, "DiscordID", "discord_id", "discordid", "ディスコードID")
-        if did is None:
-            continue
-        if str(did).strip() == target:
-            lr2 = _get_value_fuzzy(r, "LR2ID", "lr2_id", "lr2id")
-            return str(lr2).strip() if lr2 not in ("", None) else None
-    return None
+    return lr2id_for_discord_sync(sheet_id, ws_title, discord_id)
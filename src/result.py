@@ -6,51 +6,96 @@
 
 import os
 import asyncio
+import logging
 
-from src.common import _authorize_gc
+from src.sheet_cache import TTLCache, MISSING
+from src.sheets_scheduler import Priority, run_sheets_io
+from src.user_directory import user_directory
 
 
-def _load_user_rows_sync(
-    sheet_id: str,
-    ws_title: str = "UserData",
-) -> list[dict]:
+# ============================================================
+# Discord メンバーの表示名
+# ============================================================
+
+# 表示名のキャッシュ（キー: (guild_id, discord_id)）。見つからなかった ID も短い TTL で覚えておく
+NAME_TTL: float = float(os.getenv("MEMBER_NAME_TTL", str(60 * 30)))
+MISSING_NAME_TTL: float = 60 * 5
+_name_cache = TTLCache(max_entries=4096)
+
+QUERY_CHUNK: int = 100          # query_members(user_ids=...) 1回あたりの上限
+QUERY_TIMEOUT: float = 10.0     # 1チャンクの応答待ちの上限（秒）
+FETCH_CONCURRENCY: int = 5      # fetch_member に落ちた場合の同時実行数
+
+
+def _remember_name(guild_id: int, discord_id: str, name: str | None) -> None:
+    _name_cache.set((guild_id, discord_id), name, NAME_TTL if name is not None else MISSING_NAME_TTL)
+
+
+async def _fetch_members_one_by_one(guild, discord_ids: list[str]) -> dict[str, str]:
+    """query_members が使えなかった場合に fetch_member で個別に取得する（同時実行数を制限）。"""
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+    names: dict[str, str] = {}
+
+    async def fetch(did: str) -> None:
+        async with semaphore:
+            try:
+                member = await guild.fetch_member(int(did))
+            except Exception:
+                return
+            names[did] = member.display_name
+
+    await asyncio.gather(*(fetch(did) for did in discord_ids))
+    return names
+
+
+async def resolve_display_names(guild, discord_ids: list[str]) -> dict[str, str]:
     """
-    UserData タブを読み込み、正規化した [{DiscordID: str, LR2ID: str}, ...] を返す。
-    列名のゆれ（大文字小文字・日本語）を許容する。
+    DiscordID のリストを {DiscordID: 表示名} に変換する（見つからない ID は含めない）。
+    キャッシュ・ギルドキャッシュにない ID だけを、ゲートウェイの query_members で
+    100 件ずつまとめて取得する（往復回数は人数 / 100 回で済む）。
+    query_members が失敗したチャンクは fetch_member で個別に取得する。
     """
-    gc = _authorize_gc()
-    sh = gc.open_by_key(sheet_id)
-    ws = sh.worksheet(ws_title)
-    rows = ws.get_all_records()
-
-    def get_fuzzy(d: dict, *keys) -> str | None:
-        """辞書から列名のゆれを許容して値を取得する。"""
-        for k in keys:
-            if k in d and d[k] not in ("", None):
-                return d[k]
-        lower = {str(k).lower(): v for k, v in d.items()}
-        for k in keys:
-            lk = str(k).lower()
-            if lk in lower and lower[lk] not in ("", None):
-                return lower[lk]
-        return None
-
-    norm = []
-    for r in rows:
-        discord_id = get_fuzzy(r, "DiscordID", "discord_id", "discordid", "ディスコードID")
-        lr2id      = get_fuzzy(r, "LR2ID", "lr2_id", "lr2id")
-        if discord_id and lr2id:
-            norm.append({
-                "DiscordID": str(discord_id).strip(),
-                "LR2ID":     str(lr2id).strip(),
-            })
-    return norm
-
-
-async def build_id_to_name_from_sheet(guild) -> dict[str, str]:
+    names: dict[str, str] = {}
+    missing: list[str] = []
+    for did in dict.fromkeys(discord_ids):
+        cached = _name_cache.get((guild.id, did))
+        if cached is not MISSING:
+            if cached is not None:
+                names[did] = cached
+            continue
+        member = guild.get_member(int(did))
+        if member is not None:
+            names[did] = member.display_name
+            _remember_name(guild.id, did, member.display_name)
+        else:
+            missing.append(did)
+
+    async def query(chunk: list[str]) -> dict[str, str]:
+        try:
+            members = await asyncio.wait_for(
+                guild.query_members(user_ids=[int(d) for d in chunk], limit=len(chunk), cache=True),
+                QUERY_TIMEOUT,
+            )
+        except Exception:
+            logging.getLogger(__name__).warning(
+                "query_members に失敗したため fetch_member で取得します（%d 件）", len(chunk), exc_info=True
+            )
+            return await _fetch_members_one_by_one(guild, chunk)
+        return {str(m.id): m.display_name for m in members}
+
+    chunks = [missing[i:i + QUERY_CHUNK] for i in range(0, len(missing), QUERY_CHUNK)]
+    for found in await asyncio.gather(*(query(chunk) for chunk in chunks)):
+        names.update(found)
+    for did in missing:
+        _remember_name(guild.id, did, names.get(did))
+    return names
+
+
+async def build_id_to_name_from_sheet(guild, lr2ids: list[str] | None = None) -> dict[str, str]:
     """
-    UserData を読み込み、{LR2ID: Discord 表示名} の辞書を返す。
-    Discord メンバーはギルドキャッシュを優先し、なければ API で取得する。
+    UserData の対応表（user_directory）から {LR2ID: Discord 表示名} の辞書を返す。
+    lr2ids を指定した場合は、その LR2ID（ランキングに載っている人）だけを解決する。
+    表示名は resolve_display_names でキャッシュ・ギルドキャッシュ・一括取得の順に引く。
     環境変数:
       - USERDATA_ID: UserData シートのスプレッドシートID（未設定時は MAIN_ID を使用）
       - USERDATA_WS: UserData タブ名（デフォルト: "UserData"）
@@ -60,20 +105,16 @@ async def build_id_to_name_from_sheet(guild) -> dict[str, str]:
     if not sheet_id:
         return {}
 
-    # 同期 I/O はスレッドプールで実行
-    loop = asyncio.get_running_loop()
-    rows = await loop.run_in_executor(None, _load_user_rows_sync, sheet_id, ws_title)
+    # 対応表が読み込み済みなら API は呼ばない。未読み込みなら同期 I/O をスレッドプールで実行
+    # （/result から呼ばれるので管理コマンドの優先度）
+    if not user_directory.is_loaded((sheet_id, ws_title)):
+        await run_sheets_io(Priority.ADMIN, user_directory.ensure_loaded_sync, sheet_id, ws_title)
 
-    id_to_name: dict[str, str] = {}
-    for row in rows:
-        did = row["DiscordID"]
-        lr2 = row["LR2ID"]
-        # ギルドキャッシュを優先して API 呼び出し回数を節約
-        member = guild.get_member(int(did))
-        if member is None:
-            try:
-                member = await guild.fetch_member(int(did))
-            except Exception:
-                continue
-        id_to_name[lr2] = member.display_name
-    return id_to_name
+    if lr2ids is None:
+        pairs = [(row["LR2ID"], row["DiscordID"]) for row in user_directory.rows()]
+    else:
+        pairs = [(lr2, user_directory.discord_of(lr2)) for lr2 in dict.fromkeys(str(x).strip() for x in lr2ids)]
+        pairs = [(lr2, did) for lr2, did in pairs if did is not None]
+
+    names = await resolve_display_names(guild, [did for _, did in pairs])
+    return {lr2: names[did] for lr2, did in pairs if did in names}
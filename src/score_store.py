@@ -0,0 +1,388 @@
+# ============================================================
+# score_store.py - ローカル成績ストア（SQLite）
+# NebukawaIR(result) の成績・CourseData・UserData を SQLite に保持し、
+# /mypage の参照をネットワークなしで返せるようにする
+# Google Sheets は人が編集する正本のまま。ストアは /result 等の書き込みと
+# 定期同期ジョブで追従する
+# ============================================================
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# 成績ストアの SQLite ファイルパス（空文字で無効化）
+DEFAULT_DB_PATH = "score_store.sqlite3"
+
+# 結果シートのカラム（write_round_result_to_sheet の HEADERS と同じ）
+RESULT_HEADERS = ["Rank", "LR2ID", "PlayerName", "Score", "Score Rate (%)", "BPI"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rounds (
+    round       INTEGER PRIMARY KEY,
+    title       TEXT NOT NULL DEFAULT '',
+    diff        TEXT NOT NULL DEFAULT '',
+    course_id   TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS results (
+    round       INTEGER NOT NULL,
+    rank        INTEGER,
+    lr2id       TEXT NOT NULL,
+    player_name TEXT,
+    score       INTEGER,
+    score_rate  REAL,
+    bpi         REAL
+);
+CREATE INDEX IF NOT EXISTS idx_results_lr2id_round ON results (lr2id, round);
+CREATE INDEX IF NOT EXISTS idx_results_round_rank ON results (round, rank);
+CREATE TABLE IF NOT EXISTS users (
+    discord_id  TEXT PRIMARY KEY,
+    lr2id       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_users_lr2id ON users (lr2id);
+CREATE TABLE IF NOT EXISTS player_history (
+    lr2id       TEXT PRIMARY KEY,
+    entries     TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key         TEXT PRIMARY KEY,
+    value       TEXT
+);
+"""
+
+
+def _result_params(round_no: int, row: dict) -> tuple:
+    """結果シートの1行（dict）を results テーブルの INSERT パラメータに変換する。"""
+    def blank_to_none(v):
+        return None if v in ("", None) else v
+    return (
+        int(round_no),
+        blank_to_none(row.get("Rank")),
+        str(row.get("LR2ID", "")).strip(),
+        row.get("PlayerName"),
+        blank_to_none(row.get("Score")),
+        blank_to_none(row.get("Score Rate (%)")),
+        blank_to_none(row.get("BPI")),
+    )
+
+
+def _row_from_result(rank, lr2id, player_name, score, score_rate, bpi) -> dict:
+    """results テーブルの1行を結果シートと同じ形式の dict に戻す。"""
+    return dict(zip(RESULT_HEADERS, (rank, lr2id, player_name, score, score_rate, bpi)))
+
+
+# player_history の1要素: [回, 順位, スコア, スコアレート, BPI, 総人数, プレイヤー名]
+_HISTORY_SQL = (
+    "SELECT r.lr2id, r.round, r.rank, r.score, r.score_rate, r.bpi, "
+    "(SELECT COUNT(*) FROM results t WHERE t.round = r.round), r.player_name "
+    "FROM results r"
+)
+
+
+class ScoreStore:
+    """
+    SQLite の成績ストア。
+    executor の複数スレッドから使うため、1本の接続をロックで保護して共有する。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------
+    # 同期状態
+    # ------------------------------------------------------------
+
+    def get_state(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+    def is_synced(self) -> bool:
+        """Sheets からの全体同期が一度でも完了していれば True を返す。"""
+        return self.get_state("last_full_sync") is not None
+
+    # ------------------------------------------------------------
+    # 書き込み
+    # ------------------------------------------------------------
+
+    def replace_round(self, round_no: int, rows: list[dict]) -> None:
+        """指定の回の成績をまるごと置き換える（/result の書き込み・同期ジョブから呼ぶ）。"""
+        round_no = int(round_no)
+        params = [_result_params(round_no, r) for r in rows if str(r.get("LR2ID", "")).strip()]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                # この回の旧参加者（今回いなくなった人の履歴からも外すため）
+                old_ids = {
+                    lr2id for (lr2id,) in
+                    self._conn.execute("SELECT lr2id FROM results WHERE round = ?", (round_no,))
+                }
+                self._conn.execute("DELETE FROM results WHERE round = ?", (round_no,))
+                self._conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?)", params)
+                self._update_history_for_round(round_no, old_ids)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def upsert_course(self, round_no: int, diff, title, course_id) -> None:
+        """CourseData の1回分を追加・更新する（/announce から呼ぶ）。"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO rounds (round, title, diff, course_id) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(round) DO UPDATE SET title = excluded.title, "
+                "diff = excluded.diff, course_id = excluded.course_id",
+                (int(round_no), str(title or ""), str(diff or ""), str(course_id or "")),
+            )
+
+    def upsert_user(self, discord_id: str, lr2id: str) -> None:
+        """DiscordID → LR2ID の対応を追加・更新する（/register から呼ぶ）。"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO users (discord_id, lr2id) VALUES (?, ?) "
+                "ON CONFLICT(discord_id) DO UPDATE SET lr2id = excluded.lr2id",
+                (str(discord_id).strip(), str(lr2id).strip()),
+            )
+
+    def delete_round(self, round_no: int) -> None:
+        """指定の回の成績を削除する（結果シートからタブが消えた場合に同期ジョブから呼ぶ）。"""
+        self.replace_round(round_no, [])
+
+    def replace_course_meta(self, course_meta: dict[str, dict]) -> None:
+        """CourseData をまるごと置き換える。course_meta は load_course_meta_map_sync と同じ形式。"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._replace_rounds_table(course_meta)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def replace_users(self, users: list[dict]) -> None:
+        """UserData をまるごと置き換える。users は [{DiscordID, LR2ID}, ...]。"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._replace_users_table(users)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _replace_rounds_table(self, course_meta: dict[str, dict]) -> None:
+        self._conn.execute("DELETE FROM rounds")
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO rounds (round, title, diff, course_id) VALUES (?, ?, ?, ?)",
+            [
+                (int(k), str(m.get("title") or ""), str(m.get("diff") or ""), str(m.get("course_id") or ""))
+                for k, m in course_meta.items() if str(k).isdigit()
+            ],
+        )
+
+    def _replace_users_table(self, users: list[dict]) -> None:
+        self._conn.execute("DELETE FROM users")
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO users (discord_id, lr2id) VALUES (?, ?)",
+            [(u["DiscordID"], u["LR2ID"]) for u in users],
+        )
+
+    def replace_all(
+        self,
+        rounds: dict[int, list[dict]],
+        course_meta: dict[str, dict],
+        users: list[dict],
+    ) -> None:
+        """
+        成績・CourseData・UserData をまとめて置き換え、同期完了を記録する。
+        rounds: {回: [結果シートの行 dict, ...]}
+        course_meta: load_course_meta_map_sync と同じ形式
+        users: [{DiscordID, LR2ID}, ...]
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM results")
+                for round_no, rows in rounds.items():
+                    self._conn.executemany(
+                        "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [_result_params(round_no, r) for r in rows if str(r.get("LR2ID", "")).strip()],
+                    )
+                self._replace_rounds_table(course_meta)
+                self._replace_users_table(users)
+                self._rebuild_history()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (key, value) VALUES ('last_full_sync', ?)",
+                    (str(time.time()),),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # ------------------------------------------------------------
+    # プレイヤー別履歴（LR2ID → 全回の成績の転置インデックス）
+    # ------------------------------------------------------------
+
+    def _update_history_for_round(self, round_no: int, old_ids: set[str]) -> None:
+        """
+        1回分の変更をプレイヤー別履歴へ反映する（ロック・トランザクション内で呼ぶ）。
+        その回の新旧参加者の履歴だけを書き換える。
+        """
+        new_entries: dict[str, list] = {}
+        for lr2id, *entry in self._conn.execute(_HISTORY_SQL + " WHERE r.round = ?", (round_no,)):
+            new_entries.setdefault(lr2id, entry)
+
+        for lr2id in old_ids | new_entries.keys():
+            row = self._conn.execute(
+                "SELECT entries FROM player_history WHERE lr2id = ?", (lr2id,)
+            ).fetchone()
+            entries = [e for e in json.loads(row[0]) if e[0] != round_no] if row else []
+            if lr2id in new_entries:
+                entries.append(new_entries[lr2id])
+                entries.sort(key=lambda e: e[0])
+            if entries:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO player_history (lr2id, entries) VALUES (?, ?)",
+                    (lr2id, json.dumps(entries, ensure_ascii=False)),
+                )
+            else:
+                self._conn.execute("DELETE FROM player_history WHERE lr2id = ?", (lr2id,))
+
+    def _rebuild_history(self) -> None:
+        """results テーブルからプレイヤー別履歴を作り直す（ロック・トランザクション内で呼ぶ）。"""
+        history: dict[str, list] = {}
+        seen: set[tuple[str, int]] = set()
+        for lr2id, *entry in self._conn.execute(_HISTORY_SQL + " ORDER BY r.round, r.rowid"):
+            if (lr2id, entry[0]) in seen:
+                continue
+            seen.add((lr2id, entry[0]))
+            history.setdefault(lr2id, []).append(entry)
+        self._conn.execute("DELETE FROM player_history")
+        self._conn.executemany(
+            "INSERT INTO player_history (lr2id, entries) VALUES (?, ?)",
+            [(k, json.dumps(v, ensure_ascii=False)) for k, v in history.items()],
+        )
+
+    def rebuild_player_index(self) -> None:
+        """プレイヤー別履歴を results テーブルから作り直す。"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._rebuild_history()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # ------------------------------------------------------------
+    # 参照
+    # ------------------------------------------------------------
+
+    def user_record(self, round_no: int, lr2id: str) -> tuple[dict | None, int]:
+        """
+        指定の回の LR2ID 一致の1行と総参加人数を返す。
+        戻り値は _fetch_user_record_one_round_sync と同じ形式。
+        """
+        with self._lock:
+            total = self._conn.execute(
+                "SELECT COUNT(*) FROM results WHERE round = ?", (int(round_no),)
+            ).fetchone()[0]
+            row = self._conn.execute(
+                "SELECT rank, lr2id, player_name, score, score_rate, bpi FROM results "
+                "WHERE lr2id = ? AND round = ? LIMIT 1",
+                (str(lr2id).strip(), int(round_no)),
+            ).fetchone()
+        return (_row_from_result(*row) if row else None), total
+
+    def user_records(self, lr2id: str) -> list[dict]:
+        """
+        LR2ID の全記録を回の昇順で返す（プレイヤー別履歴を1回のキー検索で引く）。
+        戻り値は _fetch_user_records_all_rounds_sync と同じ形式。
+        """
+        lr2id = str(lr2id).strip()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT entries FROM player_history WHERE lr2id = ?", (lr2id,)
+            ).fetchone()
+        if row is None:
+            return []
+        return [
+            {
+                "round": rnd,
+                "row": _row_from_result(rank, lr2id, player_name, score, score_rate, bpi),
+                "total": total,
+            }
+            for rnd, rank, score, score_rate, bpi, total, player_name in json.loads(row[0])
+        ]
+
+    def course_meta_map(self) -> dict[str, dict]:
+        """CourseData を load_course_meta_map_sync と同じ形式で返す。"""
+        with self._lock:
+            rows = self._conn.execute("SELECT round, title, diff, course_id FROM rounds").fetchall()
+        return {str(r): {"title": t, "diff": d, "course_id": c} for r, t, d, c in rows}
+
+    def course_id(self, round_no: int) -> str | None:
+        """指定の回の CourseID を返す。登録がなければ None。"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT course_id FROM rounds WHERE round = ?", (int(round_no),)
+            ).fetchone()
+        return row[0] if row and row[0] != "" else None
+
+    def lr2id_by_discord(self, discord_id: str) -> str | None:
+        """DiscordID に対応する LR2ID を返す。登録がなければ None。"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT lr2id FROM users WHERE discord_id = ?", (str(discord_id).strip(),)
+            ).fetchone()
+        return row[0] if row else None
+
+
+# ============================================================
+# プロセス共通のストア
+# ============================================================
+
+_store: ScoreStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_score_store() -> ScoreStore | None:
+    """
+    プロセス共通の成績ストアを返す（初回呼び出し時に開く）。
+    環境変数 SCORE_DB_PATH が空文字の場合は無効として None を返す。
+    """
+    global _store
+    if _store is None:
+        path = os.getenv("SCORE_DB_PATH", DEFAULT_DB_PATH)
+        if not path:
+            return None
+        with _store_lock:
+            if _store is None:
+                _store = ScoreStore(path)
+    return _store
+
+
+def get_synced_store() -> ScoreStore | None:
+    """全体同期済みのストアを返す。無効または未同期なら None（呼び出し側は Sheets を読む）。"""
+    store = get_score_store()
+    return store if store is not None and store.is_synced() else None
@@ -0,0 +1,279 @@
+# ============================================================
+# score_sync.py - 成績ストアの同期ジョブ
+# Google Sheets（NebukawaIR / NebukawaIR(result)）の内容を
+# ローカル成績ストア（src/score_store.py）へ取り込む
+#
+# 差分同期はスプレッドシートの更新日時（Drive の modifiedTime）と
+# タブごとのフィンガープリント（sheetId・行数・列数・内容ハッシュ）を
+# ストアの sync_state に保存しておき、追加・削除・サイズが変わったタブだけを読み直す
+# （行数の変わらないセルの手修正は SCORE_FULL_SYNC_INTERVAL の全体同期で取り込む）
+# ============================================================
+
+import hashlib
+import json
+
+from src.common import _forget_worksheet, _open_spreadsheet
+from src.mypage import _load_course_meta_map_from_sheet_sync, _row_dict
+from src.user_directory import _load_user_rows_sync, user_directory
+from src.score_store import ScoreStore
+from src.sheet_cache import invalidate_tab
+
+
+# ============================================================
+# フィンガープリント
+# ============================================================
+
+def _modified_key(sheet_id: str) -> str:
+    return f"modified:{sheet_id}"
+
+
+def _tabs_key(sheet_id: str) -> str:
+    return f"tabs:{sheet_id}"
+
+
+def _values_hash(values: list[list]) -> str:
+    """タブの値（2次元リスト）の内容ハッシュを返す。"""
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _numeric_worksheets(sh) -> dict[str, dict]:
+    """
+    結果シートの数値タブのメタデータ（1回の API 呼び出し）を
+    {タブ名: {"id", "rows", "cols"}} で返す。
+    """
+    return {
+        ws.title: {"id": ws.id, "rows": ws.row_count, "cols": ws.col_count}
+        for ws in sh.worksheets()
+        if ws.title.strip().isdigit()
+    }
+
+
+def _same_shape(old: dict | None, new: dict) -> bool:
+    """2つのフィンガープリントの sheetId・行数・列数が同じかどうか。"""
+    return old is not None and all(old.get(k) == new[k] for k in ("id", "rows", "cols"))
+
+
+def _fetch_tab_values(sh, titles: list[str]) -> dict[str, list[list]]:
+    """タブ名のリストの A:Z を1回の batchGet でまとめて読む。"""
+    if not titles:
+        return {}
+    response = sh.values_batch_get([f"'{title}'!A:Z" for title in titles])
+    return {
+        title: value_range.get("values", [])
+        for title, value_range in zip(titles, response.get("valueRanges", []))
+    }
+
+
+def _rows_from_values(values: list[list]) -> list[dict]:
+    """タブの値（先頭行がヘッダー）を行 dict のリストに変換する。"""
+    if len(values) < 2:
+        return []
+    return [_row_dict(values[0], row) for row in values[1:]]
+
+
+# ============================================================
+# 全体同期
+# ============================================================
+
+
+def full_sync_sync(
+    store: ScoreStore,
+    result_sheet_id: str,
+    main_sheet_id: str,
+    course_ws: str = "CourseData",
+    userdata_sheet_id: str | None = None,
+    userdata_ws: str = "UserData",
+) -> int:
+    """
+    結果シートの全タブ・CourseData・UserData を読み込み、ストアをまとめて置き換える。
+    キャッシュを経由せず Sheets から直接読む。
+    戻り値: 取り込んだ回の数
+    """
+    userdata_sheet_id = userdata_sheet_id or main_sheet_id
+    # 読み込み中の編集を次回の差分同期で拾えるよう、更新日時は読み込みより先に取る
+    modified = {
+        sid: _open_spreadsheet(sid).get_lastUpdateTime()
+        for sid in {result_sheet_id, main_sheet_id, userdata_sheet_id}
+    }
+
+    sh = _open_spreadsheet(result_sheet_id)
+    tabs = _numeric_worksheets(sh)
+    values = _fetch_tab_values(sh, list(tabs))
+    rounds: dict[int, list[dict]] = {}
+    for title, fp in tabs.items():
+        fp["hash"] = _values_hash(values.get(title, []))
+        rounds[int(title.strip())] = _rows_from_values(values.get(title, []))
+
+    course_meta = _load_course_meta_map_from_sheet_sync(main_sheet_id, course_ws, use_cache=False)
+    users = _load_user_rows_sync(userdata_sheet_id, userdata_ws, use_cache=False)
+    user_directory.replace(users, (userdata_sheet_id, userdata_ws))
+
+    store.replace_all(rounds, course_meta, users)
+    store.set_state(_tabs_key(result_sheet_id), json.dumps(tabs, ensure_ascii=False))
+    for sid, ts in modified.items():
+        store.set_state(_modified_key(sid), ts)
+    return len(rounds)
+
+
+# ============================================================
+# 差分同期
+# ============================================================
+
+def _sync_result_tabs(store: ScoreStore, result_sheet_id: str) -> list[int]:
+    """
+    結果シートの変わったタブだけをストアへ取り込み、取り込んだ回のリストを返す。
+    1. 更新日時が前回と同じなら何も読まない（Drive API 1回）
+    2. タブのメタデータを取り、削除されたタブをストアから消す
+    3. 追加されたタブ・行数/列数が変わったタブだけを1回の batchGet で読み、
+       内容ハッシュが変わったものを取り込む
+    Bot 自身の /result 書き込みは record_result_write_sync で記録済みなので読み直さない。
+    全タブの内容ハッシュの比較は全体同期（full_sync_sync）に任せる。
+    """
+    sh = _open_spreadsheet(result_sheet_id)
+    modified = sh.get_lastUpdateTime()
+    if store.get_state(_modified_key(result_sheet_id)) == modified:
+        return []
+
+    previous: dict[str, dict] = json.loads(store.get_state(_tabs_key(result_sheet_id)) or "{}")
+    current = _numeric_worksheets(sh)
+    removed = previous.keys() - current.keys()
+    candidates = [title for title, fp in current.items() if not _same_shape(previous.get(title), fp)]
+
+    values = _fetch_tab_values(sh, candidates)
+    changed: list[int] = []
+    for title, fp in current.items():
+        old_hash = previous.get(title, {}).get("hash")
+        if title not in values:
+            fp["hash"] = old_hash
+            continue
+        fp["hash"] = _values_hash(values[title])
+        if fp["hash"] != old_hash:
+            round_no = int(title.strip())
+            store.replace_round(round_no, _rows_from_values(values[title]))
+            invalidate_tab(result_sheet_id, title)
+            changed.append(round_no)
+
+    for title in removed:
+        store.delete_round(int(title.strip()))
+        invalidate_tab(result_sheet_id, title)
+        _forget_worksheet(result_sheet_id, title)
+        changed.append(int(title.strip()))
+
+    store.set_state(_tabs_key(result_sheet_id), json.dumps(current, ensure_ascii=False))
+    store.set_state(_modified_key(result_sheet_id), modified)
+    return sorted(changed)
+
+
+def record_result_write_sync(
+    store: ScoreStore,
+    result_sheet_id: str,
+    title: str,
+    values: list[list],
+) -> None:
+    """
+    Bot が結果シートの title タブへ values を書き込んだ直後に呼び、
+    そのタブのフィンガープリントと更新日時を sync_state に記録する
+    （自分の書き込みで次回の差分同期が読み直さないようにする）。
+    ほかのタブが追加・削除・リサイズされていた場合は更新日時を進めず、次回の差分同期に任せる。
+    ストアが未同期なら何もしない（次回の同期で全体を読む）。
+    """
+    state = store.get_state(_tabs_key(result_sheet_id))
+    if not store.is_synced() or state is None:
+        return
+    previous: dict[str, dict] = json.loads(state)
+
+    sh = _open_spreadsheet(result_sheet_id)
+    # 書き込み後の編集を取りこぼさないよう、更新日時はメタデータより先に取る
+    modified = sh.get_lastUpdateTime()
+    current = _numeric_worksheets(sh)
+    if title not in current:
+        return
+    # 読み戻したときと同じ形（文字列）でハッシュを取る。表示形式の違いで一致しなかった場合は、
+    # 次にこのタブを読んだときに取り込み直すだけ
+    current[title]["hash"] = _values_hash(
+        [["" if v is None else str(v) for v in row] for row in values]
+    )
+
+    others_unchanged = previous.keys() - {title} == current.keys() - {title} and all(
+        _same_shape(previous[t], fp) for t, fp in current.items() if t != title
+    )
+    previous[title] = current[title]
+    store.set_state(_tabs_key(result_sheet_id), json.dumps(previous, ensure_ascii=False))
+    if others_unchanged:
+        store.set_state(_modified_key(result_sheet_id), modified)
+
+
+def _sync_main_tabs(
+    store: ScoreStore,
+    main_sheet_id: str,
+    course_ws: str,
+    userdata_sheet_id: str,
+    userdata_ws: str,
+) -> bool:
+    """
+    CourseData・UserData のスプレッドシートの更新日時が変わっていれば両方を読み直す
+    （どちらも小さいのでタブ単位の比較はしない）。読み直した場合は True を返す。
+    """
+    modified = {
+        sid: _open_spreadsheet(sid).get_lastUpdateTime()
+        for sid in {main_sheet_id, userdata_sheet_id}
+    }
+    if all(store.get_state(_modified_key(sid)) == ts for sid, ts in modified.items()):
+        return False
+
+    store.replace_course_meta(
+        _load_course_meta_map_from_sheet_sync(main_sheet_id, course_ws, use_cache=False)
+    )
+    users = _load_user_rows_sync(userdata_sheet_id, userdata_ws, use_cache=False)
+    store.replace_users(users)
+    user_directory.replace(users, (userdata_sheet_id, userdata_ws))
+    invalidate_tab(main_sheet_id, course_ws)
+    invalidate_tab(userdata_sheet_id, userdata_ws)
+    for sid, ts in modified.items():
+        store.set_state(_modified_key(sid), ts)
+    return True
+
+
+def incremental_sync_sync(
+    store: ScoreStore,
+    result_sheet_id: str,
+    main_sheet_id: str,
+    course_ws: str = "CourseData",
+    userdata_sheet_id: str | None = None,
+    userdata_ws: str = "UserData",
+) -> list[int]:
+    """
+    前回の同期から変わった部分だけをストアへ取り込む。
+    変わった結果タブはストア（プレイヤー別履歴を含む）と読み込みキャッシュに反映する。
+    ストアが未同期の場合は full_sync_sync を行う。
+    戻り値: 取り込んだ（または削除した）回のリスト
+    """
+    userdata_sheet_id = userdata_sheet_id or main_sheet_id
+    if not store.is_synced() or store.get_state(_tabs_key(result_sheet_id)) is None:
+        full_sync_sync(store, result_sheet_id, main_sheet_id, course_ws, userdata_sheet_id, userdata_ws)
+        return sorted(int(t.strip()) for t in json.loads(store.get_state(_tabs_key(result_sheet_id))))
+
+    changed = _sync_result_tabs(store, result_sheet_id)
+    _sync_main_tabs(store, main_sheet_id, course_ws, userdata_sheet_id, userdata_ws)
+    return changed
+
+
+if __name__ == "__main__":
+    # 手動での一括再構築: python -m src.score_sync
+    import os
+
+    from dotenv import load_dotenv
+
+    from src.score_store import get_score_store
+
+    load_dotenv()
+    main_id = os.environ["MAIN_ID"]
+    n = full_sync_sync(
+        get_score_store(),
+        os.environ["SCORE_ID"],
+        main_id,
+        os.getenv("COURSE_WS", "CourseData"),
+        os.getenv("USERDATA_ID") or main_id,
+        os.getenv("USERDATA_WS", "UserData"),
+    )
+    print(f"成績ストアとプレイヤー別履歴を再構築しました（{n} 回分）")
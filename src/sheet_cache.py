@@ -0,0 +1,273 @@
+# ============================================================
+# sheet_cache.py - Google Sheets 読み込み結果のキャッシュ
+# タブごとの TTL・明示的な無効化・件数とおおよそのバイト数の上限つき LRU で
+# CourseData / UserData / 回ごとの結果タブの読み込み結果を保持する
+# 同じキーの読み込みが同時に走った場合は1回の API 呼び出しにまとめる（single-flight）
+# ============================================================
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable
+
+from src.common import _open_worksheet
+
+# タブ種別ごとの TTL（秒）
+COURSE_DATA_TTL: float = 60 * 10   # CourseData: /announce で更新（書き込み時に無効化）
+USER_DATA_TTL: float = 60 * 5      # UserData: /register 以外に手動編集もあるため短め
+RESULT_TAB_TTL: float = 60 * 60    # 回ごとの結果タブ: /result でのみ更新
+TAB_LIST_TTL: float = 60 * 10      # 結果シートのタブ一覧
+
+# キャッシュのエントリ数上限（超えたら最も古く使われたものから破棄）
+MAX_ENTRIES: int = int(os.getenv("SHEET_CACHE_MAX_ENTRIES", "512"))
+# キャッシュ全体のおおよそのメモリ量の上限（バイト、既定 64 MiB）。A:Z のタブ全体は1件で数 MB になる
+MAX_BYTES: int = int(os.getenv("SHEET_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# get() でキャッシュミスを表す番兵
+MISSING = object()
+
+
+def _estimate_size(value: Any) -> int:
+    """
+    値のおおよそのメモリ量（バイト）を返す。
+    list / tuple / dict をたどり、コンテナ・セル（文字列・数値）ごとの固定コストと文字列長から見積もる。
+    """
+    size = 0
+    stack = [value]
+    while stack:
+        v = stack.pop()
+        if isinstance(v, str):
+            size += 50 + len(v)
+        elif isinstance(v, (list, tuple)):
+            size += 56 + 8 * len(v)
+            stack.extend(v)
+        elif isinstance(v, dict):
+            size += 64 + 100 * len(v)
+            stack.extend(v.keys())
+            stack.extend(v.values())
+        else:
+            size += sys.getsizeof(v)
+    return size
+
+
+class _Flight:
+    """読み込み中のキー1つ分の状態。後から来た呼び出しは event で完了を待つ。"""
+
+    __slots__ = ("event", "value", "error", "stale")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Any = MISSING
+        self.error: BaseException | None = None
+        self.stale = False   # 読み込み中に無効化された（結果を返すがキャッシュしない）
+
+    def result(self) -> Any:
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class TTLCache:
+    """
+    TTL つきの LRU キャッシュ。
+    エントリ数（max_entries）と値のおおよそのバイト数の合計（max_bytes）のどちらかを超えたら、
+    最も古く使われたものから破棄する。
+    executor の複数スレッドから使うため、すべての操作をロックで保護する。
+    キーはタプル (sheet_id, ws_title, 種別, ...) を想定し、先頭一致で無効化できる。
+    読み込み中のキーを別スレッドが要求した場合は、同じ読み込みの結果を待って共有する。
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (値, 有効期限, 見積もりバイト数)
+        self._data: OrderedDict[Hashable, tuple[Any, float, int]] = OrderedDict()
+        self._bytes = 0
+        self._inflight: dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def get(self, key: Hashable) -> Any:
+        """キーの値を返す。存在しないか期限切れなら MISSING を返す。"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or now > entry[1]:
+                if entry is not None:
+                    self._drop_locked(key)
+                self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def _drop_locked(self, key: Hashable) -> None:
+        self._bytes -= self._data.pop(key)[2]
+
+    def _set_locked(self, key: Hashable, value: Any, ttl: float) -> None:
+        if key in self._data:
+            self._drop_locked(key)
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            # 1件で上限を超える値はキャッシュしない（呼び出し元には値を返す）
+            self.evictions += 1
+            return
+        self._data[key] = (value, time.monotonic() + ttl, size)
+        self._bytes += size
+        while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+            self._bytes -= self._data.popitem(last=False)[1][2]
+            self.evictions += 1
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """キーに値を TTL 秒の有効期限つきで保存する。"""
+        with self._lock:
+            self._set_locked(key, value, ttl)
+
+    def _claim(self, keys: Iterable[Hashable]) -> tuple[dict, list, dict]:
+        """
+        keys をキャッシュ済み・自分が読み込むもの・他スレッドが読み込み中のものに分ける。
+        自分が読み込むキーは読み込み中として登録する。
+        戻り値: ({key: value}, [自分が読み込む key], {key: _Flight})
+        """
+        now = time.monotonic()
+        found, mine, waiting = {}, [], {}
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is not None and now <= entry[1]:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    found[key] = entry[0]
+                    continue
+                if entry is not None:
+                    self._drop_locked(key)
+                flight = self._inflight.get(key)
+                if flight is not None:
+                    self.coalesced += 1
+                    waiting[key] = flight
+                else:
+                    self.misses += 1
+                    self._inflight[key] = _Flight()
+                    mine.append(key)
+        return found, mine, waiting
+
+    def _settle(self, keys: list, values: dict | None, error: BaseException | None, ttl: float) -> None:
+        """自分が読み込んだキーの結果を保存し、待っているスレッドに渡す。"""
+        with self._lock:
+            flights = [(key, self._inflight.pop(key)) for key in keys]
+            for key, flight in flights:
+                if error is not None:
+                    flight.error = error
+                elif key in values:
+                    flight.value = values[key]
+                    if not flight.stale:
+                        self._set_locked(key, flight.value, ttl)
+                else:
+                    flight.error = KeyError(key)
+        for _, flight in flights:
+            flight.event.set()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: float) -> Any:
+        """
+        キャッシュにあればそれを返し、なければ loader() の結果を保存して返す。
+        同じキーを別スレッドが読み込み中なら、loader() は呼ばずにその結果を待つ。
+        """
+        return self.get_or_load_many([key], lambda keys: {key: loader()}, ttl)[key]
+
+    def get_or_load_many(
+        self,
+        keys: Iterable[Hashable],
+        loader: Callable[[list], dict],
+        ttl: float,
+    ) -> dict:
+        """
+        複数キーの値を {key: value} で返す。
+        キャッシュになく、他スレッドも読み込んでいないキーだけを loader(keys) でまとめて読み込む
+        （loader は {key: value} を返す）。他スレッドが読み込み中のキーはその結果を待つ。
+        """
+        found, mine, waiting = self._claim(keys)
+        if mine:
+            try:
+                values = loader(mine)
+            except BaseException as e:
+                self._settle(mine, None, e, ttl)
+                raise
+            self._settle(mine, values, None, ttl)
+            for key in mine:
+                if key not in values:
+                    raise KeyError(key)
+                found[key] = values[key]
+        for key, flight in waiting.items():
+            found[key] = flight.result()
+        return found
+
+    def invalidate(self, *prefix: Hashable) -> int:
+        """キーの先頭が prefix に一致するエントリをすべて破棄し、破棄した件数を返す。"""
+        n = len(prefix)
+        with self._lock:
+            keys = [k for k in self._data if isinstance(k, tuple) and k[:n] == prefix]
+            for k in keys:
+                self._drop_locked(k)
+            # 読み込み中の結果は無効化前のデータかもしれないのでキャッシュさせない
+            for k, flight in self._inflight.items():
+                if isinstance(k, tuple) and k[:n] == prefix:
+                    flight.stale = True
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "coalesced": self.coalesced,
+                "inflight": len(self._inflight),
+            }
+
+
+# プロセス共通のキャッシュ
+sheet_cache = TTLCache()
+
+
+# ============================================================
+# 読み込みヘルパー・無効化
+# ============================================================
+
+def cached_records(sheet_id: str, ws_title: str, ttl: float) -> list[dict]:
+    """
+    ワークシートの get_all_records() の結果をキャッシュ経由で返す。
+    呼び出し側は戻り値を変更しないこと（キャッシュと共有される）。
+    """
+    return sheet_cache.get_or_load(
+        (sheet_id, ws_title, "records"),
+        lambda: _open_worksheet(sheet_id, ws_title).get_all_records(),
+        ttl,
+    )
+
+
+def invalidate_tab(sheet_id: str, ws_title: str) -> None:
+    """
+    タブへの書き込み後に呼び出し、そのタブのキャッシュとタブ一覧を破棄する。
+    """
+    sheet_cache.invalidate(sheet_id, str(ws_title))
+    sheet_cache.invalidate(sheet_id, None)
+
+
+def invalidate_sheet(sheet_id: str) -> None:
+    """スプレッドシート全体のキャッシュを破棄する。"""
+    sheet_cache.invalidate(sheet_id)
@@ -0,0 +1,182 @@
+# ============================================================
+# sheet_writer.py - Google Sheets 書き込みのバッチ化
+# タブの作成・ヘッダー・値の書き込みを spreadsheets.batchUpdate /
+# values.batchUpdate にまとめ、管理コマンド（/result・/announce）1回あたりの
+# HTTP 呼び出しを1〜2回に抑える
+# ============================================================
+
+import random
+import threading
+from typing import TYPE_CHECKING
+
+from src.common import _cached_worksheet, _open_spreadsheet, _remember_worksheet
+from src.sheet_cache import invalidate_tab
+
+# gspread は初回の Sheets アクセス時に読み込まれる（起動時には import しない）
+if TYPE_CHECKING:
+    import gspread
+
+
+# ============================================================
+# 内部ユーティリティ
+# ============================================================
+
+def _cell(v) -> dict:
+    """値を updateCells 用の CellData に変換する（valueInputOption=RAW と同じ扱い）。"""
+    if v is None:
+        return {}
+    if isinstance(v, bool):
+        return {"userEnteredValue": {"boolValue": v}}
+    if isinstance(v, (int, float)):
+        return {"userEnteredValue": {"numberValue": v}}
+    return {"userEnteredValue": {"stringValue": str(v)}}
+
+
+def _is_already_exists(e: "gspread.exceptions.APIError") -> bool:
+    return e.code == 400 and "already exists" in str(e.error.get("message", ""))
+
+
+def _add_sheet_with_values(
+    sh: "gspread.Spreadsheet",
+    title: str,
+    values: list[list],
+    rows: int,
+    cols: int,
+) -> "gspread.Worksheet":
+    """
+    タブの作成と A1 起点の値の書き込みを spreadsheets.batchUpdate 1回で行う。
+    sheetId をこちらで決めて addSheet と updateCells を同じリクエストに入れる。
+    同名のタブがすでにある場合は gspread.exceptions.APIError を送出する。
+    """
+    sheet_id = random.randint(1, 2**31 - 1)
+    res = sh.batch_update({
+        "requests": [
+            {"addSheet": {"properties": {
+                "sheetId": sheet_id,
+                "title": title,
+                "gridProperties": {"rowCount": rows, "columnCount": cols},
+            }}},
+            {"updateCells": {
+                "start": {"sheetId": sheet_id, "rowIndex": 0, "columnIndex": 0},
+                "rows": [{"values": [_cell(v) for v in row]} for row in values],
+                "fields": "userEnteredValue",
+            }},
+        ]
+    })
+    props = res["replies"][0]["addSheet"]["properties"]
+    import gspread
+
+    return gspread.Worksheet(sh, props, sh.id, sh.client)
+
+
+def _norm_key(v) -> str:
+    """キー列の値を比較用に正規化する（"05" と 5 を同じ回として扱う）。"""
+    s = str(v).strip()
+    return str(int(s)) if s.isdigit() else s
+
+
+def _update_values(sh: "gspread.Spreadsheet", title: str, start: str, values: list[list]) -> None:
+    """values.batchUpdate 1回で title!start 起点に値を書き込む。"""
+    sh.values_batch_update({
+        "valueInputOption": "RAW",
+        "data": [{"range": f"'{title}'!{start}", "values": values}],
+    })
+
+
+# ============================================================
+# 書き込み API
+# ============================================================
+
+def write_tab_values_sync(
+    spreadsheet_id: str,
+    title: str,
+    values: list[list],
+    min_cols: int = 6,
+) -> None:
+    """
+    タブ title の A1 起点に values（先頭行はヘッダー）を書き込む。タブがなければ作成する。
+    - 取得済み（プールにハンドルがある）タブ: values.batchUpdate 1回
+    - それ以外: addSheet + updateCells を1回で送り、既に存在していた場合のみ values.batchUpdate で書き直す
+    書き込み後にタブの読み込みキャッシュを無効化する。
+    """
+    import gspread
+
+    sh = _open_spreadsheet(spreadsheet_id)
+    try:
+        if _cached_worksheet(spreadsheet_id, title) is None:
+            width = max((len(r) for r in values), default=0)
+            try:
+                ws = _add_sheet_with_values(sh, title, values, max(len(values), 1), max(min_cols, width))
+                _remember_worksheet(spreadsheet_id, ws)
+                return
+            except gspread.exceptions.APIError as e:
+                if not _is_already_exists(e):
+                    raise
+        _update_values(sh, title, "A1", values)
+    finally:
+        invalidate_tab(spreadsheet_id, title)
+
+
+# upsert_keyed_row_sync の「A 列を読む → 書く」を直列化する
+# （並行した /announce・/register で同じキーが二重に追加されないように）
+_upsert_lock = threading.Lock()
+
+
+def _column_a(sh: "gspread.Spreadsheet", title: str) -> list[str] | None:
+    """
+    タブの A 列の値を Sheets から直接読む（CourseData・UserData の行検索用）。
+    タブが存在しない場合は None を返す。
+    手作業での行の挿入・削除・並べ替えで行番号が変わるため、キャッシュはしない。
+    """
+    import gspread
+
+    try:
+        res = sh.values_get(f"'{title}'!A:A")
+    except gspread.exceptions.APIError as e:
+        if e.code == 400:  # Unable to parse range（タブなし）
+            return None
+        raise
+    return [str(r[0]) if r else "" for r in res.get("values", [])]
+
+
+def upsert_keyed_row_sync(
+    spreadsheet_id: str,
+    title: str,
+    headers: list[str],
+    row: list,
+) -> str:
+    """
+    先頭列（A 列）の値が row[0] と一致する行を row で上書きし、なければ末尾に追加する。
+    A 列は呼び出しのたびに読み直し（values.get 1回）、そのあと書き込みを1回行う。
+    - タブなし: addSheet + ヘッダー + row を batchUpdate 1回
+    - 一致行あり: values.batchUpdate 1回 / なし: values.append 1回
+    書き込み後にタブの読み込みキャッシュを無効化する。
+    戻り値: "updated" or "inserted"
+    """
+    sh = _open_spreadsheet(spreadsheet_id)
+    with _upsert_lock:
+        try:
+            col = _column_a(sh, title)
+            if col is None:
+                ws = _add_sheet_with_values(sh, title, [headers, row], 100, len(headers))
+                _remember_worksheet(spreadsheet_id, ws)
+                return "inserted"
+
+            # ヘッダー行を除外して検索
+            has_header = bool(col) and col[0] == headers[0]
+            keys = col[1:] if has_header else col
+            base_row = 2 if has_header else 1
+            target = _norm_key(row[0])
+            for i, k in enumerate(keys):
+                if _norm_key(k) == target:
+                    _update_values(sh, title, f"A{base_row + i}", [row])
+                    return "updated"
+
+            sh.values_append(
+                f"'{title}'!A:A",
+                params={"valueInputOption": "RAW", "insertDataOption": "INSERT_ROWS"},
+                body={"values": [row]},
+            )
+            return "inserted"
+        finally:
+            invalidate_tab(spreadsheet_id, title)
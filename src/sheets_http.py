@@ -0,0 +1,131 @@
+# ============================================================
+# sheets_http.py - スケジューラ経由の gspread HTTP クライアント
+# すべてのリクエストを sheets_scheduler のトークンバケットに並ばせ、
+# 429 / 5xx はジッター付きの指数バックオフで再試行する
+# （values.append・spreadsheets.batchUpdate は二重実行を避けるため 429 / クォータ超過のみ再試行する）。
+# gspread・requests を import するため、認証時（common._authorize_gc）に遅延 import する。
+#
+# SHEETS_API_BASE を設定すると Sheets / Drive API の呼び出し先をその URL に差し替える
+# （bench/sheets_stub.py のローカルのスタブで負荷・クォータ超過を再現する用途）。
+# ============================================================
+
+import logging
+import os
+import random
+import time
+from http import HTTPStatus
+
+import requests
+from gspread.exceptions import APIError
+from gspread.http_client import HTTPClient
+
+from src.sheets_scheduler import (
+    MAX_RETRIES,
+    RETRY_BASE,
+    RETRY_CAP,
+    QuotaScheduler,
+    current_priority,
+    scheduler,
+)
+
+logger = logging.getLogger(__name__)
+
+# Sheets / Drive API の呼び出し先（例: http://127.0.0.1:8765）。空なら Google の API を使う
+API_BASE: str = os.getenv("SHEETS_API_BASE", "").rstrip("/")
+_GOOGLE_API_HOSTS = ("https://sheets.googleapis.com", "https://www.googleapis.com")
+
+def _request_kind(method: str, endpoint: str) -> str:
+    """リクエストを読み込み・書き込みのどちらのクォータで数えるかを返す。"""
+    if method.upper() == "GET" or endpoint.endswith((":batchGet", ":batchGetByDataFilter")):
+        return "read"
+    return "write"
+
+
+def _is_idempotent(method: str, endpoint: str) -> bool:
+    """
+    同じリクエストを2回送っても結果が変わらないかを返す。
+    values.append（行の追加）と spreadsheets.batchUpdate（addSheet など）は、5xx・タイムアウトでも
+    サーバー側で実行済みのことがあるため、再送すると行やタブが二重にできる。
+    """
+    if method.upper() == "GET":
+        return True
+    if endpoint.endswith(":append"):
+        return False
+    return not (endpoint.endswith(":batchUpdate") and not endpoint.endswith("/values:batchUpdate"))
+
+
+def _rewrite_endpoint(endpoint: str) -> str:
+    """API_BASE が設定されていれば、Google の API の URL のホスト部分を差し替える。"""
+    if API_BASE:
+        for host in _GOOGLE_API_HOSTS:
+            if endpoint.startswith(host):
+                return API_BASE + endpoint[len(host):]
+    return endpoint
+
+
+def _should_retry(err: APIError, idempotent: bool = True) -> bool:
+    """
+    再試行するエラーかを返す。429・クォータ超過の 403 はリクエストが実行されていないので常に再試行し、
+    408・5xx は idempotent なリクエストのみ再試行する。
+    """
+    code = err.code
+    if code == HTTPStatus.TOO_MANY_REQUESTS:
+        return True
+    if code == HTTPStatus.REQUEST_TIMEOUT or code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+        return idempotent
+    # Drive API はクォータ超過を 403 で返す
+    if code == HTTPStatus.FORBIDDEN:
+        errors = err.error.get("errors") or [{}]
+        return errors[0].get("reason") in ("rateLimitExceeded", "userRateLimitExceeded") \
+            or errors[0].get("domain") == "usageLimits"
+    return False
+
+
+def _backoff(attempt: int, retry_after: str | None = None) -> float:
+    """attempt 回目の再試行までの待ち時間（full jitter）。Retry-After があればそれ以上待つ。"""
+    delay = random.uniform(0, min(RETRY_CAP, RETRY_BASE * 2 ** attempt))
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except ValueError:
+            pass
+    return delay
+
+
+class ScheduledHTTPClient(HTTPClient):
+    """
+    すべてのリクエストをスケジューラ経由で送る gspread の HTTP クライアント。
+    gspread.authorize(creds, http_client=ScheduledHTTPClient) で使う。
+    """
+
+    scheduler: QuotaScheduler = scheduler
+
+    def request(self, method, endpoint, *args, **kwargs):
+        endpoint = _rewrite_endpoint(endpoint)
+        kind = _request_kind(method, endpoint)
+        idempotent = _is_idempotent(method, endpoint)
+        priority = current_priority()
+        attempt = 0
+        while True:
+            self.scheduler.acquire(kind, priority)
+            try:
+                return super().request(method, endpoint, *args, **kwargs)
+            except APIError as e:
+                if attempt >= MAX_RETRIES or not _should_retry(e, idempotent):
+                    self.scheduler.record_failure()
+                    raise
+                delay = _backoff(attempt, e.response.headers.get("Retry-After"))
+                if e.code == HTTPStatus.TOO_MANY_REQUESTS or e.code == HTTPStatus.FORBIDDEN:
+                    # クォータ超過は全スレッド共通の問題なので、バケットごと止める
+                    self.scheduler.throttle(kind, delay)
+                    logger.warning("Sheets API のクォータ超過（%s）。%.1f 秒後に再試行します %s",
+                                   kind, delay, self.scheduler.stats())
+            except (requests.ConnectionError, requests.Timeout):
+                # 書き込みは二重実行のおそれがあるため読み込みのみ再試行する
+                if kind != "read" or attempt >= MAX_RETRIES:
+                    self.scheduler.record_failure()
+                    raise
+                delay = _backoff(attempt)
+            self.scheduler.record_retry()
+            attempt += 1
+            time.sleep(delay)
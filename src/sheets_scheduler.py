@@ -0,0 +1,261 @@
+# ============================================================
+# sheets_scheduler.py - Google Sheets API 呼び出しのスケジューラ
+# すべての HTTP 呼び出しを読み込み・書き込みのトークンバケットに通し、
+# 優先度順（対話コマンド > 管理コマンド > バックグラウンド）に割り当てる。
+# 429 / 5xx はジッター付きの指数バックオフで再試行する。
+#
+# gspread の HTTPClient を差し替えて組み込む（src/sheets_http.py）ため、呼び出し側は
+# run_sheets_io(priority, fn, ...) で優先度を指定して Sheets I/O 専用のスレッドプールで実行するだけでよい。
+# 起動時に gspread を import しないよう、このモジュールは gspread に依存しない。
+# ============================================================
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from enum import IntEnum
+
+# プロジェクトの Sheets API クォータ（1分あたりのリクエスト数）
+READ_PER_MIN: int = int(os.getenv("SHEETS_READ_PER_MIN", "60"))
+WRITE_PER_MIN: int = int(os.getenv("SHEETS_WRITE_PER_MIN", "60"))
+# バケットの容量（連続して即時に出せる件数）
+BURST: int = int(os.getenv("SHEETS_BURST", "10"))
+
+# 再試行の設定
+MAX_RETRIES: int = int(os.getenv("SHEETS_MAX_RETRIES", "5"))
+RETRY_BASE: float = 1.0    # バックオフの基準（秒）。上限を 1, 2, 4... と倍々に伸ばし、その範囲で乱数待ち
+RETRY_CAP: float = 32.0    # 1回の待ち時間の上限（秒）
+
+# バックグラウンド処理は容量のこの割合を残して待つ（直後に来た対話コマンドの分を空けておく）
+BACKGROUND_HEADROOM: float = 0.3
+
+# Sheets I/O 専用スレッドプールのスレッド数（対話・管理コマンド用 / バックグラウンド用）
+IO_WORKERS: int = int(os.getenv("SHEETS_IO_WORKERS", "8"))
+BACKGROUND_WORKERS: int = int(os.getenv("SHEETS_BACKGROUND_WORKERS", "2"))
+
+
+class Priority(IntEnum):
+    """呼び出しの優先度（値が小さいほど先に割り当てる）。"""
+    INTERACTIVE = 0   # /mypage・/register など利用者が待っているもの
+    ADMIN = 1         # /announce・/result などの管理コマンド
+    BACKGROUND = 2    # 成績ストアの定期同期など
+
+
+# 優先度を指定せずに呼ばれた場合の既定値
+DEFAULT_PRIORITY = Priority.ADMIN
+
+# 実行中スレッドの優先度（run_sheets_io / sheets_priority で設定する）
+_local = threading.local()
+
+
+def current_priority() -> Priority:
+    return getattr(_local, "priority", DEFAULT_PRIORITY)
+
+
+@contextlib.contextmanager
+def sheets_priority(priority: Priority):
+    """with ブロック内の Sheets 呼び出しを priority で実行する。"""
+    prev = getattr(_local, "priority", None)
+    _local.priority = priority
+    try:
+        yield
+    finally:
+        if prev is None:
+            del _local.priority
+        else:
+            _local.priority = prev
+
+
+# ============================================================
+# トークンバケット・スケジューラ
+# ============================================================
+
+class _Bucket:
+    """
+    1分あたり per_minute 件を超えないトークンバケット。
+    容量 burst を即時に使い切っても任意の60秒間で per_minute 件以内に収まるよう、
+    補充速度は (per_minute - burst) / 60 件/秒とする。
+    """
+
+    def __init__(self, per_minute: int, burst: int):
+        self.capacity = float(max(1, min(burst, per_minute)))
+        self.rate = max(per_minute - self.capacity, 1) / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def try_take(self, now: float, reserve: float = 0.0) -> float:
+        """
+        トークンを1つ取り出せれば 0 を返す。
+        取り出せなければ取り出せるようになるまでの秒数を返す。
+        """
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        need = min(1.0 + reserve, self.capacity)
+        if self.tokens >= need:
+            self.tokens -= 1.0
+            return 0.0
+        return (need - self.tokens) / self.rate
+
+    def block(self, now: float, seconds: float) -> None:
+        """429 を受けたときに、バケットを空にして seconds 秒間割り当てを止める。"""
+        self._refill(now)
+        self.tokens = 0.0
+        self.updated = max(self.updated, now + seconds)
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class QuotaScheduler:
+    """
+    読み込み・書き込みのバケットごとに待ち行列（優先度・到着順のヒープ）を持ち、
+    先頭の呼び出しからトークンを割り当てる。
+    executor の複数スレッドから呼ばれるため、状態は1つの Condition で保護する。
+    """
+
+    def __init__(self, read_per_min: int = READ_PER_MIN, write_per_min: int = WRITE_PER_MIN, burst: int = BURST):
+        self._cond = threading.Condition()
+        self._buckets = {
+            "read": _Bucket(read_per_min, burst),
+            "write": _Bucket(write_per_min, burst),
+        }
+        self._queues: dict[str, list[tuple[int, int]]] = {"read": [], "write": []}
+        self._seq = itertools.count()
+        self._granted = {p: 0 for p in Priority}
+        self._wait_total = {p: 0.0 for p in Priority}
+        self._wait_max = {p: 0.0 for p in Priority}
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+
+    def acquire(self, kind: str, priority: Priority) -> float:
+        """
+        kind（"read" / "write"）のトークンを1つ取得するまで待ち、待った秒数を返す。
+        自分より優先度の高い（または同じ優先度で先に来た）呼び出しが待っている間は割り当てない。
+        """
+        bucket = self._buckets[kind]
+        queue = self._queues[kind]
+        reserve = bucket.capacity * BACKGROUND_HEADROOM if priority >= Priority.BACKGROUND else 0.0
+        t0 = time.monotonic()
+        with self._cond:
+            ticket = (int(priority), next(self._seq))
+            heapq.heappush(queue, ticket)
+            # 新しい先頭になった場合に備えて待機中のスレッドを起こす
+            self._cond.notify_all()
+            try:
+                while True:
+                    if queue[0] == ticket:
+                        delay = bucket.try_take(time.monotonic(), reserve)
+                        if delay <= 0:
+                            heapq.heappop(queue)
+                            break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+            except BaseException:
+                queue.remove(ticket)
+                heapq.heapify(queue)
+                raise
+            finally:
+                self._cond.notify_all()
+
+            waited = time.monotonic() - t0
+            self._granted[priority] += 1
+            self._wait_total[priority] += waited
+            self._wait_max[priority] = max(self._wait_max[priority], waited)
+        return waited
+
+    def throttle(self, kind: str, seconds: float) -> None:
+        """429 を受けたとき、同じ種別の割り当てを seconds 秒間止める（他スレッドも待たせる）。"""
+        with self._cond:
+            self._buckets[kind].block(time.monotonic(), seconds)
+            self.throttled += 1
+            self._cond.notify_all()
+
+    def record_retry(self) -> None:
+        with self._cond:
+            self.retries += 1
+
+    def record_failure(self) -> None:
+        with self._cond:
+            self.failures += 1
+
+    def stats(self) -> dict:
+        """待ち行列の長さ・優先度ごとの割り当て件数と待ち時間・再試行回数を返す。"""
+        with self._cond:
+            now = time.monotonic()
+            for b in self._buckets.values():
+                b._refill(now)
+            return {
+                "queued": {
+                    kind: {p.name.lower(): sum(1 for t in q if t[0] == p) for p in Priority}
+                    for kind, q in self._queues.items()
+                },
+                "tokens": {kind: round(b.tokens, 2) for kind, b in self._buckets.items()},
+                "granted": {p.name.lower(): self._granted[p] for p in Priority},
+                "wait_avg_sec": {
+                    p.name.lower(): round(self._wait_total[p] / self._granted[p], 3) if self._granted[p] else 0.0
+                    for p in Priority
+                },
+                "wait_max_sec": {p.name.lower(): round(self._wait_max[p], 3) for p in Priority},
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "failures": self.failures,
+            }
+
+
+# プロセス共通のスケジューラ
+scheduler = QuotaScheduler()
+
+
+def sheets_scheduler_stats() -> dict:
+    """プロセス共通スケジューラの統計を返す。"""
+    return scheduler.stats()
+
+
+# ============================================================
+# 非同期ヘルパー
+# ============================================================
+
+def _call_with_priority(priority: Priority, fn, args, kwargs):
+    with sheets_priority(priority):
+        return fn(*args, **kwargs)
+
+
+# スケジューラの待ちでスレッドが塞がっても、既定の executor（lr2ir の HTML 解析など）や
+# 対話コマンドを巻き込まないよう、Sheets I/O は優先度に応じた専用のスレッドプールで実行する
+_executors: dict[bool, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _executor_for(priority: Priority) -> ThreadPoolExecutor:
+    """priority の呼び出しを実行するスレッドプールを返す（初回に作成する）。"""
+    background = priority >= Priority.BACKGROUND
+    with _executors_lock:
+        executor = _executors.get(background)
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=BACKGROUND_WORKERS if background else IO_WORKERS,
+                thread_name_prefix="sheets-background" if background else "sheets-io",
+            )
+            _executors[background] = executor
+        return executor
+
+
+async def run_sheets_io(priority: Priority, fn, *args, **kwargs):
+    """
+    Sheets にアクセスする同期関数 fn を Sheets I/O 専用のスレッドプールで実行する。
+    fn 内の API 呼び出しは priority でスケジューラに並ぶ。
+    BACKGROUND は対話・管理コマンドとは別のプール（SHEETS_BACKGROUND_WORKERS スレッド）で実行する。
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor_for(priority), _call_with_priority, priority, fn, args, kwargs)
@@ -0,0 +1,171 @@
+# ============================================================
+# song_search.py - 楽曲名検索インデックス
+# /bpi のオートコンプリート用に、正規化した曲名の n-gram 転置インデックスを
+# 事前構築し、前方一致 > 部分一致の順で候補を返す
+# 曲名で limit 件に満たない場合は、ラベル全体（"★12 曲名"）の部分一致で補う
+# ============================================================
+
+import bisect
+import heapq
+import re
+import unicodedata
+
+from src.catalog import SongCatalog
+
+# 転置インデックスに使う n-gram の最大長
+MAX_GRAM: int = 3
+
+# クエリ先頭の難易度指定（例: "★12 air" / "☆12" / "★1"）
+_LEVEL_PREFIX_RE = re.compile(r"^[★☆]\s*(\S*?)(?:\s+(.*))?$")
+
+# カタカナ（ァ〜ヶ）→ ひらがな の変換表
+_KATA_TO_HIRA = {c: c - 0x60 for c in range(ord("ァ"), ord("ヶ") + 1)}
+
+
+def normalize_text(text: str) -> str:
+    """
+    検索用に文字列を正規化する。
+    全角/半角（NFKC）・大文字小文字・カタカナ/ひらがな・連続空白のゆれを吸収する。
+    """
+    s = unicodedata.normalize("NFKC", str(text)).casefold()
+    s = s.translate(_KATA_TO_HIRA)
+    return " ".join(s.split())
+
+
+def _grams(s: str, n: int):
+    """文字列 s の長さ n の n-gram を列挙する。"""
+    return (s[i:i + n] for i in range(len(s) - n + 1))
+
+
+class SongSearchIndex:
+    """
+    曲名の n-gram（1〜MAX_GRAM 文字）転置インデックス。
+    search() は候補を posting の積集合で絞り込み、部分文字列で検証してから順位付けする。
+    ラベル全体（"★難易度 曲名"）にも同じ転置インデックスを持ち、
+    "12 air" のように難易度と曲名をまたぐクエリは従来のラベルの部分一致と同じく拾う。
+    """
+
+    def __init__(self, titles: list[str], levels: list[str]):
+        self._titles = [normalize_text(t) for t in titles]
+        self._levels = [normalize_text(lv) for lv in levels]
+        self._all = range(len(self._titles))
+        # 前方一致を二分探索で引くための (正規化曲名, 行番号) のソート済み配列
+        self._sorted = sorted((t, i) for i, t in enumerate(self._titles))
+        self._sorted_keys = [t for t, _ in self._sorted]
+        # 難易度 → 行番号（CSV の並び順）
+        self._by_level: dict[str, list[int]] = {}
+        for i, lv in enumerate(self._levels):
+            self._by_level.setdefault(lv, []).append(i)
+
+        # catalog.labels と同じ "★難易度 曲名" を正規化したもの
+        self._labels = [normalize_text(f"★{lv} {t}") for lv, t in zip(levels, titles)]
+        self._postings = self._build_postings(self._titles)
+        self._label_postings = self._build_postings(self._labels)
+
+    @staticmethod
+    def _build_postings(texts: list[str]) -> dict[str, set[int]]:
+        """n-gram → その n-gram を含む行番号の集合。"""
+        postings: dict[str, set[int]] = {}
+        for i, t in enumerate(texts):
+            for n in range(1, MAX_GRAM + 1):
+                for g in set(_grams(t, n)):
+                    postings.setdefault(g, set()).add(i)
+        return postings
+
+    @classmethod
+    def from_catalog(cls, catalog: SongCatalog) -> "SongSearchIndex":
+        """楽曲カタログの曲名・難易度からインデックスを構築する。"""
+        return cls(catalog.titles, catalog.levels)
+
+    def _candidates(self, q: str, postings: dict[str, set[int]] | None = None):
+        """クエリ q を含みうる行番号の集合（q が空なら全件）を返す。既定は曲名の posting を使う。"""
+        if not q:
+            return self._all
+        if postings is None:
+            postings = self._postings
+        n = min(MAX_GRAM, len(q))
+        lists = []
+        for g in set(_grams(q, n)):
+            p = postings.get(g)
+            if p is None:
+                return ()
+            lists.append(p)
+        lists.sort(key=len)
+        return lists[0].intersection(*lists[1:])
+
+    def _prefix_matches(self, q: str) -> list[int]:
+        """曲名が q で始まる行番号を二分探索で返す。"""
+        lo = bisect.bisect_left(self._sorted_keys, q)
+        hi = bisect.bisect_left(self._sorted_keys, q + "\U0010ffff", lo)
+        return [i for _, i in self._sorted[lo:hi]]
+
+    def search(self, query: str, limit: int = 25) -> list[int]:
+        """
+        クエリに一致する行番号を関連度順に最大 limit 件返す。
+        先頭の "★N" は難易度指定として扱う（空白なしの "★1" は難易度の前方一致）。
+        順位: 曲名の前方一致 → 一致位置が前 → 曲名が短い → CSV の並び順
+        （曲名なしの難易度指定のみの場合は 難易度の完全一致 → CSV の並び順）
+        曲名の一致が limit 件に満たなければ、クエリ全体をラベルの部分一致で探した結果を後ろに足す。
+        """
+        full_q = q = normalize_text(query)
+        level = None
+        level_is_prefix = False
+        m = _LEVEL_PREFIX_RE.match(q)
+        if m:
+            level = m.group(1)
+            level_is_prefix = m.group(2) is None
+            q = m.group(2) or ""
+
+        if not q and level is None:
+            return list(self._all[:limit])
+
+        if not q:
+            # 難易度指定のみ: 完全一致の難易度を先に、前方一致の難易度を後に並べる
+            hits = list(self._by_level.get(level, ()))
+            if level_is_prefix:
+                for lv in sorted(self._by_level):
+                    if lv != level and lv.startswith(level) and len(hits) < limit:
+                        hits.extend(self._by_level[lv])
+            return hits[:limit]
+
+        titles = self._titles
+        if level is None:
+            # 前方一致だけで limit 件埋まる場合は部分一致の走査を省略する
+            prefix = self._prefix_matches(q)
+            if len(prefix) >= limit:
+                return heapq.nsmallest(limit, prefix, key=lambda i: (len(titles[i]), i))
+
+        levels = self._levels
+        candidates = self._candidates(q)
+        if level is not None and not level_is_prefix:
+            # 難易度で絞った方が少なければそちらを走査する
+            same_level = self._by_level.get(level, ())
+            if len(same_level) < len(candidates):
+                candidates = same_level
+
+        scored = []
+        for i in candidates:
+            if level is not None:
+                lv = levels[i]
+                if not (lv.startswith(level) if level_is_prefix else lv == level):
+                    continue
+            pos = titles[i].find(q)
+            if pos < 0:
+                continue
+            scored.append((pos != 0, pos, len(titles[i]), i))
+        hits = [i for *_, i in heapq.nsmallest(limit, scored)]
+        if len(hits) < limit:
+            hits += self._label_matches(full_q, limit - len(hits), set(hits))
+        return hits
+
+    def _label_matches(self, q: str, limit: int, exclude: set[int]) -> list[int]:
+        """ラベル全体に q を含む行番号を 一致位置が前 → ラベルが短い → CSV の並び順 で返す。"""
+        labels = self._labels
+        scored = []
+        for i in self._candidates(q, self._label_postings):
+            if i in exclude:
+                continue
+            pos = labels[i].find(q)
+            if pos >= 0:
+                scored.append((pos, len(labels[i]), i))
+        return [i for *_, i in heapq.nsmallest(limit, scored)]
@@ -0,0 +1,180 @@
+# ============================================================
+# user_directory.py - DiscordID ⇔ LR2ID の対応表
+# UserData タブを一度読み込んでメモリに保持し、両方向を dict で引けるようにする。
+# /register の書き込み時に即時反映し、手動編集は定期的な読み直しで拾う。
+# ============================================================
+
+import threading
+import time
+
+from src.common import _open_worksheet
+from src.sheet_cache import cached_records, USER_DATA_TTL
+
+# 見つからなかった ID で UserData を読み直す最短間隔（秒）。
+# 未登録ユーザーの /mypage が続いても読み込みが連発しないようにする
+MISS_RELOAD_INTERVAL: float = 30.0
+
+
+# ============================================================
+# UserData 読み込み
+# ============================================================
+
+def _load_user_rows_sync(
+    sheet_id: str,
+    ws_title: str = "UserData",
+    use_cache: bool = True,
+) -> list[dict]:
+    """
+    UserData タブを読み込み、正規化した [{DiscordID: str, LR2ID: str}, ...] を返す。
+    列名のゆれ（大文字小文字・日本語）を許容する。
+    """
+    if use_cache:
+        rows = cached_records(sheet_id, ws_title, USER_DATA_TTL)
+    else:
+        rows = _open_worksheet(sheet_id, ws_title).get_all_records()
+
+    def get_fuzzy(d: dict, *keys) -> str | None:
+        """辞書から列名のゆれを許容して値を取得する。"""
+        for k in keys:
+            if k in d and d[k] not in ("", None):
+                return d[k]
+        lower = {str(k).lower(): v for k, v in d.items()}
+        for k in keys:
+            lk = str(k).lower()
+            if lk in lower and lower[lk] not in ("", None):
+                return lower[lk]
+        return None
+
+    norm = []
+    for r in rows:
+        discord_id = get_fuzzy(r, "DiscordID", "discord_id", "discordid", "ディスコードID")
+        lr2id      = get_fuzzy(r, "LR2ID", "lr2_id", "lr2id")
+        if discord_id and lr2id:
+            norm.append({
+                "DiscordID": str(discord_id).strip(),
+                "LR2ID":     str(lr2id).strip(),
+            })
+    return norm
+
+
+# ============================================================
+# 対応表
+# ============================================================
+
+class UserDirectory:
+    """
+    DiscordID ⇔ LR2ID の双方向の対応表。
+    executor の複数スレッドから使うため、更新はロックで保護し、
+    読み込み時は dict を丸ごと差し替える。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()   # 未読み込み時に同時に呼ばれても読み込みは1回にする
+        self._by_discord: dict[str, str] = {}
+        self._by_lr2id: dict[str, str] = {}
+        self._source: tuple[str, str] | None = None   # 読み込み元 (sheet_id, ws_title)
+        self._loaded_at: float | None = None           # time.monotonic()
+        self.loads = 0
+
+    def replace(self, rows: list[dict], source: tuple[str, str] | None = None) -> None:
+        """
+        _load_user_rows_sync の結果で対応表を置き換える。
+        同じ DiscordID・LR2ID が複数行にある場合は、それぞれ先頭の行を優先する
+        （upsert_keyed_row_sync が上書きする行・UserData を上から探す従来の検索と同じ）。
+        """
+        by_discord: dict[str, str] = {}
+        by_lr2id: dict[str, str] = {}
+        for r in rows:
+            by_discord.setdefault(r["DiscordID"], r["LR2ID"])
+            by_lr2id.setdefault(r["LR2ID"], r["DiscordID"])
+        with self._lock:
+            self._by_discord = by_discord
+            self._by_lr2id = by_lr2id
+            if source is not None:
+                self._source = source
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+
+    def set(self, discord_id: str, lr2id: str) -> None:
+        """1人分の対応を登録・更新する（/register の書き込み後に呼ぶ）。"""
+        discord_id, lr2id = str(discord_id).strip(), str(lr2id).strip()
+        with self._lock:
+            old = self._by_discord.get(discord_id)
+            if old is not None and self._by_lr2id.get(old) == discord_id:
+                del self._by_lr2id[old]
+            self._by_discord[discord_id] = lr2id
+            self._by_lr2id[lr2id] = discord_id
+
+    def lr2id_of(self, discord_id: str) -> str | None:
+        return self._by_discord.get(str(discord_id).strip())
+
+    def discord_of(self, lr2id: str) -> str | None:
+        return self._by_lr2id.get(str(lr2id).strip())
+
+    def rows(self) -> list[dict]:
+        """_load_user_rows_sync と同じ形式で全件を返す。"""
+        with self._lock:
+            return [{"DiscordID": did, "LR2ID": lr2} for did, lr2 in self._by_discord.items()]
+
+    def is_loaded(self, source: tuple[str, str] | None = None) -> bool:
+        """読み込み済みか（source を指定した場合はその読み込み元から読み込み済みか）を返す。"""
+        return self._loaded_at is not None and (source is None or self._source in (None, source))
+
+    def age(self) -> float:
+        """最後に読み込んでからの秒数（未読み込みなら inf）。"""
+        return float("inf") if self._loaded_at is None else time.monotonic() - self._loaded_at
+
+    def load_sync(self, sheet_id: str, ws_title: str) -> None:
+        """UserData をキャッシュを通さずに読み直して対応表を置き換える。"""
+        self.replace(_load_user_rows_sync(sheet_id, ws_title, use_cache=False), (sheet_id, ws_title))
+
+    def ensure_loaded_sync(self, sheet_id: str, ws_title: str) -> None:
+        """未読み込みなら読み込む。読み込み済みなら何もしない（API を呼ばない）。"""
+        if self.is_loaded((sheet_id, ws_title)):
+            return
+        with self._load_lock:
+            if not self.is_loaded((sheet_id, ws_title)):
+                self.load_sync(sheet_id, ws_title)
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._by_discord),
+            "loads": self.loads,
+            "age_sec": round(self.age(), 1),
+        }
+
+
+# プロセス共通の対応表
+user_directory = UserDirectory()
+
+
+def lr2id_for_discord_sync(sheet_id: str, ws_title: str, discord_id: str) -> str | None:
+    """
+    DiscordID に対応する LR2ID を返す。見つからない場合は None。
+    読み込み済みなら API を呼ばない。見つからない場合だけ、前回の読み込みから
+    MISS_RELOAD_INTERVAL 秒以上経っていれば読み直して再検索する（手動での追加に対応）。
+    """
+    user_directory.ensure_loaded_sync(sheet_id, ws_title)
+    lr2id = user_directory.lr2id_of(discord_id)
+    if lr2id is None and user_directory.age() >= MISS_RELOAD_INTERVAL:
+        user_directory.load_sync(sheet_id, ws_title)
+        lr2id = user_directory.lr2id_of(discord_id)
+    return lr2id
+
+
+def user_rows_sync(sheet_id: str, ws_title: str) -> list[dict]:
+    """対応表の全件を [{DiscordID, LR2ID}, ...] で返す（未読み込みなら読み込む）。"""
+    user_directory.ensure_loaded_sync(sheet_id, ws_title)
+    return user_directory.rows()
+
+
+def refresh_user_directory_sync(sheet_id: str, ws_title: str, max_age: float = 0.0) -> bool:
+    """
+    最後の読み込みから max_age 秒以上経っていれば UserData を読み直す。
+    読み直した場合は True を返す（手動編集を拾うための定期処理から呼ぶ）。
+    """
+    if user_directory.is_loaded((sheet_id, ws_title)) and user_directory.age() < max_age:
+        return False
+    user_directory.load_sync(sheet_id, ws_title)
+    return True
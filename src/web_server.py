@@ -1,65 +1,622 @@
 # ============================================================
 # web_server.py - マイページ配信用 Web サーバー
-# aiohttp を使って生成済み HTML をインメモリで保持し、
+# aiohttp を使って生成済み HTML をインメモリ（任意で SQLite にも）保持し、
 # ユニークな URL でブラウザ閲覧できるようにする
 # ============================================================
 
+import asyncio
+import contextlib
+import gzip
+import hashlib
+import heapq
+import json
+import logging
+import os
+import sqlite3
 import time
 import uuid
+from collections import OrderedDict
+from typing import NamedTuple
 
 from aiohttp import web
 
+from src.generate_table import MYPAGE_JS, PAGE_CSS, dump_table_data, iter_mypage_table, render_page_shell
+
+try:  # brotli は任意依存（未インストールなら gzip のみ）
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
 # ============================================================
 # インメモリ ページストア
 # ============================================================
 
-# token → (html, expiry_timestamp)
-_pages: dict[str, tuple[str, float]] = {}
-
 # ページの有効期限（秒）。デフォルト 24 時間
 PAGE_TTL: float = 60 * 60 * 24
 
+# メモリに保持するページの合計バイト数の上限（超えたら最も古く参照されたページから破棄）
+# WEB_PAGE_DB 指定時はメモリ上の「よく見られるページ」の上限になり、破棄してもリンクは切れない
+MAX_BYTES: int = int(os.getenv("WEB_PAGE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# ページを永続化する SQLite ファイルのパス（空文字ならメモリのみ。再起動でリンクが切れる）
+DB_PATH: str = os.getenv("WEB_PAGE_DB", "")
+
+# SQLite の読み込みに使うメモリマップの大きさ（バイト）
+DB_MMAP_SIZE: int = 256 * 1024 * 1024
+
+# 期限切れページを掃除するバックグラウンドタスクの実行間隔（秒）
+SWEEP_INTERVAL: float = 60.0
+
+# 保存時の圧縮レベル（保存は1回・配信は多数なので高めに設定）
+GZIP_LEVEL: int = 9
+BROTLI_QUALITY: int = 9
+
+
+# 保存するページの種類
+HTML_TYPE = "text/html"
+JSON_TYPE = "application/json"
+
+
+class Page(NamedTuple):
+    """保存済みページの本文。圧縮版は元より小さくならなければ None。"""
+    body: bytes         # UTF-8 エンコード済みの HTML または JSON
+    gzip: bytes | None
+    br: bytes | None
+    etag: str           # 内容ハッシュ（引用符なし）。本文の共有キーを兼ね、エンコーディングごとに接尾辞を付けて使う
+    content_type: str = HTML_TYPE
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzip or b"") + len(self.br or b"")
+
+
+def _content_digest(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def _make_page(body: bytes, digest: str, content_type: str = HTML_TYPE) -> Page:
+    """エンコード済みの本文を圧縮して Page を作る。"""
+    gz = gzip.compress(body, GZIP_LEVEL, mtime=0)
+    br = brotli.compress(body, quality=BROTLI_QUALITY) if brotli is not None else None
+    return Page(
+        body=body,
+        gzip=gz if len(gz) < len(body) else None,
+        br=br if br is not None and len(br) < len(body) else None,
+        etag=digest,
+        content_type=content_type,
+    )
+
+
+class _Token(NamedTuple):
+    digest: str
+    expiry: float
+    key: str | None
+    fingerprint: str | None
+
+
+# ============================================================
+# 永続化（SQLite）
+# ============================================================
+
+_PAGE_DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bodies (
+    digest      TEXT PRIMARY KEY,
+    body        BLOB NOT NULL,
+    gzip        BLOB,
+    br          BLOB,
+    content_type TEXT NOT NULL DEFAULT 'text/html'
+);
+CREATE TABLE IF NOT EXISTS tokens (
+    token       TEXT PRIMARY KEY,
+    digest      TEXT NOT NULL,
+    expiry      REAL NOT NULL,
+    key         TEXT,
+    fingerprint TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tokens_expiry ON tokens (expiry);
+CREATE INDEX IF NOT EXISTS idx_tokens_key ON tokens (key);
+CREATE INDEX IF NOT EXISTS idx_tokens_digest ON tokens (digest);
+"""
+
+
+class _PageDB:
+    """
+    ページの SQLite 永続化。本文は内容ハッシュごとに1行の BLOB として持ち、トークンから参照する。
+    読み込みはメモリマップ経由。期限切れのトークンと参照されなくなった本文は compact() で消す。
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        self._conn.executescript(_PAGE_DB_SCHEMA)
+        # content_type 列がない古いファイルは列を追加する（既存の本文はすべて HTML）
+        cols = {row[1] for row in self._conn.execute("PRAGMA table_info(bodies)")}
+        if "content_type" not in cols:
+            self._conn.execute(
+                "ALTER TABLE bodies ADD COLUMN content_type TEXT NOT NULL DEFAULT 'text/html'"
+            )
+
+    def load_token(self, token: str) -> _Token | None:
+        row = self._conn.execute(
+            "SELECT digest, expiry, key, fingerprint FROM tokens WHERE token = ?", (token,)
+        ).fetchone()
+        return _Token(*row) if row else None
+
+    def token_for_key(self, key: str) -> tuple[str, _Token] | None:
+        row = self._conn.execute(
+            "SELECT token, digest, expiry, key, fingerprint FROM tokens WHERE key = ? "
+            "ORDER BY expiry DESC LIMIT 1",
+            (key,),
+        ).fetchone()
+        return (row[0], _Token(*row[1:])) if row else None
+
+    def load_body(self, digest: str) -> Page | None:
+        row = self._conn.execute(
+            "SELECT body, gzip, br, content_type FROM bodies WHERE digest = ?", (digest,)
+        ).fetchone()
+        return Page(*row[:3], etag=digest, content_type=row[3]) if row else None
+
+    def save(self, token: str, t: _Token, page: Page) -> None:
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO bodies (digest, body, gzip, br, content_type) VALUES (?, ?, ?, ?, ?)",
+                (t.digest, page.body, page.gzip, page.br, page.content_type),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tokens (token, digest, expiry, key, fingerprint) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (token, *t),
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def touch(self, token: str, expiry: float) -> None:
+        self._conn.execute("UPDATE tokens SET expiry = ? WHERE token = ?", (expiry, token))
+
+    def compact(self, now: float) -> int:
+        """期限切れのトークンと、どのトークンからも参照されない本文を削除し、削除したトークン数を返す。"""
+        n = self._conn.execute("DELETE FROM tokens WHERE expiry <= ?", (now,)).rowcount
+        self._conn.execute(
+            "DELETE FROM bodies WHERE NOT EXISTS "
+            "(SELECT 1 FROM tokens WHERE tokens.digest = bodies.digest)"
+        )
+        return n
+
+    def stats(self) -> dict:
+        tokens = self._conn.execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+        bodies, size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(body) + COALESCE(LENGTH(gzip), 0) + COALESCE(LENGTH(br), 0)), 0) "
+            "FROM bodies"
+        ).fetchone()
+        return {"db_entries": tokens, "db_bodies": bodies, "db_bytes": size}
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# ============================================================
+# ページストア
+# ============================================================
+
+class PageStore:
+    """
+    トークン → 本文の内容ハッシュ → Page（UTF-8 エンコード済み HTML と圧縮版）のストア。
+    - 本文は内容ハッシュで共有し（参照カウント）、同じ内容は何度保存しても1つだけ持つ
+    - key を指定した保存はキーごとに同じトークンを使い回す（/mypage all のユーザー別 URL）
+    - 有効期限は最小ヒープで管理し、期限切れの掃除は切れた件数分だけの O(k log n)
+    - メモリ上の本文の合計バイト数（圧縮版を含む）が max_bytes を超えたら LRU 順にトークンを破棄する
+    db_path を指定すると全ページを SQLite にも書き、メモリはよく見られるページだけのキャッシュになる
+    （メモリから破棄されたページ・再起動前のページは参照時に SQLite から読み戻す）。
+    aiohttp のイベントループ上からのみ使う想定（ロックなし）。
+    """
+
+    def __init__(self, ttl: float = PAGE_TTL, max_bytes: int = MAX_BYTES, db_path: str | None = None):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._db = _PageDB(db_path) if db_path else None
+        # token → _Token。並び順が参照順（末尾が最新）
+        self._tokens: OrderedDict[str, _Token] = OrderedDict()
+        # 内容ハッシュ → [Page, 参照しているトークン数]
+        self._bodies: dict[str, list] = {}
+        # key → token
+        self._by_key: dict[str, str] = {}
+        # (expiry, token) の最小ヒープ。削除・延長済みの要素は掃除時に読み飛ばす
+        self._expiry_heap: list[tuple[float, str]] = []
+        self.bytes = 0
+        self.expired = 0
+        self.evictions = 0
+        self.dedup_hits = 0
+        self.db_reads = 0
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def _release(self, digest: str) -> None:
+        entry = self._bodies[digest]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._bodies[digest]
+            self.bytes -= entry[0].size
+
+    def _remove(self, token: str) -> None:
+        t = self._tokens.pop(token)
+        if t.key is not None and self._by_key.get(t.key) == token:
+            del self._by_key[t.key]
+        self._release(t.digest)
+
+    def _set_token(self, token: str, t: _Token) -> None:
+        self._tokens[token] = t
+        self._tokens.move_to_end(token)
+        heapq.heappush(self._expiry_heap, (t.expiry, token))
+        if t.key is not None:
+            self._by_key[t.key] = token
+
+    def _cache(self, token: str, t: _Token, page: Page) -> None:
+        """トークンと本文をメモリに載せる（予算を超える分は LRU 順に破棄）。"""
+        if token in self._tokens:
+            self._remove(token)
+        entry = self._bodies.get(t.digest)
+        if entry is None:
+            # 予算に収まるまで最も古く参照されたトークンから破棄（1ページが予算を超える場合はそれ1件だけ残る）
+            while self._tokens and self.bytes + page.size > self.max_bytes:
+                self._remove(next(iter(self._tokens)))
+                self.evictions += 1
+            entry = self._bodies[t.digest] = [page, 0]
+            self.bytes += page.size
+        entry[1] += 1
+        self._set_token(token, t)
+
+    def _find_key(self, key: str) -> tuple[str, _Token] | None:
+        token = self._by_key.get(key)
+        if token is not None:
+            return token, self._tokens[token]
+        return self._db.token_for_key(key) if self._db is not None else None
+
+    def sweep(self, now: float | None = None) -> int:
+        """期限切れのトークンをメモリから削除し、削除した件数を返す。"""
+        now = time.time() if now is None else now
+        heap = self._expiry_heap
+        n = 0
+        while heap and heap[0][0] <= now:
+            expiry, token = heapq.heappop(heap)
+            t = self._tokens.get(token)
+            if t is not None and t.expiry == expiry:
+                self._remove(token)
+                n += 1
+        self.expired += n
+        # LRU 破棄・期限延長で無効になった要素がヒープに溜まりすぎたら作り直す
+        if len(heap) > 2 * len(self._tokens) + 64:
+            self._expiry_heap = [(t.expiry, token) for token, t in self._tokens.items()]
+            heapq.heapify(self._expiry_heap)
+        return n
+
+    def compact(self, now: float | None = None) -> int:
+        """メモリの掃除に加え、SQLite から期限切れのページを削除する。削除したトークン数を返す。"""
+        now = time.time() if now is None else now
+        n = self.sweep(now)
+        if self._db is not None:
+            n = max(n, self._db.compact(now))
+        return n
+
+    def lookup(self, key: str, fingerprint: str) -> str | None:
+        """
+        key のページが有効期限内で、同じ fingerprint（元データのハッシュ）から作られていれば
+        そのトークンを返す（有効期限は延長する）。なければ None を返し、呼び出し側は描画して put する。
+        """
+        found = self._find_key(key)
+        if found is None:
+            return None
+        token, t = found
+        now = time.time()
+        if t.fingerprint != fingerprint or now > t.expiry:
+            return None
+        t = t._replace(expiry=now + self.ttl)
+        if self._db is not None:
+            self._db.touch(token, t.expiry)
+        if token in self._tokens:
+            self._set_token(token, t)
+        self.dedup_hits += 1
+        return token
+
+    def put(
+        self,
+        content: str,
+        key: str | None = None,
+        fingerprint: str | None = None,
+        content_type: str = HTML_TYPE,
+    ) -> str:
+        """
+        HTML（または JSON）を保存してアクセス用トークンを返す。
+        key を指定すると、そのキーの既存トークンを使い回して中身と有効期限を更新する。
+        """
+        now = time.time()
+        self.sweep(now)
+
+        body = content.encode("utf-8")
+        digest = _content_digest(body)
+        entry = self._bodies.get(digest)
+        page = entry[0] if entry is not None else None
+        if page is None and self._db is not None:
+            page = self._db.load_body(digest)
+        if page is None:
+            page = _make_page(body, digest, content_type)
+        else:
+            self.dedup_hits += 1
 
-def store_page(html: str) -> str:
+        found = self._find_key(key) if key is not None else None
+        token = found[0] if found is not None else uuid.uuid4().hex
+        t = _Token(digest, now + self.ttl, key, fingerprint)
+        if self._db is not None:
+            self._db.save(token, t, page)
+        self._cache(token, t, page)
+        return token
+
+    def get(self, token: str) -> tuple[Page, float, bool] | None:
+        """
+        (Page, 有効期限, 中身が差し替わりうるか) を返す。存在しないか期限切れなら None。
+        key つきで保存したトークンは同じ URL のまま中身が更新されうる。
+        """
+        t = self._tokens.get(token)
+        if t is None and self._db is not None:
+            t = self._db.load_token(token)
+            if t is not None and time.time() <= t.expiry:
+                entry = self._bodies.get(t.digest)
+                page = entry[0] if entry is not None else self._db.load_body(t.digest)
+                if page is None:
+                    return None
+                self.db_reads += 1
+                self._cache(token, t, page)
+        if t is None:
+            return None
+        if time.time() > t.expiry:
+            if token in self._tokens:
+                self._remove(token)
+            self.expired += 1
+            return None
+        self._tokens.move_to_end(token)
+        return self._bodies[t.digest][0], t.expiry, t.key is not None
+
+    def stats(self) -> dict:
+        stats = {
+            "entries": len(self._tokens),
+            "bodies": len(self._bodies),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "dedup_hits": self.dedup_hits,
+        }
+        if self._db is not None:
+            stats["db_reads"] = self.db_reads
+            stats.update(self._db.stats())
+        return stats
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+
+
+# プロセス共通のページストア
+page_store = PageStore(db_path=DB_PATH or None)
+
+
+def store_page(html: str, key: str | None = None, fingerprint: str | None = None) -> str:
+    """
+    HTML 文字列を保存し、アクセス用トークンを返す。
+    同じ内容の HTML は本文を共有する。key（例: ユーザーごとの識別子）を指定すると
+    キーごとに同じトークン（URL）を使い回し、fingerprint は find_page での再利用判定に使う。
+    TTL 切れのページはバックグラウンドタスクと次回の保存時に削除される。
+    """
+    return page_store.put(html, key, fingerprint)
+
+
+def store_page_data(data: dict, key: str | None = None, fingerprint: str | None = None) -> str:
+    """
+    build_mypage_data の結果を JSON で保存し、アクセス用トークンを返す。
+    /mypage/{token} は全ページ共通の静的シェルを返し、シェルが /mypage/{token}/data.json を読み込む。
+    key・fingerprint は store_page と同じ。
+    """
+    return page_store.put(dump_table_data(data), key, fingerprint, JSON_TYPE)
+
+
+def find_page(key: str, fingerprint: str) -> str | None:
     """
-    HTML 文字列をインメモリに保存し、アクセス用トークンを返す。
-    TTL 切れのページは次のアクセス時に自動削除される。
+    key のページが同じ fingerprint から作られていて有効期限内ならトークンを返す（描画を省略できる）。
     """
-    # 古いページを掃除
-    now = time.time()
-    expired = [t for t, (_, exp) in _pages.items() if now > exp]
-    for t in expired:
-        del _pages[t]
+    return page_store.lookup(key, fingerprint)
+
+
+def page_store_stats() -> dict:
+    """ページストアの統計（entries, bodies, bytes, max_bytes, expired, evictions, dedup_hits, SQLite 使用時は db_*）を返す。"""
+    return page_store.stats()
+
 
-    token = uuid.uuid4().hex
-    _pages[token] = (html, now + PAGE_TTL)
-    return token
+async def _sweep_loop() -> None:
+    """SWEEP_INTERVAL 秒ごとに期限切れページを掃除する（SQLite 使用時はファイルからも削除する）。"""
+    while True:
+        await asyncio.sleep(SWEEP_INTERVAL)
+        n = page_store.compact()
+        if n:
+            logger.info("期限切れのマイページを %d 件削除しました %s", n, page_store.stats())
+
+
+async def _sweeper_ctx(app: web.Application):
+    """アプリの起動から終了まで掃除タスクを動かす（cleanup_ctx 用）。"""
+    task = asyncio.create_task(_sweep_loop())
+    yield
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
 
 
 # ============================================================
 # aiohttp ルートハンドラー
 # ============================================================
 
-async def _handle_page(request: web.Request) -> web.Response:
+def _accepted_encodings(header: str) -> set[str]:
+    """Accept-Encoding ヘッダーから受け入れ可能（q > 0）なエンコーディング名の集合を返す。"""
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name and q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def _select_encoding(page: Page, header: str) -> tuple[bytes, str | None]:
+    """Accept-Encoding に応じて (本文, Content-Encoding) を選ぶ。br → gzip → 無圧縮 の順に優先。"""
+    accepted = _accepted_encodings(header)
+    if page.br is not None and ("br" in accepted or "*" in accepted):
+        return page.br, "br"
+    if page.gzip is not None and ("gzip" in accepted or "*" in accepted):
+        return page.gzip, "gzip"
+    return page.body, None
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match の値が ETag に一致するか（弱い比較）を返す。"""
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag
+        for tag in if_none_match.split(",")
+    )
+
+
+def _static_page(text: str, content_type: str) -> Page:
+    body = text.encode("utf-8")
+    return _make_page(body, _content_digest(body), content_type)
+
+
+# 静的ファイル（内容ハッシュ入りのファイル名で配信し、ブラウザに無期限キャッシュさせる）
+_STATIC_CSS = _static_page(PAGE_CSS, "text/css")
+_STATIC_JS = _static_page(MYPAGE_JS, "application/javascript")
+_STATIC: dict[str, Page] = {
+    f"mypage.{_STATIC_CSS.etag[:12]}.css": _STATIC_CSS,
+    f"mypage.{_STATIC_JS.etag[:12]}.js": _STATIC_JS,
+}
+_SHELL = _static_page(
+    render_page_shell(
+        f"/static/mypage.{_STATIC_CSS.etag[:12]}.css",
+        f"/static/mypage.{_STATIC_JS.etag[:12]}.js",
+    ),
+    HTML_TYPE,
+)
+
+# Cache-Control
+_STATIC_CACHE = "public, max-age=31536000, immutable"
+_SHELL_CACHE = "public, max-age=86400"
+
+
+def _respond(request: web.Request, page: Page, cache_control: str) -> web.Response:
     """
-    GET /mypage/{token} — 保存済み HTML を返す。
-    トークンが存在しない、または有効期限切れの場合は 404 を返す。
+    保存時に圧縮済みの本文を Accept-Encoding に応じて返し、ETag・Cache-Control を付ける。
+    If-None-Match が一致すれば 304 を返す。
     """
-    token = request.match_info["token"]
-    entry = _pages.get(token)
+    body, encoding = _select_encoding(page, request.headers.get("Accept-Encoding", ""))
+    # 強い ETag は表現ごとに異なる必要があるため、エンコーディングを接尾辞で区別する
+    etag = f'"{page.etag}-{encoding}"' if encoding else f'"{page.etag}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return web.Response(status=304, headers=headers)
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return web.Response(body=body, content_type=page.content_type, charset="utf-8", headers=headers)
+
+
+def _page_cache_control(expiry: float, mutable: bool) -> str:
+    # 同じ URL で中身が更新されうるページは毎回 ETag で再検証させる
+    if mutable:
+        return "private, no-cache"
+    return f"private, max-age={max(int(expiry - time.time()), 0)}"
+
+
+def _get_or_404(token: str) -> tuple[Page, float, bool]:
+    entry = page_store.get(token)
     if entry is None:
-        raise web.HTTPNotFound(text="このページは存在しないか、有効期限切れです。")
-    html, expiry = entry
-    if time.time() > expiry:
-        del _pages[token]
-        raise web.HTTPNotFound(text="このページは有効期限切れです。再度コマンドを実行してください。")
-    return web.Response(text=html, content_type="text/html", charset="utf-8")
+        raise web.HTTPNotFound(text="このページは存在しないか、有効期限切れです。再度コマンドを実行してください。")
+    return entry
+
+
+async def _stream_table(request: web.Request, page: Page, cache_control: str) -> web.StreamResponse:
+    """JSON で保存したページを HTML テーブルに描画しながらチャンク転送で返す。"""
+    resp = web.StreamResponse(headers={"Cache-Control": cache_control})
+    resp.content_type = "text/html"
+    resp.charset = "utf-8"
+    resp.enable_compression()
+    await resp.prepare(request)
+    for chunk in iter_mypage_table(json.loads(page.body)):
+        await resp.write(chunk.encode("utf-8"))
+    await resp.write_eof()
+    return resp
+
+
+async def _handle_page(request: web.Request) -> web.StreamResponse:
+    """
+    GET /mypage/{token} — 保存済みページを返す。
+    JSON で保存したページは全ページ共通の静的シェルを、HTML で保存したページはその HTML を返す。
+    ?view=table を付けると JSON で保存したページを JavaScript なしの HTML テーブルで返す。
+    トークンが存在しない、または有効期限切れの場合は 404 を返す。
+    """
+    page, expiry, mutable = _get_or_404(request.match_info["token"])
+    if page.content_type == JSON_TYPE:
+        if request.query.get("view") == "table":
+            return await _stream_table(request, page, _page_cache_control(expiry, mutable))
+        return _respond(request, _SHELL, _SHELL_CACHE)
+    return _respond(request, page, _page_cache_control(expiry, mutable))
+
+
+async def _handle_page_data(request: web.Request) -> web.Response:
+    """GET /mypage/{token}/data.json — 静的シェルが読み込むページの JSON データを返す。"""
+    page, expiry, mutable = _get_or_404(request.match_info["token"])
+    if page.content_type != JSON_TYPE:
+        raise web.HTTPNotFound(text="このページにはデータがありません。")
+    return _respond(request, page, _page_cache_control(expiry, mutable))
+
+
+async def _handle_static(request: web.Request) -> web.Response:
+    """GET /static/{name} — 静的シェル用の CSS / JS を返す。"""
+    page = _STATIC.get(request.match_info["name"])
+    if page is None:
+        raise web.HTTPNotFound()
+    return _respond(request, page, _STATIC_CACHE)
 
 
 # ============================================================
 # サーバー起動
 # ============================================================
 
+def create_app() -> web.Application:
+    """ルートと掃除タスクを登録した aiohttp アプリを返す（ベンチマークからも使う）。"""
+    app = web.Application()
+    app.router.add_get("/mypage/{token}", _handle_page)
+    app.router.add_get("/mypage/{token}/data.json", _handle_page_data)
+    app.router.add_get("/static/{name}", _handle_static)
+    app.cleanup_ctx.append(_sweeper_ctx)
+    return app
+
+
 async def start_web_server(host: str = "0.0.0.0", port: int = 8080) -> web.AppRunner:
     """
     aiohttp サーバーを起動して AppRunner を返す。
@@ -68,10 +625,7 @@ async def start_web_server(host: str = "0.0.0.0", port: int = 8080) -> web.AppRu
       - WEB_HOST: バインドアドレス（デフォルト: 0.0.0.0）
       - WEB_PORT: ポート番号（デフォルト: 8080）
     """
-    app = web.Application()
-    app.router.add_get("/mypage/{token}", _handle_page)
-
-    runner = web.AppRunner(app)
+    runner = web.AppRunner(create_app())
     await runner.setup()
     site = web.TCPSite(runner, host, port)
     await site.start()
@@ -0,0 +1,227 @@
+# ============================================================
+# fake_sheets.py - テスト用の偽の gspread.Spreadsheet
+# タブの値をメモリ上の2次元リストで持ち、bot が使う Spreadsheet のメソッド
+# （worksheets / values_get / values_batch_get / values_batch_update / values_append /
+#   batch_update / get_lastUpdateTime）を Sheets と同じ形の応答で実装する。
+# 値は Sheets の FORMATTED_VALUE と同じく文字列で返す
+# ============================================================
+
+import collections
+import re
+
+import requests
+from gspread.exceptions import APIError
+from gspread.http_client import HTTPClient
+
+# /result で write_round_result_to_sheet が書き込むヘッダー（main.py と同じ）
+RESULT_HEADER = ["Rank", "LR2ID", "PlayerName", "Score", "Score Rate (%)", "BPI"]
+
+_RANGE_RE = re.compile(r"^'((?:[^']|'')+)'!([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?$")
+
+
+class _Response:
+    """APIError に渡す requests.Response の代わり。"""
+
+    def __init__(self, code: int, message: str):
+        self.status_code = code
+        self.text = message
+        self.headers: dict = {}
+        self._body = {"error": {"code": code, "message": message, "status": "INVALID_ARGUMENT"}}
+
+    def json(self) -> dict:
+        return self._body
+
+
+def api_error(code: int, message: str) -> APIError:
+    return APIError(_Response(code, message))
+
+
+def _col(letters: str) -> int:
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - ord("A") + 1
+    return n - 1
+
+
+def _letters(col: int) -> str:
+    s = ""
+    col += 1
+    while col:
+        col, r = divmod(col - 1, 26)
+        s = chr(ord("A") + r) + s
+    return s
+
+
+def _trim(row: list) -> list:
+    row = list(row)
+    while row and row[-1] in ("", None):
+        row.pop()
+    return row
+
+
+class FakeWorksheet:
+    def __init__(self, title: str, sheet_id: int, row_count: int, col_count: int):
+        self.title = title
+        self.id = sheet_id
+        self.row_count = row_count
+        self.col_count = col_count
+
+
+class FakeSpreadsheet:
+    """
+    タブ名 → 値（先頭行がヘッダーの2次元リスト）を持つ偽の Spreadsheet。
+    テストからは tabs を直接書き換えて、手作業での行の挿入・削除・並べ替えを再現する。
+    calls に API 呼び出しの種類ごとの回数を数える。
+    """
+
+    def __init__(self, tabs: dict[str, list[list]] | None = None, spreadsheet_id: str = "fake-sheet"):
+        self.id = spreadsheet_id
+        # addSheet の応答から gspread.Worksheet を作れるようにするためのクライアント（通信はしない）
+        self.client = HTTPClient(None, session=requests.Session())
+        self.tabs: dict[str, list[list]] = {}
+        self._sheet_ids: dict[str, int] = {}
+        self.calls: collections.Counter = collections.Counter()
+        self.revision = 0
+        for title, values in (tabs or {}).items():
+            self.add_tab(title, values)
+
+    # ---- テスト用の操作 ----
+
+    def add_tab(self, title: str, values: list[list], sheet_id: int | None = None) -> None:
+        self.tabs[title] = [[str(v) for v in row] for row in values]
+        self._sheet_ids[title] = sheet_id if sheet_id is not None else len(self._sheet_ids) + 1
+        self.touch()
+
+    def touch(self) -> None:
+        """更新日時（get_lastUpdateTime）を進める。"""
+        self.revision += 1
+
+    # ---- 範囲 ----
+
+    def _parse(self, a1: str) -> tuple[str, int, int, int | None, int | None]:
+        """(タブ名, 開始行, 開始列, 終了行, 終了列)（0 起点、終了は含まない。None は端まで）"""
+        m = _RANGE_RE.match(a1)
+        if m is None or m.group(1).replace("''", "'") not in self.tabs:
+            raise api_error(400, f"Unable to parse range: {a1}")
+        title, c0, r0, c1, r1 = m.groups()
+        title = title.replace("''", "'")
+        start_row = int(r0) - 1 if r0 else 0
+        start_col = _col(c0) if c0 else 0
+        if c1 is None:   # 単一セル（例: A5）
+            return title, start_row, start_col, None, None
+        end_row = int(r1) if r1 else None
+        end_col = _col(c1) + 1 if c1 else None
+        return title, start_row, start_col, end_row, end_col
+
+    def _render(self, a1: str) -> list[list]:
+        title, r0, c0, r1, c1 = self._parse(a1)
+        rows = [_trim(row[c0:c1]) for row in self.tabs[title][r0:r1]]
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    def _write(self, title: str, r0: int, c0: int, values: list[list]) -> None:
+        tab = self.tabs[title]
+        for i, row in enumerate(values):
+            while len(tab) <= r0 + i:
+                tab.append([])
+            target = tab[r0 + i]
+            while len(target) < c0 + len(row):
+                target.append("")
+            target[c0:c0 + len(row)] = ["" if v is None else str(v) for v in row]
+        self.touch()
+
+    # ---- gspread.Spreadsheet のメソッド ----
+
+    def worksheets(self) -> list[FakeWorksheet]:
+        self.calls["worksheets"] += 1
+        return [
+            FakeWorksheet(title, self._sheet_ids[title], max(len(values), 1),
+                          max((len(r) for r in values), default=1))
+            for title, values in self.tabs.items()
+        ]
+
+    def get_lastUpdateTime(self) -> str:
+        self.calls["get_lastUpdateTime"] += 1
+        return f"2024-01-01T00:00:00.{self.revision:06d}Z"
+
+    def values_get(self, a1: str, params: dict | None = None) -> dict:
+        self.calls["values_get"] += 1
+        values = self._render(a1)
+        return {"range": a1, "values": values} if values else {"range": a1}
+
+    def values_batch_get(self, ranges: list[str], params: dict | None = None) -> dict:
+        self.calls["values_batch_get"] += 1
+        value_ranges = []
+        for a1 in ranges:
+            values = self._render(a1)
+            value_ranges.append({"range": a1, "values": values} if values else {"range": a1})
+        return {"spreadsheetId": self.id, "valueRanges": value_ranges}
+
+    def values_batch_update(self, body: dict) -> dict:
+        self.calls["values_batch_update"] += 1
+        for data in body.get("data", []):
+            title, r0, c0, _, _ = self._parse(data["range"])
+            self._write(title, r0, c0, data.get("values", []))
+        return {"spreadsheetId": self.id}
+
+    def values_append(self, a1: str, params: dict | None = None, body: dict | None = None) -> dict:
+        """表の最終行（空でない最後の行）の下に追加する。"""
+        self.calls["values_append"] += 1
+        title, _, c0, _, _ = self._parse(a1)
+        tab = self.tabs[title]
+        last = len(tab)
+        while last and not _trim(tab[last - 1]):
+            last -= 1
+        values = (body or {}).get("values", [])
+        tab[last:last] = [[] for _ in values]
+        self._write(title, last, c0, values)
+        width = max((len(r) for r in values), default=1)
+        updated = f"'{title}'!{_letters(c0)}{last + 1}:{_letters(c0 + width - 1)}{last + len(values)}"
+        return {"spreadsheetId": self.id, "updates": {"updatedRange": updated, "updatedRows": len(values)}}
+
+    def batch_update(self, body: dict) -> dict:
+        """addSheet と updateCells を処理する。"""
+        self.calls["batch_update"] += 1
+        replies = []
+        for req in body.get("requests", []):
+            if "addSheet" in req:
+                props = req["addSheet"]["properties"]
+                if props["title"] in self.tabs:
+                    raise api_error(400, f'A sheet with the name "{props["title"]}" already exists.')
+                self.tabs[props["title"]] = []
+                self._sheet_ids[props["title"]] = props["sheetId"]
+                replies.append({"addSheet": {"properties": {
+                    "sheetId": props["sheetId"], "title": props["title"], "index": len(self.tabs) - 1,
+                    "sheetType": "GRID", "gridProperties": props.get("gridProperties", {}),
+                }}})
+            elif "updateCells" in req:
+                uc = req["updateCells"]
+                title = next(t for t, sid in self._sheet_ids.items() if sid == uc["start"]["sheetId"])
+                values = [
+                    [next(iter(c.get("userEnteredValue", {"": ""}).values())) for c in row["values"]]
+                    for row in uc["rows"]
+                ]
+                self._write(title, uc["start"].get("rowIndex", 0), uc["start"].get("columnIndex", 0), values)
+                replies.append({})
+            else:
+                replies.append({})
+        self.touch()
+        return {"spreadsheetId": self.id, "replies": replies}
+
+
+def make_result_sheet(rounds: int, players: int, spreadsheet_id: str = "fake-result") -> FakeSpreadsheet:
+    """
+    結果シート（NebukawaIR(result)）を模した FakeSpreadsheet を作る。
+    回ごとに参加者と順位を変え、数字以外のタブ（README）も1つ混ぜる。
+    """
+    tabs: dict[str, list[list]] = {"README": [["memo"]]}
+    for rnd in range(1, rounds + 1):
+        offset = rnd * 7 % players
+        n = players - (rnd % 3) * players // 10
+        rows = [RESULT_HEADER]
+        for rank in range(1, n + 1):
+            p = (offset + rank * 13) % players
+            rows.append([rank, 100000 + p, f"player{p}", 4000 - rank, f"{95 - rank / 10:.2f}", f"{rank / 3:.2f}"])
+        tabs[str(rnd)] = rows
+    return FakeSpreadsheet(tabs, spreadsheet_id)
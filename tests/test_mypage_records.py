@@ -0,0 +1,90 @@
+# ============================================================
+# test_mypage_records.py - /mypage all の全回成績組み立てのテスト
+# 実行: python -m unittest discover -s tests
+# ============================================================
+
+import unittest
+
+from fake_sheets import RESULT_HEADER, make_result_sheet
+from src import mypage
+from src.sheet_cache import sheet_cache
+
+
+class FetchUserRecordsTest(unittest.TestCase):
+    def setUp(self):
+        self.sh = make_result_sheet(rounds=5, players=20)
+        self._saved = (mypage._open_spreadsheet, mypage.get_synced_store)
+        mypage._open_spreadsheet = lambda sheet_id: self.sh
+        mypage.get_synced_store = lambda: None
+        sheet_cache.clear()
+
+    def tearDown(self):
+        sheet_cache.clear()
+        mypage._open_spreadsheet, mypage.get_synced_store = self._saved
+
+    def _fetch(self, lr2id: str, targeted: bool = True) -> list[dict]:
+        return mypage._fetch_user_records_all_rounds_sync(self.sh.id, lr2id, targeted=targeted)
+
+    def _fresh(self, lr2id: str) -> list[dict]:
+        sheet_cache.clear()
+        return self._fetch(lr2id, targeted=False)
+
+    def _expected(self, lr2id: str) -> list[dict]:
+        """FakeSpreadsheet のタブから直接組み立てた期待値。"""
+        records = []
+        for title, values in self.sh.tabs.items():
+            if not title.isdigit():
+                continue
+            for row in values[1:]:
+                if row[1] == lr2id:
+                    records.append({"round": int(title), "row": dict(zip(RESULT_HEADER, row)),
+                                    "total": len(values) - 1})
+        return sorted(records, key=lambda rec: rec["round"])
+
+    def test_targeted_matches_sheet_layout(self):
+        for lr2id in ("100000", "100007", "100019"):
+            sheet_cache.clear()
+            records = self._fetch(lr2id)
+            self.assertEqual(records, self._expected(lr2id))
+            self.assertEqual(records, self._fresh(lr2id))
+        # /result が書き込む列（B 列が LR2ID）のとおりに読めている
+        rec = self._fetch("100007")[0]
+        self.assertEqual(list(rec["row"]), RESULT_HEADER)
+        self.assertEqual(rec["row"]["PlayerName"], "player7")
+
+    def test_targeted_reads_only_matching_rows(self):
+        self._fetch("100000")
+        self.sh.calls.clear()
+        self._fetch("100001")   # B 列はキャッシュ済み: 該当行の取得だけ
+        self.assertEqual(self.sh.calls["values_batch_get"], 1)
+
+    def test_stale_row_number_is_reread(self):
+        target = self.sh.tabs["3"][5][1]
+        self._fetch(target)                     # B 列（行番号）をキャッシュする
+
+        # キャッシュ後に別の行が挿入され、target の行が1つ下にずれる
+        tab = self.sh.tabs["3"]
+        tab.insert(1, ["0", "999999", "newcomer", "4001", "99.00", "50.00"])
+
+        records = self._fetch(target)
+        self.assertEqual(records, self._expected(target))
+        for rec in records:
+            self.assertEqual(rec["row"]["LR2ID"], target)
+        round3 = next(rec for rec in records if rec["round"] == 3)
+        self.assertEqual(round3["row"]["PlayerName"], tab[6][2])
+        self.assertEqual(round3["total"], len(tab) - 1)
+
+        # 読み直した後は新しい行番号で2段階取得に戻る
+        self.assertEqual(self._fetch(target), records)
+
+    def test_stale_row_past_end_is_reread(self):
+        target = self.sh.tabs["2"][-1][1]
+        self._fetch(target)
+        del self.sh.tabs["2"][1:3]              # 行が削除され、キャッシュした行番号がタブの末尾を越える
+        records = self._fetch(target)
+        self.assertIn(2, [rec["round"] for rec in records])
+        self.assertEqual(records, self._expected(target))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+# ============================================================
+# test_score_sync.py - 成績ストアの差分同期のテスト
+# 実行: python -m unittest discover -s tests
+# ============================================================
+
+import os
+import tempfile
+import unittest
+
+from fake_sheets import RESULT_HEADER, FakeSpreadsheet, make_result_sheet
+from src import score_sync, sheet_writer
+from src.score_store import ScoreStore
+from src.sheet_cache import sheet_cache
+
+
+class _Directory:
+    def replace(self, users, source) -> None:
+        pass
+
+
+class IncrementalSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.result = make_result_sheet(rounds=5, players=20)
+        self.main = FakeSpreadsheet({"CourseData": [["回", "diff", "title", "CourseID"]]}, "fake-main")
+        sheets = {self.result.id: self.result, self.main.id: self.main}
+        self._saved = (
+            score_sync._open_spreadsheet, score_sync._load_course_meta_map_from_sheet_sync,
+            score_sync._load_user_rows_sync, score_sync.user_directory,
+            sheet_writer._open_spreadsheet, sheet_writer._cached_worksheet, sheet_writer._remember_worksheet,
+        )
+        score_sync._open_spreadsheet = sheets.__getitem__
+        score_sync._load_course_meta_map_from_sheet_sync = lambda *args, **kwargs: {}
+        score_sync._load_user_rows_sync = lambda *args, **kwargs: []
+        score_sync.user_directory = _Directory()
+        sheet_writer._open_spreadsheet = sheets.__getitem__
+        sheet_writer._cached_worksheet = lambda sheet_id, title: None
+        sheet_writer._remember_worksheet = lambda sheet_id, ws: None
+
+        self._dir = tempfile.TemporaryDirectory()
+        self.store = ScoreStore(os.path.join(self._dir.name, "scores.db"))
+        score_sync.full_sync_sync(self.store, self.result.id, self.main.id)
+        self.result.calls.clear()
+        sheet_cache.clear()
+
+    def tearDown(self):
+        self.store.close()
+        self._dir.cleanup()
+        sheet_cache.clear()
+        (
+            score_sync._open_spreadsheet, score_sync._load_course_meta_map_from_sheet_sync,
+            score_sync._load_user_rows_sync, score_sync.user_directory,
+            sheet_writer._open_spreadsheet, sheet_writer._cached_worksheet, sheet_writer._remember_worksheet,
+        ) = self._saved
+
+    def _sync(self) -> list[int]:
+        return score_sync.incremental_sync_sync(self.store, self.result.id, self.main.id)
+
+    def _write_result(self, title: str, rows: list[list]) -> None:
+        """main.write_round_result_to_sheet と同じ順で書き込み、ストアへ反映する。"""
+        values = [RESULT_HEADER] + rows
+        sheet_writer.write_tab_values_sync(self.result.id, title, values, min_cols=len(RESULT_HEADER))
+        self.store.replace_round(int(title), [dict(zip(RESULT_HEADER, row)) for row in rows])
+        score_sync.record_result_write_sync(self.store, self.result.id, title, values)
+
+    def test_unchanged_sheet_reads_nothing(self):
+        self.assertEqual(self._sync(), [])
+        self.assertEqual(self.result.calls["worksheets"], 0)
+        self.assertEqual(self.result.calls["values_batch_get"], 0)
+
+    def test_own_write_to_new_tab_is_not_reread(self):
+        self._write_result("6", [[1, "100001", "player1", 4000, 95.5, 1.5]])
+        self.result.calls.clear()
+        self.assertEqual(self._sync(), [])
+        self.assertEqual(self.result.calls["worksheets"], 0)
+        self.assertEqual(self.result.calls["values_batch_get"], 0)
+        self.assertEqual(self.store.user_record(6, "100001")[1], 1)
+
+    def test_own_overwrite_of_same_size_tab_is_not_reread(self):
+        rows = [row[:] for row in self.result.tabs["3"][1:]]
+        rows[0][3] = "1234"
+        self._write_result("3", rows)
+        self.result.calls.clear()
+        self.assertEqual(self._sync(), [])
+        self.assertEqual(self.result.calls["values_batch_get"], 0)
+
+    def test_resized_tab_is_read_alone(self):
+        self.result.tabs["2"].append(["99", "100099", "late", "1", "0.10", "0.00"])
+        self.result.touch()
+        self.assertEqual(self._sync(), [2])
+        self.assertEqual(self.result.calls["values_batch_get"], 1)
+        self.assertEqual(self.store.user_record(2, "100099")[0]["PlayerName"], "late")
+        self.result.calls.clear()
+        self.assertEqual(self._sync(), [])
+
+    def test_hand_added_and_removed_tabs(self):
+        self.result.add_tab("7", [RESULT_HEADER, ["1", "100003", "player3", "10", "1.00", "0.00"]])
+        del self.result.tabs["1"]
+        self.result.touch()
+        self.assertEqual(self._sync(), [1, 7])
+        self.assertIsNone(self.store.user_record(1, "100003")[0])
+        self.assertEqual(self.store.user_record(7, "100003")[1], 1)
+
+    def test_structural_change_alongside_own_write_is_not_masked(self):
+        # 手作業でのタブ追加の直後に /result が書き込んでも、追加されたタブは次回の差分同期で拾う
+        self.result.add_tab("8", [RESULT_HEADER, ["1", "100004", "player4", "10", "1.00", "0.00"]])
+        self._write_result("6", [[1, "100001", "player1", 4000, 95.5, 1.5]])
+        self.result.calls.clear()
+        self.assertEqual(self._sync(), [8])
+        self.assertEqual(self.result.calls["values_batch_get"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+# ============================================================
+# test_sheet_writer.py - CourseData・UserData の行の上書き／追加のテスト
+# 実行: python -m unittest discover -s tests
+# ============================================================
+
+import unittest
+
+from fake_sheets import FakeSpreadsheet
+from src import sheet_writer
+from src.sheet_cache import sheet_cache
+
+HEADERS = ["DiscordID", "LR2ID"]
+
+
+class UpsertKeyedRowTest(unittest.TestCase):
+    def setUp(self):
+        self.sh = FakeSpreadsheet({"UserData": [HEADERS, ["111", "100001"], ["222", "100002"]]}, "fake-main")
+        self._saved = (sheet_writer._open_spreadsheet, sheet_writer._remember_worksheet)
+        sheet_writer._open_spreadsheet = lambda sheet_id: self.sh
+        sheet_writer._remember_worksheet = lambda sheet_id, ws: None
+        sheet_cache.clear()
+
+    def tearDown(self):
+        sheet_cache.clear()
+        sheet_writer._open_spreadsheet, sheet_writer._remember_worksheet = self._saved
+
+    def _upsert(self, discord_id: str, lr2id: str, title: str = "UserData") -> str:
+        return sheet_writer.upsert_keyed_row_sync(self.sh.id, title, HEADERS, [discord_id, lr2id])
+
+    def test_updates_existing_row(self):
+        self.assertEqual(self._upsert("222", "100022"), "updated")
+        self.assertEqual(self.sh.tabs["UserData"], [HEADERS, ["111", "100001"], ["222", "100022"]])
+        self.assertEqual(self.sh.calls["values_get"], 1)
+        self.assertEqual(self.sh.calls["values_batch_update"], 1)
+
+    def test_appends_new_row(self):
+        self.assertEqual(self._upsert("333", "100003"), "inserted")
+        self.assertEqual(self.sh.tabs["UserData"][-1], ["333", "100003"])
+        self.assertEqual(len(self.sh.tabs["UserData"]), 4)
+        self.assertEqual(self.sh.calls["values_append"], 1)
+
+    def test_key_is_normalized(self):
+        self.sh.add_tab("CourseData", [["回", "diff", "title", "CourseID"], ["05", "★1", "a", "10"]])
+        result = sheet_writer.upsert_keyed_row_sync(
+            self.sh.id, "CourseData", ["回", "diff", "title", "CourseID"], [5, "★2", "b", 11]
+        )
+        self.assertEqual(result, "updated")
+        self.assertEqual(self.sh.tabs["CourseData"][1], ["5", "★2", "b", "11"])
+
+    def test_creates_missing_tab_with_header(self):
+        self.assertEqual(self._upsert("111", "100001", title="NewTab"), "inserted")
+        self.assertEqual(self.sh.tabs["NewTab"], [HEADERS, ["111", "100001"]])
+        self.assertEqual(self.sh.calls["batch_update"], 1)
+
+    def test_sheet_edited_between_calls(self):
+        self._upsert("333", "100003")
+        # 手作業で行を挿入・並べ替え・削除しても、次の書き込みは現在の該当行に入る
+        tab = self.sh.tabs["UserData"]
+        tab.insert(1, ["444", "100004"])
+        tab[2:] = sorted(tab[2:], reverse=True)
+        self.sh.touch()
+        self.assertEqual(self._upsert("111", "100011"), "updated")
+        self.assertEqual(self._upsert("333", "100033"), "updated")
+        del self.sh.tabs["UserData"][1]
+        self.sh.touch()
+        self.assertEqual(self._upsert("222", "100022"), "updated")
+        self.assertEqual(
+            self.sh.tabs["UserData"],
+            [HEADERS, ["333", "100033"], ["222", "100022"], ["111", "100011"]],
+        )
+
+    def test_deleted_row_is_appended_again(self):
+        self._upsert("222", "100022")
+        del self.sh.tabs["UserData"][2]
+        self.sh.touch()
+        self.assertEqual(self._upsert("222", "100002"), "inserted")
+        self.assertEqual(self.sh.tabs["UserData"], [HEADERS, ["111", "100001"], ["222", "100002"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
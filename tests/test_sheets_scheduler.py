@@ -0,0 +1,44 @@
+# ============================================================
+# test_sheets_scheduler.py - Sheets I/O のスレッドプールのテスト
+# 実行: python -m unittest discover -s tests
+# ============================================================
+
+import asyncio
+import threading
+import unittest
+
+from src import sheets_scheduler
+from src.sheets_scheduler import Priority, current_priority, run_sheets_io
+
+
+class RunSheetsIoTest(unittest.TestCase):
+    def test_runs_with_priority(self):
+        async def main():
+            return await run_sheets_io(Priority.INTERACTIVE, lambda x: (x, current_priority()), 1)
+
+        self.assertEqual(asyncio.run(main()), (1, Priority.INTERACTIVE))
+
+    def test_blocked_background_does_not_starve_others(self):
+        release = threading.Event()
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            # スケジューラで待ち続けるバックグラウンド処理をプールの数より多く積む
+            blocked = [
+                asyncio.ensure_future(run_sheets_io(Priority.BACKGROUND, release.wait, 10))
+                for _ in range(sheets_scheduler.BACKGROUND_WORKERS * 4)
+            ]
+            await asyncio.sleep(0.05)
+            try:
+                interactive = await asyncio.wait_for(run_sheets_io(Priority.INTERACTIVE, lambda: "ok"), 2)
+                default = await asyncio.wait_for(loop.run_in_executor(None, lambda: "parsed"), 2)
+            finally:
+                release.set()
+                await asyncio.gather(*blocked)
+            return interactive, default
+
+        self.assertEqual(asyncio.run(main()), ("ok", "parsed"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+# ============================================================
+# test_song_search.py - /bpi オートコンプリート用の曲名検索のテスト
+# 実行: python -m unittest discover -s tests
+# ============================================================
+
+import unittest
+
+from src.song_search import SongSearchIndex
+
+_SONGS = [
+    ("12", "Air -EXTREME-"),
+    ("3", "Airborne [ANOTHER]"),
+    ("12", "Fair Wind"),
+    ("20", "Blue Air"),
+    ("1", "ドーナツ"),
+]
+
+
+class SongSearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = SongSearchIndex([t for _, t in _SONGS], [lv for lv, _ in _SONGS])
+
+    def titles(self, query: str, limit: int = 25) -> list[str]:
+        return [_SONGS[i][1] for i in self.index.search(query, limit)]
+
+    def test_prefix_before_substring(self):
+        self.assertEqual(self.titles("air"), ["Air -EXTREME-", "Airborne [ANOTHER]", "Fair Wind", "Blue Air"])
+
+    def test_level_prefix(self):
+        self.assertEqual(self.titles("★12 air"), ["Air -EXTREME-", "Fair Wind"])
+        self.assertEqual(self.titles("★1"), ["ドーナツ", "Air -EXTREME-", "Fair Wind"])
+
+    def test_label_substring_across_level_and_title(self):
+        # 難易度と曲名をまたぐクエリはラベル全体の部分一致で拾う
+        self.assertEqual(self.titles("12 air"), ["Air -EXTREME-"])
+        self.assertEqual(self.titles("2 f"), ["Fair Wind"])
+        self.assertEqual(self.titles("0 blue"), ["Blue Air"])
+
+    def test_label_matches_only_fill_up_to_limit(self):
+        self.assertEqual(self.titles("air", limit=2), ["Air -EXTREME-", "Airborne [ANOTHER]"])
+        self.assertEqual(self.titles("12 air", limit=1), ["Air -EXTREME-"])
+
+    def test_normalized_query(self):
+        self.assertEqual(self.titles("ＡＩＲ　－ＥＸ"), ["Air -EXTREME-"])
+        self.assertEqual(self.titles("どーなつ"), ["ドーナツ"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+# ============================================================
+# test_user_directory.py - DiscordID ⇔ LR2ID の対応表のテスト
+# 実行: python -m unittest discover -s tests
+# ============================================================
+
+import unittest
+
+from src.user_directory import UserDirectory
+
+
+def _rows(*pairs: tuple[str, str]) -> list[dict]:
+    return [{"DiscordID": did, "LR2ID": lr2} for did, lr2 in pairs]
+
+
+class UserDirectoryTest(unittest.TestCase):
+    def test_replace_and_lookup(self):
+        d = UserDirectory()
+        d.replace(_rows(("111", "1001"), ("222", "1002")))
+        self.assertEqual(d.lr2id_of("111"), "1001")
+        self.assertEqual(d.lr2id_of(" 222 "), "1002")
+        self.assertEqual(d.discord_of("1002"), "222")
+        self.assertIsNone(d.lr2id_of("333"))
+        self.assertTrue(d.is_loaded())
+
+    def test_duplicate_rows_first_wins(self):
+        d = UserDirectory()
+        d.replace(_rows(
+            ("111", "1001"),
+            ("222", "1002"),
+            ("111", "9999"),   # 同じ DiscordID の2行目
+            ("333", "1002"),   # 同じ LR2ID の2行目
+        ))
+        self.assertEqual(d.lr2id_of("111"), "1001")
+        self.assertEqual(d.discord_of("1002"), "222")
+        self.assertEqual(d.lr2id_of("333"), "1002")
+        self.assertEqual(d.discord_of("9999"), "111")
+        self.assertEqual(d.rows(), _rows(("111", "1001"), ("222", "1002"), ("333", "1002")))
+
+    def test_set_moves_reverse_mapping(self):
+        d = UserDirectory()
+        d.replace(_rows(("111", "1001")))
+        d.set("111", "1005")
+        self.assertEqual(d.lr2id_of("111"), "1005")
+        self.assertEqual(d.discord_of("1005"), "111")
+        self.assertIsNone(d.discord_of("1001"))
+
+
+if __name__ == "__main__":
+    unittest.main()